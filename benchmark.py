@@ -0,0 +1,679 @@
+"""
+قياس أداء مكونات نظام التحميل
+
+الاستخدام:
+    python benchmark.py locator                      # صفحات تركيبية بأحجام مختلفة
+    python benchmark.py locator --fixture page.html  # صفحات Pin مسجلة
+    python benchmark.py e2e --output base.json       # تحميل كامل من خادم محلي بدل Pinterest
+    python benchmark.py e2e --latency-ms 80 --bandwidth-mbps 40 --concurrency 1 16 256
+    python benchmark.py compare base.json new.json   # مقارنة نتيجتين بين commitين
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+
+from downloader import AdaptiveRateLimiter, AdvancedPinterestDownloader, HTTPSessionManager, PinPageExtractor
+
+# حجم كتل الإرسال في الخادم المحلي (وحدة تقييد السرعة)
+STANDIN_CHUNK = 64 * 1024
+
+DEFAULT_CONCURRENCY = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def fixture_pin(pin_id: str, formats: Sequence[str] = ("hls", "mp4")) -> Dict[str, Any]:
+    """
+    عقدة Pin تركيبية بنفس حقول Pinterest
+
+    Args:
+        pin_id: معرف Pin
+        formats: صيغ الفيديو المتاحة (hls و/أو mp4)
+
+    Returns:
+        قاموس Pin
+    """
+    video_list = {}
+    if "hls" in formats:
+        video_list["V_HLSV4"] = {"url": f"https://v1.pinimg.com/videos/{pin_id}/hls.m3u8", "width": 720}
+    if "mp4" in formats:
+        video_list["V_720P"] = {"url": f"https://v1.pinimg.com/videos/{pin_id}/720p.mp4", "width": 720}
+    return {
+        "id": pin_id,
+        "title": f"Pin {pin_id}",
+        "description": "x" * 200,
+        "images": {"orig": {"url": f"https://i.pinimg.com/originals/{pin_id}.jpg"}},
+        "aggregated_pin_data": {"comment_count": 3, "did_it_data": {"images": [{"w": 1}] * 5}},
+        "videos": {"video_list": video_list},
+    }
+
+
+def build_fixture_page(
+    pin_id: str,
+    related_pins: int,
+    layout: str = "redux",
+    formats: Sequence[str] = ("hls", "mp4")
+) -> bytes:
+    """
+    بناء صفحة Pin تركيبية بنفس بنية __PWS_DATA__ مع عدد من Pins المقترحة
+
+    Args:
+        pin_id: معرف Pin المطلوب
+        related_pins: عدد Pins المقترحة (لكل منها فيديو خاص)
+        layout: redux (الـ Pin داخل initialReduxState.pins) أو nested (داخل بنية عميقة غير معروفة)
+        formats: صيغ الفيديو المتاحة للـ Pin المطلوب
+
+    Returns:
+        محتوى HTML للصفحة
+    """
+
+    # Pins المقترحة تأتي أولاً كما في الصفحات الحقيقية الكبيرة
+    pins = {str(10_000 + i): fixture_pin(str(10_000 + i)) for i in range(related_pins)}
+    feed = [{"type": "pin", "pin": fixture_pin(str(90_000 + i))} for i in range(related_pins)]
+
+    if layout == "redux":
+        pins[pin_id] = fixture_pin(pin_id, formats)
+        state = {"props": {"initialReduxState": {"pins": pins, "feeds": {"related": feed}}}}
+    else:
+        closeup = fixture_pin(pin_id, formats)
+        state = {"props": {"context": {"feeds": feed}, "page": {"a": {"b": {"c": {"closeup": closeup}}}}}}
+
+    block = json.dumps(state).encode()
+    return (
+        b'<html><head><title>Pin | Pinterest</title></head><body>'
+        b'<script id="__PWS_DATA__" type="application/json">' + block + b'</script></body></html>'
+    )
+
+
+def legacy_find_video(data: Any) -> Optional[str]:
+    """البحث التعاودي القديم (مرجع للمقارنة): أول video_list في ترتيب الزيارة"""
+    if isinstance(data, dict):
+        video_list = data.get("video_list")
+        if isinstance(video_list, dict):
+            for variant in video_list.values():
+                if isinstance(variant, dict) and variant.get("url"):
+                    return variant["url"]
+        for value in data.values():
+            result = legacy_find_video(value)
+            if result:
+                return result
+    elif isinstance(data, list):
+        for item in data:
+            result = legacy_find_video(item)
+            if result:
+                return result
+    return None
+
+
+def _best_of(func, repeat: int) -> Tuple[float, Any]:
+    """أفضل زمن (بالميلي ثانية) من عدة تكرارات مع نتيجة آخر تشغيل"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def run_locator_benchmark(fixtures: List[Tuple[str, str, bytes]], repeat: int) -> List[Dict[str, Any]]:
+    """
+    قياس تحليل JSON وتحديد موقع الفيديو لكل صفحة
+
+    Args:
+        fixtures: قائمة (الاسم, معرف Pin, محتوى HTML)
+        repeat: عدد التكرارات
+
+    Returns:
+        نتائج القياس لكل صفحة
+    """
+    results = []
+    for name, pin_id, page in fixtures:
+        extractor = PinPageExtractor()
+        if not extractor.feed(page):
+            print(f"{name}: لا توجد كتلة بيانات", file=sys.stderr)
+            continue
+
+        data = json.loads(extractor.block)
+        parse_ms, _ = _best_of(lambda: json.loads(extractor.block), repeat)
+        locate_ms, located = _best_of(
+            lambda: AdvancedPinterestDownloader._locate_video(data, pin_id), repeat
+        )
+        legacy_ms, legacy_url = _best_of(lambda: legacy_find_video(data), repeat)
+
+        located_url = located["video_url"] if located else None
+        results.append({
+            "fixture": name,
+            "block_bytes": len(extractor.block),
+            "json_ms": round(parse_ms, 3),
+            "locate_ms": round(locate_ms, 3),
+            "legacy_ms": round(legacy_ms, 3),
+            "locate_correct": bool(located_url and pin_id in located_url),
+            "legacy_correct": bool(legacy_url and pin_id in legacy_url),
+        })
+    return results
+
+
+class StandInResolver(AbstractResolver):
+    """توجيه كل النطاقات (pinterest.com و pin.it و pinimg.com) إلى الخادم المحلي"""
+
+    def __init__(self, ports: Dict[int, int]):
+        # منفذ الرابط (80 / 443) -> منفذ الخادم المحلي
+        self.ports = ports
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        return [{
+            "hostname": host,
+            "host": "127.0.0.1",
+            "port": self.ports.get(port, port),
+            "family": socket.AF_INET,
+            "proto": 0,
+            "flags": socket.AI_NUMERICHOST,
+        }]
+
+    async def close(self) -> None:
+        pass
+
+
+def create_standin_app(
+    pin_ids: List[str],
+    media_bytes: int = 1024 * 1024,
+    hls_segments: int = 4,
+    latency: float = 0.0,
+    bandwidth: float = 0.0,
+    formats: Sequence[str] = ("hls", "mp4"),
+    related_pins: int = 100,
+    fixture: Optional[Tuple[str, bytes]] = None,
+) -> web.Application:
+    """
+    خادم محلي يحاكي Pinterest: صفحات Pin وروابط pin.it المختصرة ومورد PinResource
+    وقوائم HLS ومقاطعها وملفات MP4 (مع HEAD و Range)
+
+    Args:
+        pin_ids: معرفات Pins المتاحة (الرابط المختصر للـ Pin رقم i هو pin.it/s{i})
+        media_bytes: حجم كل فيديو
+        hls_segments: عدد مقاطع HLS لكل فيديو
+        latency: تأخير كل استجابة قبل إرسال headers بالثواني
+        bandwidth: سرعة كل اتصال بالبايت/ثانية (0 بلا حد)
+        formats: صيغ الفيديو في كل Pin
+        related_pins: عدد Pins المقترحة في كل صفحة تركيبية
+        fixture: (معرف Pin, صفحة HTML مسجلة) تُقدّم لكل Pin بعد استبدال المعرف
+
+    Returns:
+        تطبيق aiohttp
+    """
+    known = set(pin_ids)
+    short_links = {f"s{index}": pin_id for index, pin_id in enumerate(pin_ids)}
+    media = bytes(media_bytes)
+    segment_size = -(-media_bytes // hls_segments)
+    pages: Dict[str, bytes] = {}
+
+    def page_for(pin_id: str) -> bytes:
+        page = pages.get(pin_id)
+        if page is None:
+            if fixture:
+                page = fixture[1].replace(fixture[0].encode(), pin_id.encode())
+            else:
+                page = build_fixture_page(pin_id, related_pins, formats=formats)
+            pages[pin_id] = page
+        return page
+
+    async def send(
+        request: web.Request,
+        body: bytes,
+        content_type: str,
+        status: int = 200,
+        headers: Optional[Dict[str, str]] = None
+    ) -> web.StreamResponse:
+        await asyncio.sleep(latency)
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_type = content_type
+        response.content_length = len(body)
+        try:
+            await response.prepare(request)
+            if request.method != "HEAD":
+                view = memoryview(body)
+                for offset in range(0, len(body), STANDIN_CHUNK):
+                    chunk = view[offset:offset + STANDIN_CHUNK]
+                    await response.write(chunk)
+                    if bandwidth:
+                        await asyncio.sleep(len(chunk) / bandwidth)
+            await response.write_eof()
+        except ConnectionResetError:
+            # العميل أغلق الاتصال (طلب تحوّط خاسر أو بث أُغلق مبكراً)
+            pass
+        return response
+
+    async def pin_page(request: web.Request) -> web.StreamResponse:
+        pin_id = request.match_info["pin_id"]
+        if pin_id not in known:
+            raise web.HTTPNotFound()
+        return await send(request, page_for(pin_id), "text/html")
+
+    async def pin_resource(request: web.Request) -> web.StreamResponse:
+        try:
+            options = json.loads(request.query.get("data", "{}")).get("options", {})
+        except ValueError:
+            raise web.HTTPBadRequest()
+        pin_id = str(options.get("id"))
+        if pin_id not in known:
+            return web.json_response({"resource_response": {"status": "failure", "data": None}}, status=404)
+        body = json.dumps({"resource_response": {"status": "success", "data": fixture_pin(pin_id, formats)}})
+        return await send(request, body.encode(), "application/json")
+
+    async def video(request: web.Request) -> web.StreamResponse:
+        name = request.match_info["path"].rsplit("/", 1)[-1]
+
+        if name.endswith(".m3u8"):
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+            for index in range(hls_segments):
+                lines += ["#EXTINF:4.0,", f"seg{index}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            return await send(request, "\n".join(lines).encode(), "application/vnd.apple.mpegurl")
+
+        if name.endswith(".ts"):
+            try:
+                index = int(name[3:-3])
+            except ValueError:
+                raise web.HTTPNotFound()
+            return await send(request, media[index * segment_size:(index + 1) * segment_size], "video/mp2t")
+
+        # MP4 مع دعم طلبات Range كما في CDN
+        requested = request.http_range
+        if requested.start is None and requested.stop is None:
+            return await send(request, media, "video/mp4", headers={"Accept-Ranges": "bytes"})
+        start = requested.start or 0
+        if start < 0:
+            start = max(0, media_bytes + start)
+        stop = min(requested.stop or media_bytes, media_bytes)
+        if start >= stop:
+            raise web.HTTPRequestRangeNotSatisfiable(headers={"Content-Range": f"bytes */{media_bytes}"})
+        return await send(request, media[start:stop], "video/mp4", status=206, headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{stop - 1}/{media_bytes}",
+        })
+
+    async def short_link(request: web.Request) -> web.StreamResponse:
+        pin_id = short_links.get(request.match_info["code"])
+        if pin_id is None or not request.host.startswith("pin.it"):
+            raise web.HTTPNotFound()
+        await asyncio.sleep(latency)
+        raise web.HTTPFound(f"https://www.pinterest.com/pin/{pin_id}/")
+
+    app = web.Application()
+    app.router.add_get("/pin/{pin_id}/", pin_page)
+    app.router.add_get("/resource/PinResource/get/", pin_resource)
+    app.router.add_get("/_ngjs/resource/PinResource/get/", pin_resource)
+    app.router.add_get(r"/{path:.+\.(?:m3u8|ts|mp4)}", video)
+    app.router.add_get("/{code}", short_link)
+    return app
+
+
+def _make_certificate(directory: str) -> Tuple[str, str]:
+    """شهادة TLS مؤقتة للخادم المحلي (المحمّل لا يتحقق من الشهادات)"""
+    certificate = str(Path(directory) / "standin.pem")
+    key = str(Path(directory) / "standin.key")
+    try:
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                "-subj", "/CN=localhost", "-keyout", key, "-out", certificate,
+            ],
+            check=True,
+            capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SystemExit(f"تعذر إنشاء شهادة TLS عبر openssl: {e}")
+    return certificate, key
+
+
+def _serve_standin(options: Dict[str, Any], certificate: Tuple[str, str], ports: Any) -> None:
+    """تشغيل الخادم المحلي في عملية مستقلة حتى لا ينافس المحمّل على المعالج"""
+    async def serve() -> None:
+        runner = web.AppRunner(create_standin_app(**options), access_log=None)
+        await runner.setup()
+
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(*certificate)
+
+        bound = {}
+        for url_port, ssl_context in ((80, None), (443, context)):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("127.0.0.1", 0))
+            await web.SockSite(runner, sock, ssl_context=ssl_context, backlog=1024).start()
+            bound[url_port] = sock.getsockname()[1]
+
+        ports.put(bound)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """النسبة المئوية بطريقة أقرب رتبة"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_e2e_level(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """تشغيل مستوى تزامن واحد (في عملية جديدة لتكون ذروة الذاكرة خاصة به)"""
+    return asyncio.run(_run_e2e_level(settings))
+
+
+async def _run_e2e_level(settings: Dict[str, Any]) -> Dict[str, Any]:
+    concurrency = settings["concurrency"]
+    short_every = settings["short_every"]
+    # بعض الروابط مختصرة (pin.it) لقياس مسار التوسيع أيضاً
+    urls = [
+        f"https://pin.it/s{index}" if short_every and index % short_every == 0
+        else f"https://www.pinterest.com/pin/{pin_id}/"
+        for index, pin_id in enumerate(settings["pin_ids"])
+    ]
+
+    latencies: List[float] = []
+    transferred = 0
+    failed = 0
+
+    with tempfile.TemporaryDirectory(prefix="pinbench-") as directory:
+        downloader = AdvancedPinterestDownloader(
+            directory,
+            session_manager=HTTPSessionManager(
+                limit=max(100, concurrency * 2),
+                limit_per_host=max(20, concurrency * 2),
+                resolver=StandInResolver(settings["ports"]),
+            ),
+            rate_limiter=AdaptiveRateLimiter(rate=settings["rate"] or 1e9, burst=max(5, concurrency)),
+            store_quota_bytes=len(urls) * settings["media_bytes"] * 2,
+            api_fast_path=settings["resolve"] == "api",
+        )
+        await downloader.start()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def fetch(url: str) -> None:
+            nonlocal transferred, failed
+            async with limit:
+                started = time.perf_counter()
+                result = await downloader.download_video(url, max_bytes=None)
+                latencies.append(time.perf_counter() - started)
+            if result:
+                transferred += result["filesize"]
+                downloader.cleanup_file(result["filepath"])
+            else:
+                failed += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(fetch(url) for url in urls))
+        finally:
+            wall = time.perf_counter() - started
+            await downloader.close()
+
+    # ru_maxrss بالكيلوبايت على Linux وبالبايت على macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    return {
+        "concurrency": concurrency,
+        "pins": len(urls),
+        "failed": failed,
+        "wall_seconds": round(wall, 3),
+        "pins_per_second": round(len(urls) / wall, 2),
+        "bytes_per_second": round(transferred / wall),
+        "latency_ms": {
+            name: round(_percentile(latencies, percent) * 1000, 1)
+            for name, percent in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+        "peak_rss_mb": round(peak_rss / 1024 ** 2, 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_e2e_benchmark(
+    levels: Sequence[int],
+    pins: int,
+    rounds: int,
+    server_options: Dict[str, Any],
+    resolve: str = "html",
+    short_every: int = 5,
+    rate: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    قياس التحميل الكامل (توسيع الروابط، تحليل الصفحة أو API، HLS/MP4، المخزن) مقابل
+    خادم محلي، لكل مستوى تزامن في عملية مستقلة
+
+    Args:
+        levels: مستويات التزامن
+        pins: أقل عدد Pins لكل مستوى
+        rounds: أقل عدد Pins لكل خانة تزامن (المستوى × rounds)
+        server_options: خيارات create_standin_app عدا pin_ids
+        resolve: html (تحليل الصفحة) أو api (مورد PinResource أولاً)
+        short_every: رابط pin.it مختصر كل N روابط (0 بلا روابط مختصرة)
+        rate: حد الطلبات لكل مضيف في الثانية (0 بلا حد)
+
+    Returns:
+        التقرير (config و results) بصيغة قابلة للمقارنة بين commitين
+    """
+    counts = {level: max(pins, level * rounds) for level in levels}
+    pin_ids = [str(700_000_000 + index) for index in range(max(counts.values()))]
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pinbench-tls-") as directory:
+        ports = context.Queue()
+        server = context.Process(
+            target=_serve_standin,
+            args=(dict(server_options, pin_ids=pin_ids), _make_certificate(directory), ports),
+            daemon=True,
+        )
+        server.start()
+        try:
+            bound = ports.get(timeout=30)
+            for level in levels:
+                settings = {
+                    "concurrency": level,
+                    "pin_ids": pin_ids[:counts[level]],
+                    "ports": bound,
+                    "media_bytes": server_options["media_bytes"],
+                    "resolve": resolve,
+                    "short_every": short_every,
+                    "rate": rate,
+                }
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    row = pool.submit(run_e2e_level, settings).result()
+                results.append(row)
+                print(
+                    f"concurrency {level}: {row['pins_per_second']} pins/s, p95 {row['latency_ms']['p95']} ms",
+                    file=sys.stderr,
+                )
+        finally:
+            server.terminate()
+            server.join()
+
+    config = {key: value for key, value in server_options.items() if key != "fixture"}
+    config.update({
+        "fixture": server_options["fixture"][0] if server_options.get("fixture") else None,
+        "resolve": resolve,
+        "short_every": short_every,
+        "rate": rate,
+        "pins": pins,
+        "rounds": rounds,
+    })
+    return {
+        "benchmark": "e2e",
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "config": config,
+        "results": results,
+    }
+
+
+def compare_reports(base: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    مقارنة تقريري e2e لكل مستوى تزامن مشترك
+
+    Args:
+        base: التقرير المرجعي
+        new: التقرير الجديد
+
+    Returns:
+        نسبة التغير (%) في الإنتاجية والزمن والذاكرة لكل مستوى
+    """
+    def change(old: float, current: float) -> Optional[float]:
+        return round((current - old) / old * 100, 1) if old else None
+
+    previous = {row["concurrency"]: row for row in base["results"]}
+    rows = []
+    for row in new["results"]:
+        old = previous.get(row["concurrency"])
+        if not old:
+            continue
+        rows.append({
+            "concurrency": row["concurrency"],
+            "pins_per_second": change(old["pins_per_second"], row["pins_per_second"]),
+            "bytes_per_second": change(old["bytes_per_second"], row["bytes_per_second"]),
+            "p50": change(old["latency_ms"]["p50"], row["latency_ms"]["p50"]),
+            "p95": change(old["latency_ms"]["p95"], row["latency_ms"]["p95"]),
+            "p99": change(old["latency_ms"]["p99"], row["latency_ms"]["p99"]),
+            "peak_rss_mb": change(old["peak_rss_mb"], row["peak_rss_mb"]),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="قياس أداء نظام التحميل")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    locator = subparsers.add_parser("locator", help="قياس تحديد موقع الفيديو في حالة الصفحة")
+    locator.add_argument("--fixture", action="append", default=[], help="صفحة Pin مسجلة (HTML)")
+    locator.add_argument("--pin-id", default=None, help="معرف Pin للصفحات المسجلة")
+    locator.add_argument("--repeat", type=int, default=5)
+    locator.add_argument("--json", action="store_true", help="إخراج النتائج بصيغة JSON")
+
+    e2e = subparsers.add_parser("e2e", help="قياس التحميل الكامل مقابل خادم Pinterest محلي")
+    e2e.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    e2e.add_argument("--pins", type=int, default=64, help="أقل عدد Pins لكل مستوى")
+    e2e.add_argument("--rounds", type=int, default=2, help="أقل عدد Pins لكل خانة تزامن")
+    e2e.add_argument("--media-kb", type=int, default=1024, help="حجم كل فيديو")
+    e2e.add_argument("--hls-segments", type=int, default=4)
+    e2e.add_argument("--formats", choices=("hls", "mp4", "both"), default="both")
+    e2e.add_argument("--latency-ms", type=float, default=20.0, help="تأخير كل استجابة")
+    e2e.add_argument("--bandwidth-mbps", type=float, default=0.0, help="سرعة كل اتصال (0 بلا حد)")
+    e2e.add_argument("--related", type=int, default=100, help="Pins مقترحة في كل صفحة تركيبية")
+    e2e.add_argument("--fixture", default=None, help="صفحة Pin مسجلة (HTML) بدل الصفحات التركيبية")
+    e2e.add_argument("--fixture-pin-id", default=None, help="معرف Pin في الصفحة المسجلة")
+    e2e.add_argument("--resolve", choices=("html", "api"), default="html")
+    e2e.add_argument("--short-every", type=int, default=5, help="رابط pin.it كل N روابط (0 بلا روابط مختصرة)")
+    e2e.add_argument("--rate", type=float, default=0.0, help="حد الطلبات لكل مضيف في الثانية (0 بلا حد)")
+    e2e.add_argument("--output", default=None, help="ملف JSON للنتائج")
+    e2e.add_argument("--json", action="store_true", help="إخراج النتائج بصيغة JSON")
+
+    compare = subparsers.add_parser("compare", help="مقارنة تقريري e2e")
+    compare.add_argument("base")
+    compare.add_argument("new")
+
+    args = parser.parse_args()
+
+    if args.command == "e2e":
+        if args.fixture and not args.fixture_pin_id:
+            parser.error("--fixture يتطلب --fixture-pin-id")
+        fixture = (args.fixture_pin_id, Path(args.fixture).read_bytes()) if args.fixture else None
+        server_options = {
+            "media_bytes": args.media_kb * 1024,
+            "hls_segments": args.hls_segments,
+            "latency": args.latency_ms / 1000,
+            "bandwidth": args.bandwidth_mbps * 1_000_000 / 8,
+            "formats": ("hls", "mp4") if args.formats == "both" else (args.formats,),
+            "related_pins": args.related,
+            "fixture": fixture,
+        }
+        report = run_e2e_benchmark(
+            args.concurrency, args.pins, args.rounds, server_options,
+            resolve=args.resolve, short_every=args.short_every, rate=args.rate,
+        )
+        if args.output:
+            Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return
+
+        print(
+            f"{'conc':>5}{'pins':>6}{'fail':>5}{'pins/s':>9}{'MB/s':>8}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'RSS MB':>8}"
+        )
+        for row in report["results"]:
+            latency = row["latency_ms"]
+            print(
+                f"{row['concurrency']:>5}{row['pins']:>6}{row['failed']:>5}{row['pins_per_second']:>9.1f}"
+                f"{row['bytes_per_second'] / 1024 ** 2:>8.1f}{latency['p50']:>9.1f}{latency['p95']:>9.1f}"
+                f"{latency['p99']:>9.1f}{row['peak_rss_mb']:>8.1f}"
+            )
+        return
+
+    if args.command == "compare":
+        base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+        new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+        print(f"{base.get('commit')} -> {new.get('commit')} (% change)")
+        print(f"{'conc':>5}{'pins/s':>9}{'bytes/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'RSS':>8}")
+        for row in compare_reports(base, new):
+            values = [row[key] for key in ("pins_per_second", "bytes_per_second", "p50", "p95", "p99")]
+            values.append(row["peak_rss_mb"])
+            print(f"{row['concurrency']:>5}" + "".join(
+                f"{'n/a' if value is None else f'{value:+.1f}':>{9 if index < 2 else 8}}"
+                for index, value in enumerate(values)
+            ))
+        return
+
+    if args.command == "locator":
+        if args.fixture:
+            fixtures = [(Path(p).name, args.pin_id, Path(p).read_bytes()) for p in args.fixture]
+        else:
+            pin_id = "424242"
+            fixtures = [
+                (f"{layout}-{count}", pin_id, build_fixture_page(pin_id, count, layout))
+                for layout in ("redux", "nested")
+                for count in (0, 100, 1000, 5000)
+            ]
+
+        results = run_locator_benchmark(fixtures, args.repeat)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+
+        print(f"{'fixture':<16}{'block KB':>10}{'json ms':>10}{'locate ms':>11}{'legacy ms':>11}  correct")
+        for row in results:
+            print(
+                f"{row['fixture']:<16}{row['block_bytes'] / 1024:>10.0f}{row['json_ms']:>10.2f}"
+                f"{row['locate_ms']:>11.3f}{row['legacy_ms']:>11.3f}  "
+                f"{'yes' if row['locate_correct'] else 'NO'} / legacy {'yes' if row['legacy_correct'] else 'no'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,20 @@
 """
 
 import os
+import sys
 import logging
+import argparse
 import asyncio
-from typing import Optional
+import io
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from telegram import Update
+from telegram import InputMediaVideo, Update
+from telegram.error import TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -19,9 +28,14 @@ from telegram.ext import (
     filters,
 )
 from telegram.constants import ParseMode
+from telegram.request import BaseRequest
 
-from database import Database
-from downloader import PinterestDownloader
+from metrics import REGISTRY, THROUGHPUT_BUCKETS, MetricBindings, start_metrics_server
+
+# قاعدة البيانات (sqlmodel) والمحمّل (aiohttp) أبطأ استيرادات البدء: تُستورد عند أول استخدام
+if TYPE_CHECKING:
+    from database import AsyncDatabase
+    from downloader import PinterestDownloader, SingleFlight
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -29,6 +43,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# الحد الأقصى لعناصر ألبوم Telegram الواحد
+MEDIA_GROUP_LIMIT = 10
+
 REQUIRED_CHANNEL = "@Garren_Store"
 REQUIRED_CHANNEL_ID = "-1002353060403"
 
@@ -36,24 +53,229 @@ REQUIRED_CHANNEL_ID = "-1002353060403"
 class PinterestBot:
     """Telegram bot for downloading Pinterest videos with forced channel subscription"""
 
-    def __init__(self, token: str, admin_id: Optional[int] = None, use_webhook: bool = False):
+    def __init__(
+        self,
+        token: str,
+        admin_id: Optional[int] = None,
+        use_webhook: bool = False,
+        db: Optional["AsyncDatabase"] = None,
+        downloader: Optional["PinterestDownloader"] = None,
+        request: Optional[BaseRequest] = None,
+    ):
         self.token = token
         self.admin_id = admin_id
-        self.db = Database()
-        self.downloader = PinterestDownloader()
+        # قاعدة البيانات والمحمّل وطلبات Bot API قابلة للاستبدال (مثل اختبار الحمل)،
+        # وإلا تُنشأ في الخلفية بعد بدء استقبال التحديثات أو عند أول استخدام
+        self._db = db
+        self._downloader = downloader
+        self._inflight: Optional["SingleFlight"] = None
+        self._components_lock = threading.Lock()
+        self._components_loaded = False
+        self._warmup_task: Optional[asyncio.Task] = None
+        # حد رفع Bot API (50MB، أو حتى 2000MB مع خادم Bot API محلي)
+        self.upload_limit = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+        # وضع البث: من CDN إلى الرفع دون ملف تحميل. يقرأ Telegram الفيديو كاملاً في الذاكرة عند الرفع،
+        # فالحد هو أقصى حجم فيديو يُرفع من الذاكرة، وما يتجاوزه يمر بالتحميل العادي إلى ملف
+        self.stream_uploads = os.getenv("STREAM_UPLOADS", "false").lower() == "true"
+        self.stream_memory_limit = int(os.getenv("STREAM_MEMORY_MB", "20")) * 1024 * 1024
+        # الحد الأقصى للفيديوهات المرسلة من لوحة أو ملف شخصي في طلب واحد
+        self.collection_max_pins = int(os.getenv("COLLECTION_MAX_PINS", "20"))
+        # الرسائل متعددة الروابط: أقصى عدد روابط، وأقصى حجم لألبوم واحد (يُقرأ كاملاً في الذاكرة عند الرفع)
+        self.max_links_per_message = int(os.getenv("MAX_LINKS_PER_MESSAGE", "20"))
+        self.media_group_bytes = int(os.getenv("MEDIA_GROUP_MB", "200")) * 1024 * 1024
+        self._maintenance_task: Optional[asyncio.Task] = None
         self.use_webhook = use_webhook
+        # خادم مقاييس Prometheus: يعمل دائماً في وضع webhook، وفي polling عند ضبط METRICS_PORT
+        self.metrics_port = int(os.getenv("METRICS_PORT", "0")) or (9090 if use_webhook else None)
+        self._metrics_runner = None
+        # التحديثات تُعالج بالتوازي: رابط قيد التحميل لا يؤخر /start و /stats،
+        # والطلبات المتزامنة لنفس Pin تُدمج في تحميل واحد
+        self.concurrent_updates = int(os.getenv("CONCURRENT_UPDATES", "32"))
 
-        self.app = Application.builder().token(token).build()
+        builder = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(self.concurrent_updates)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+        )
+        if request:
+            builder = builder.request(request)
+        self.app = builder.build()
 
         self._setup_handlers()
-        self._init_settings()
+        self._setup_metrics()
         logger.info("Bot initialized successfully")
 
+    @property
+    def db(self) -> "AsyncDatabase":
+        self._load_components()
+        return self._db
+
+    @property
+    def downloader(self) -> "PinterestDownloader":
+        self._load_components()
+        return self._downloader
+
+    @property
+    def inflight(self) -> "SingleFlight":
+        # طلبات متزامنة لنفس Pin تشترك في تحميل ورفع واحد
+        self._load_components()
+        return self._inflight
+
+    def _load_components(self):
+        """Import and create the database, downloader and request coalescer once (thread-safe)"""
+        if self._components_loaded:
+            return
+        with self._components_lock:
+            if self._components_loaded:
+                return
+            from database import AsyncDatabase
+            from downloader import SingleFlight
+
+            if self._db is None:
+                self._db = AsyncDatabase()
+            if self._downloader is None:
+                self._downloader = self._create_downloader(self._db)
+            self._downloader.recover_partial_downloads()
+            self._inflight = SingleFlight()
+            self._components_loaded = True
+        self._init_settings()
+
+    @staticmethod
+    def _create_downloader(db: "AsyncDatabase") -> "PinterestDownloader":
+        from downloader import (
+            AdaptiveRateLimiter,
+            PinterestDownloader,
+            HTTPSessionManager,
+            PinResolutionCache,
+            ShortLinkCache,
+        )
+
+        return PinterestDownloader(
+            session_manager=HTTPSessionManager(
+                limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+                limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20")),
+            ),
+            parse_executor=os.getenv("PARSE_EXECUTOR", "thread"),
+            parse_workers=int(os.getenv("PARSE_WORKERS", "0")) or None,
+            resolution_cache=PinResolutionCache(
+                ttl_seconds=float(os.getenv("PIN_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("PIN_CACHE_SIZE", "2048")),
+                store=db,
+            ),
+            short_link_cache=ShortLinkCache(store=db),
+            store_quota_bytes=int(os.getenv("STORE_QUOTA_MB", "2048")) * 1024 * 1024,
+            rate_limiter=AdaptiveRateLimiter(
+                rate=float(os.getenv("PINTEREST_RATE", "2")),
+                burst=int(os.getenv("PINTEREST_BURST", "5")),
+            ),
+            hls_concurrency=int(os.getenv("HLS_CONCURRENCY", "8")),
+            # 1 يعطل التحميل المقسم بطلبات Range المتوازية
+            range_connections=int(os.getenv("RANGE_CONNECTIONS", "4")),
+            range_part_size=int(os.getenv("RANGE_PART_MB", "4")) * 1024 * 1024,
+            max_retries=int(os.getenv("DOWNLOAD_RETRIES", "3")),
+            # 0 يعطل طلبات التحوّط
+            hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", "95")) or None,
+            stream_buffer_bytes=int(os.getenv("STREAM_BUFFER_MB", "4")) * 1024 * 1024,
+            api_base_url=os.getenv("PINTEREST_API_BASE_URL", "https://www.pinterest.com"),
+            api_fast_path=os.getenv("PIN_API_FAST_PATH", "true").lower() == "true",
+            partial_retention_hours=float(os.getenv("PARTIAL_RETENTION_HOURS", "6")),
+        )
+
+    async def _post_init(self, application: Application):
+        # يبدأ استقبال التحديثات فوراً، وتُحمّل المكونات الثقيلة في الخلفية
+        self._warmup_task = asyncio.create_task(self._warm_up())
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def _warm_up(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._load_components)
+            # جلسة HTTP واحدة مشتركة طوال عمر البوت
+            await self._downloader.start()
+            if self.metrics_port:
+                self._metrics_runner = await start_metrics_server(REGISTRY, port=self.metrics_port)
+        except Exception:
+            logger.exception("Background warm-up failed")
+            return
+        logger.info(f"Background warm-up finished in {time.perf_counter() - started:.2f}s")
+
+    async def _wait_ready(self):
+        # انتظار التحميل في الخلفية بدل حجب حلقة الأحداث عند وصول أول تحديث أثناءه
+        if self._warmup_task and not self._warmup_task.done():
+            await asyncio.wait({self._warmup_task})
+
+    async def _post_shutdown(self, application: Application):
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+        if self._warmup_task:
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+        self._metric_bindings.unbind()
+        if self._components_loaded:
+            await self._downloader.close()
+            await asyncio.to_thread(self._db.close)
+
+    def _setup_metrics(self):
+        # زمن كل طلب وعدد الطلبات الجارية وطول طابور التحديثات، مع زمن وسرعة الرفع إلى Telegram
+        self._request_seconds = REGISTRY.histogram(
+            "bot_request_seconds", "Time from receiving a link to answering it", ["kind"]
+        )
+        self._active_requests = REGISTRY.gauge("bot_active_requests", "Link messages being handled")
+        self._upload_seconds = REGISTRY.histogram("bot_upload_seconds", "Telegram upload duration", ["mode"])
+        self._upload_throughput = REGISTRY.histogram(
+            "bot_upload_bytes_per_second", "Telegram upload throughput", ["mode"], THROUGHPUT_BUCKETS
+        )
+        # PTB يقرأ كل ملف مرفوع كاملاً في الذاكرة، فهذا هو حجم الذاكرة الفعلي للرفع
+        self._upload_buffer = REGISTRY.gauge("bot_upload_buffer_bytes", "Video bytes held in memory for uploads")
+        self._upload_buffer_peak = REGISTRY.gauge(
+            "bot_upload_buffer_peak_bytes", "Highest video bytes held in memory for uploads at once"
+        )
+        # تُقرأ عبر مرجع ضعيف إلى البوت وتُفصل عند إيقافه
+        self._metric_bindings = MetricBindings(self)
+        self._metric_bindings.bind(
+            REGISTRY.gauge("bot_update_queue_depth", "Updates waiting to be processed"),
+            lambda bot: bot.app.update_queue.qsize(),
+        )
+        self._metric_bindings.bind(
+            REGISTRY.gauge("bot_inflight_pins", "Pins being downloaded and uploaded"),
+            lambda bot: bot._inflight.in_flight if bot._inflight else 0,
+        )
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """In-process view of all metrics (for polling deployments without a scrape endpoint)"""
+        return REGISTRY.snapshot()
+
+    @contextmanager
+    def _buffered_upload(self, size: int):
+        self._upload_buffer.inc(size)
+        self._upload_buffer_peak.set_max(self._upload_buffer.value())
+        try:
+            yield
+        finally:
+            self._upload_buffer.dec(size)
+
+    def _record_upload(self, mode: str, size: int, started: float):
+        elapsed = time.perf_counter() - started
+        self._upload_seconds.observe(elapsed, mode=mode)
+        if elapsed > 0 and size:
+            self._upload_throughput.observe(size / elapsed, mode=mode)
+
+    async def _maintenance_loop(self, interval_seconds: int = 1800):
+        # حذف نسخ الطلبات القديمة والملفات الجزئية المهملة بشكل دوري
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.downloader.cleanup_old_files)
+
     def _init_settings(self):
-        if not self.db.get_setting("channel_username"):
-            self.db.set_setting("channel_username", REQUIRED_CHANNEL)
-        if not self.db.get_setting("channel_id"):
-            self.db.set_setting("channel_id", REQUIRED_CHANNEL_ID)
+        # يُستدعى من خيط التحميل في الخلفية، فيستخدم الواجهة المتزامنة مباشرة
+        db = self._db.sync
+        if not db.get_setting("channel_username"):
+            db.set_setting("channel_username", REQUIRED_CHANNEL)
+        if not db.get_setting("channel_id"):
+            db.set_setting("channel_id", REQUIRED_CHANNEL_ID)
 
     def _setup_handlers(self):
         self.app.add_handler(CommandHandler("start", self.start_command))
@@ -72,14 +294,40 @@ class PinterestBot:
         )
 
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        total_users = self.db.get_total_users()
-        total_videos = self.db.get_total_videos()
+        await self._wait_ready()
+        # العدادات والتجميعات اليومية محدثة مع كل إضافة، فلا تُعد الجداول هنا
+        stats = await self.db.get_stats(days=1, top=0)
+        today = stats["today"]
         await update.message.reply_text(
-            f"📊 Bot Stats:\n\n👥 Users: {total_users}\n🎬 Videos Downloaded: {total_videos}"
+            f"📊 Bot Stats:\n\n👥 Users: {stats['total_users']}\n🎬 Videos Downloaded: {stats['total_videos']}\n\n"
+            f"📅 Today: {today.active_users} active users, {today.downloads} downloads"
         )
 
     async def admin_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await update.message.reply_text("⚙️ Admin Panel coming soon...")
+        if self.admin_id is None or update.effective_user.id != self.admin_id:
+            await update.message.reply_text("⛔ This command is for the bot admin only.")
+            return
+
+        await self._wait_ready()
+        stats = await self.db.get_stats(days=7, top=5)
+        lines = [
+            "⚙️ Admin Panel",
+            "",
+            f"👥 Users: {stats['total_users']}",
+            f"🎬 Videos: {stats['total_videos']}",
+            "",
+            "📅 Last 7 days (active / new / downloads):",
+        ]
+        lines += [f"{row.day}: {row.active_users} / {row.new_users} / {row.downloads}" for row in stats["daily"]]
+        if not stats["daily"]:
+            lines.append("No activity yet.")
+        if stats["top_videos"]:
+            lines += ["", "🔥 Top pins:"]
+            lines += [
+                f"{index}. {video.title or video.url} ({video.download_count})"
+                for index, video in enumerate(stats["top_videos"], 1)
+            ]
+        await update.message.reply_text("\n".join(lines), disable_web_page_preview=True)
 
     async def setchannel_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("🔧 Set channel feature not implemented yet.")
@@ -88,12 +336,353 @@ class PinterestBot:
         await update.callback_query.answer("👌 Button clicked.")
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        url = update.message.text.strip()
-        if not self.downloader.is_pinterest_url(url):
+        await self._wait_ready()
+        # كل روابط الرسالة بمسح واحد (قد تحتوي الرسالة على نص وعدة روابط)
+        urls = self.downloader.extract_pinterest_urls(update.message.text)
+        if not urls:
             await update.message.reply_text("❌ Invalid link! Please send a Pinterest video link.")
             return
 
-        await update.message.reply_text("⬇️ Downloading video... (demo mode)")
+        started = time.perf_counter()
+        kind = "pin" if len(urls) == 1 else "multi"
+        with self._active_requests.track_inprogress():
+            try:
+                if len(urls) == 1:
+                    kind = await self._handle_link(urls[0], update)
+                else:
+                    await self._handle_links(urls[:self.max_links_per_message], update)
+            finally:
+                self._request_seconds.observe(time.perf_counter() - started, kind=kind)
+
+    async def _handle_link(self, url: str, update: Update) -> str:
+        """Answer a Pinterest link and return its kind (pin or collection) for metrics"""
+        user = update.effective_user
+        await self.db.add_user(user.id, user.username, user.first_name)
+
+        status = await update.message.reply_text("⬇️ Downloading video...")
+
+        collection = await self.downloader.resolve_collection(url)
+        if collection:
+            if await self._handle_collection(url, collection, update, status):
+                await status.delete()
+            else:
+                await status.edit_text("❌ No downloadable videos found at this link.")
+            return "collection"
+
+        pin_id = await self.downloader.resolve_pin_id(url)
+        if not pin_id:
+            await status.edit_text("❌ Could not read this Pinterest link.")
+            return "pin"
+
+        cache_key = self.downloader.canonical_pin_url(pin_id)
+        delivered = False
+
+        async def deliver() -> Optional[str]:
+            # يُنفذ مرة واحدة لكل Pin مهما تعدد الطلبات المتزامنة
+            nonlocal delivered
+            cached = await self.db.get_downloaded_video(cache_key)
+            if cached:
+                return cached.file_id
+            file_id = await self._download_and_upload(cache_key, update)
+            delivered = file_id is not None
+            return file_id
+
+        try:
+            file_id = await self.inflight.do(pin_id, deliver)
+            if not file_id:
+                await status.edit_text("❌ Failed to download this video. Please try again later.")
+                return "pin"
+
+            # الطلبات المكررة تعيد استخدام file_id الخاص بالرفع الأول
+            if not delivered:
+                await update.message.reply_video(video=file_id)
+                await self.db.add_downloaded_video(cache_key, file_id)
+            await status.delete()
+        except TelegramError as e:
+            logger.error(f"Failed to deliver pin {pin_id}: {e}")
+            await status.edit_text("❌ Failed to send the video. Please try again later.")
+        return "pin"
+
+    async def _handle_links(self, urls: List[str], update: Update):
+        """Download all pins of a multi-link message concurrently and reply with media groups"""
+        user = update.effective_user
+        await self.db.add_user(user.id, user.username, user.first_name)
+
+        status = await update.message.reply_text(f"⬇️ Downloading {len(urls)} videos...")
+
+        # توسيع الروابط المختصرة بالتوازي ثم حذف المكرر بمعرف Pin
+        pin_ids = await asyncio.gather(*(self.downloader.resolve_pin_id(url) for url in urls))
+        pin_urls = list(dict.fromkeys(
+            self.downloader.canonical_pin_url(pin_id) for pin_id in pin_ids if pin_id
+        ))
+        # روابط اللوحات والملفات الشخصية تُرسل فيديوهاتها بعد Pins مع نفس رسالة الحالة
+        other_urls = [url for url, pin_id in zip(urls, pin_ids) if not pin_id]
+
+        # (رابط Pin، file_id محفوظ أو None، نتيجة التحميل أو None)
+        pending: List[Tuple[str, Optional[str], Optional[dict]]] = []
+        pending_bytes = 0
+        sent = 0
+
+        async def flush():
+            nonlocal pending, pending_bytes, sent
+            batch, pending, pending_bytes = pending, [], 0
+            try:
+                sent += await self._send_media_group(batch, update)
+            except TelegramError as e:
+                logger.error(f"Failed to send media group: {e}")
+
+        async def send_single(pin_url: str, result: dict):
+            nonlocal sent
+            try:
+                await self._upload_result(pin_url, result, update)
+                sent += 1
+            except (TelegramError, OSError) as e:
+                logger.error(f"Failed to send pin {pin_url}: {e}")
+
+        missing = []
+        for pin_url in pin_urls:
+            cached = await self.db.get_downloaded_video(pin_url)
+            if cached:
+                pending.append((pin_url, cached.file_id, None))
+                if len(pending) == MEDIA_GROUP_LIMIT:
+                    await flush()
+            else:
+                missing.append(pin_url)
+
+        async for item in self.downloader.download_many(missing, max_bytes=self.upload_limit):
+            result = item["result"]
+            if not result or item["duplicate_of"]:
+                continue
+            if result["filepath"].endswith(".ts"):
+                # ألبومات الفيديو لا تقبل المستندات: يُرسل وحده
+                await send_single(item["url"], result)
+                continue
+            if pending_bytes + result["filesize"] > self.media_group_bytes and pending:
+                await flush()
+            pending.append((item["url"], None, result))
+            pending_bytes += result["filesize"]
+            if len(pending) == MEDIA_GROUP_LIMIT:
+                await flush()
+        if pending:
+            await flush()
+
+        # روابط Pins التي لم تُرسل والروابط التي لم تُقرأ والمجموعات الفارغة
+        failed = len(pin_urls) - sent
+        for url in other_urls:
+            collection = await self.downloader.resolve_collection(url)
+            collection_sent = await self._handle_collection(url, collection, update, status) if collection else 0
+            sent += collection_sent
+            failed += 0 if collection_sent else 1
+
+        if not failed:
+            await status.delete()
+        elif sent:
+            total = len(pin_urls) + len(other_urls)
+            await status.edit_text(f"⚠️ Sent {sent} videos, {failed} of {total} links failed.")
+        else:
+            await status.edit_text("❌ Failed to download these videos. Please try again later.")
+
+    async def _send_media_group(
+        self, batch: List[Tuple[str, Optional[str], Optional[dict]]], update: Update
+    ) -> int:
+        """Send up to 10 videos as one album, record new file_ids and remove the local copies"""
+        if len(batch) == 1:
+            # الألبوم يتطلب عنصرين على الأقل
+            pin_url, file_id, result = batch[0]
+            if not result:
+                await update.message.reply_video(video=file_id)
+                return 1
+            try:
+                await self._upload_result(pin_url, result, update)
+            except OSError as e:
+                logger.error(f"Skipping pin {pin_url}, its downloaded file could not be read: {e}")
+                return 0
+            return 1
+
+        try:
+            media = []
+            readable = []
+            for pin_url, file_id, result in batch:
+                if result:
+                    # يقرأ InputMediaVideo الملف في الذاكرة فوراً
+                    try:
+                        with open(result["filepath"], "rb") as video:
+                            media.append(InputMediaVideo(
+                                video,
+                                caption=result["title"][:1024],
+                                supports_streaming=True,
+                                filename=os.path.basename(result["filepath"]),
+                            ))
+                    except OSError as e:
+                        logger.error(f"Skipping pin {pin_url}, its downloaded file could not be read: {e}")
+                        continue
+                else:
+                    media.append(InputMediaVideo(file_id))
+                readable.append((pin_url, file_id, result))
+
+            if len(readable) < 2:
+                return await self._send_media_group(readable, update) if readable else 0
+
+            uploaded = sum(result["filesize"] for _, _, result in readable if result)
+            started = time.perf_counter()
+            with self._buffered_upload(uploaded):
+                messages = await update.message.reply_media_group(media=media, read_timeout=120, write_timeout=120)
+            self._record_upload("media_group", uploaded, started)
+        finally:
+            for _, _, result in batch:
+                if result:
+                    self.downloader.cleanup_file(result["filepath"])
+
+        for (pin_url, _, result), message in zip(readable, messages):
+            attachment = message.video or message.document
+            if result and attachment:
+                await self.db.add_downloaded_video(pin_url, attachment.file_id, title=result["title"])
+        return len(messages)
+
+    async def _download_and_upload(self, pin_url: str, update: Update) -> Optional[str]:
+        """Download a pin, upload it to the requesting chat and return its Telegram file_id"""
+        if self.stream_uploads:
+            streamed = await self._receive_stream(pin_url)
+            if streamed and "filepath" in streamed:
+                return await self._upload_result(pin_url, streamed, update)
+            if streamed:
+                return await self._upload_streamed(pin_url, streamed, update)
+
+        result = await self.downloader.download_video(pin_url, max_bytes=self.upload_limit)
+        if not result:
+            return None
+        return await self._upload_result(pin_url, result, update)
+
+    async def _upload_result(self, pin_url: str, result: dict, update: Update) -> str:
+        """Upload a downloaded video file, record its file_id and remove the local copy"""
+        try:
+            started = time.perf_counter()
+            with open(result["filepath"], "rb") as video, self._buffered_upload(result["filesize"]):
+                message = await self._reply_upload(
+                    update, video, os.path.basename(result["filepath"]), result["title"]
+                )
+            self._record_upload("file", result["filesize"], started)
+        finally:
+            self.downloader.cleanup_file(result["filepath"])
+
+        attachment = message.video or message.document
+        await self.db.add_downloaded_video(pin_url, attachment.file_id, title=result["title"])
+        return attachment.file_id
+
+    async def _handle_collection(self, url: str, collection: dict, update: Update, status) -> int:
+        """Send the videos of a board, section or profile as they finish downloading and return how many were sent"""
+        await status.edit_text(f"📌 Collecting videos from this {collection['type']}...")
+        sent = 0
+
+        async def pending_urls():
+            # الفيديوهات المرسلة سابقاً تُعاد بمعرفها دون تحميل
+            nonlocal sent
+            async for pin_id in self.downloader.iter_collection_pins(url, self.collection_max_pins):
+                pin_url = self.downloader.canonical_pin_url(pin_id)
+                cached = await self.db.get_downloaded_video(pin_url)
+                if cached:
+                    await update.message.reply_video(video=cached.file_id)
+                    sent += 1
+                else:
+                    yield pin_url
+
+        try:
+            async for item in self.downloader.download_many(pending_urls(), max_bytes=self.upload_limit):
+                # Pin المكرر في المجموعة يشارك نتيجة أول ظهور له وقد أُرسل معه
+                if item["result"] and not item["duplicate_of"]:
+                    await self._upload_result(item["url"], item["result"], update)
+                    sent += 1
+        except TelegramError as e:
+            logger.error(f"Failed to deliver collection {url}: {e}")
+        return sent
+
+    async def _receive_stream(self, pin_url: str) -> Optional[dict]:
+        """Read a pin from the CDN into memory if it fits STREAM_MEMORY_MB, otherwise into a temporary file"""
+        stream = await self.downloader.stream_video(pin_url, max_bytes=self.upload_limit)
+        if not stream:
+            return None
+
+        info = stream.info
+        buffer: Optional[io.BytesIO] = io.BytesIO()
+        spill = None
+        async with stream:
+            # الحجم الدقيق أو المقدر يحدد مسبقاً هل يتسع الفيديو للذاكرة
+            expected = stream.size or stream.estimated_size
+            try:
+                if expected is None or expected > self.stream_memory_limit:
+                    logger.info(f"Pin {info['pin_id']} may exceed the stream memory limit, streaming to disk")
+                    buffer, spill = None, await self._open_spill_file(info)
+                async for chunk in stream:
+                    if buffer is not None and buffer.tell() + len(chunk) > self.stream_memory_limit:
+                        # تجاوز التقدير: ما وصل يُنقل إلى ملف ويكمل البث نفسه إليه دون إعادة التحميل
+                        logger.info(f"Pin {info['pin_id']} exceeded the stream memory limit, continuing on disk")
+                        spill = await self._open_spill_file(info)
+                        await spill.write(buffer.getbuffer())
+                        buffer = None
+                    if buffer is not None:
+                        buffer.write(chunk)
+                    else:
+                        await spill.write(chunk)
+            except Exception as e:
+                logger.error(f"Streaming pin {info['pin_id']} failed: {e}")
+                if spill is not None:
+                    await spill.close()
+                    self.downloader.cleanup_file(spill.name)
+                return None
+
+        if spill is not None:
+            await spill.close()
+            logger.info(f"Streamed pin {info['pin_id']}: {stream.received} bytes written to {spill.name}")
+            return {"filepath": spill.name, "filesize": stream.received, "title": info["title"]}
+
+        logger.info(f"Streamed pin {info['pin_id']}: {stream.received} bytes held in memory for upload")
+        buffer.seek(0)
+        return dict(info, data=buffer, filesize=stream.received)
+
+    @staticmethod
+    async def _open_spill_file(info: dict):
+        import aiofiles
+
+        fd, path = tempfile.mkstemp(prefix=f"pinterest_{info['pin_id']}_", suffix=f".{info['extension']}")
+        os.close(fd)
+        return await aiofiles.open(path, "wb")
+
+    async def _upload_streamed(self, pin_url: str, streamed: dict, update: Update) -> str:
+        """Upload a video held in memory and record its file_id"""
+        started = time.perf_counter()
+        with self._buffered_upload(streamed["filesize"]):
+            # BytesIO يُسلَّم كما هو: قراءته كاملة من البداية لا تنسخ البيانات
+            message = await self._reply_upload(
+                update,
+                streamed["data"],
+                f"pinterest_{streamed['pin_id']}.{streamed['extension']}",
+                streamed["title"],
+            )
+        self._record_upload("stream", streamed["filesize"], started)
+
+        attachment = message.video or message.document
+        await self.db.add_downloaded_video(pin_url, attachment.file_id, title=streamed["title"])
+        return attachment.file_id
+
+    async def _reply_upload(self, update: Update, video: Any, filename: str, caption: str):
+        """Send a video file, as a document when Telegram cannot play its container"""
+        if filename.endswith(".ts"):
+            # HLS بلا مقطع تهيئة يُحفظ MPEG-TS، ولا يعرضه Telegram كفيديو
+            return await update.message.reply_document(
+                document=video,
+                filename=filename,
+                caption=caption[:1024],
+                read_timeout=120,
+                write_timeout=120,
+            )
+        return await update.message.reply_video(
+            video=video,
+            filename=filename,
+            caption=caption[:1024],
+            supports_streaming=True,
+            read_timeout=120,
+            write_timeout=120,
+        )
 
     def run(self):
         if self.use_webhook:
@@ -112,7 +701,63 @@ class PinterestBot:
             self.app.run_polling(drop_pending_updates=True)
 
 
+def _import_times() -> List[Tuple[int, int, str]]:
+    """Import `bot` in a fresh interpreter with -X importtime: (depth, cumulative us, module) of its imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, int(cumulative), name.strip()))
+
+    # الوحدات تُطبع بعد ما تستورده، فوحدات bot المباشرة هي ما يسبقه بعمق 1
+    for index, (depth, _, name) in enumerate(rows):
+        if depth == 0 and name == "bot":
+            start = index
+            while start > 0 and rows[start - 1][0] > 0:
+                start -= 1
+            return rows[start:index + 1]
+    return rows
+
+
+def profile_startup(top: int = 15):
+    """Print the import and startup cost until polling/webhook can start, and the deferred warm-up cost"""
+    rows = _import_times()
+    total = next((cumulative for depth, cumulative, name in rows if name == "bot"), 0)
+    print(f"import bot: {total / 1000:.0f} ms (fresh interpreter)")
+    direct = sorted((row for row in rows if row[0] == 1), key=lambda row: -row[1])
+    for depth, cumulative, name in direct[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    started = time.perf_counter()
+    bot = PinterestBot(os.getenv("BOT_TOKEN") or "0:profile-startup")
+    constructed = time.perf_counter()
+    print(f"PinterestBot(): {(constructed - started) * 1000:.0f} ms")
+    print(f"ready to start polling/webhook: {total / 1000 + (constructed - started) * 1000:.0f} ms "
+          f"(plus Bot API initialization over the network)")
+
+    bot._load_components()
+    print(f"background warm-up (database, downloader, settings): {(time.perf_counter() - constructed) * 1000:.0f} ms")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Pinterest video downloader Telegram bot")
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="print import and startup timings, then exit"
+    )
+    if parser.parse_args().profile_startup:
+        profile_startup()
+        return
+
     token = os.getenv("BOT_TOKEN")
     admin_id_str = os.getenv("TELEGRAM_ADMIN_ID")
 
@@ -1,13 +1,39 @@
 """
 قاعدة البيانات لتخزين معلومات المستخدمين والروابط المحملة
 """
+import asyncio
+import functools
 import logging
-from datetime import datetime
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, List
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.dialects.sqlite import insert
 from sqlmodel import Field, SQLModel, create_engine, Session, select
 
 logger = logging.getLogger(__name__)
 
+# إعدادات SQLite لكل اتصال جديد: WAL يسمح بالقراءة أثناء الكتابة، و busy_timeout
+# ينتظر تحرر القفل بدل الفشل الفوري بخطأ "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "foreign_keys": "ON",
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """تطبيق SQLITE_PRAGMAS عند فتح كل اتصال في مجمع الاتصالات"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
 
 class User(SQLModel, table=True):
     """نموذج المستخدم في قاعدة البيانات"""
@@ -32,7 +58,51 @@ class DownloadedVideo(SQLModel, table=True):
     title: Optional[str] = None
     duration: Optional[int] = None
     downloaded_at: datetime = Field(default_factory=datetime.utcnow)
-    download_count: int = Field(default=1)
+    download_count: int = Field(default=1, index=True)
+
+
+class ResolvedPin(SQLModel, table=True):
+    """نموذج بيانات Pin المحللة (الطبقة الثانية لذاكرة التحليل المؤقتة)"""
+    __tablename__ = "resolved_pins"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    pin_id: str = Field(unique=True, index=True)
+    video_url: str
+    quality: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    thumbnail: Optional[str] = None
+    # الجودات البديلة بصيغة JSON (None في الصفوف السابقة لهذا العمود)
+    variants: Optional[str] = None
+    resolved_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ShortLink(SQLModel, table=True):
+    """نموذج الروابط المختصرة pin.it الموسعة"""
+    __tablename__ = "short_links"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    code: str = Field(unique=True, index=True)
+    target_url: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class StatCounter(SQLModel, table=True):
+    """نموذج العدادات الإجمالية المحدثة مع كل إضافة (بدل عد الجداول)"""
+    __tablename__ = "stat_counters"
+    
+    key: str = Field(primary_key=True)
+    value: int = Field(default=0)
+
+
+class DailyStats(SQLModel, table=True):
+    """نموذج الإحصائيات اليومية المجمعة مسبقاً"""
+    __tablename__ = "daily_stats"
+    
+    day: str = Field(primary_key=True)
+    active_users: int = Field(default=0)
+    new_users: int = Field(default=0)
+    downloads: int = Field(default=0)
 
 
 class BotSettings(SQLModel, table=True):
@@ -56,13 +126,63 @@ class Database:
             db_path: مسار ملف قاعدة البيانات
         """
         self.db_path = db_path
-        self.engine = create_engine(f"sqlite:///{db_path}")
+        # الاتصالات تُعاد استخدامها من المجمع، وتُضبط إعداداتها مرة واحدة عند فتحها
+        self.engine = create_engine(
+            f"sqlite:///{db_path}",
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(self.engine, "connect", _apply_sqlite_pragmas)
         self._create_tables()
         logger.info(f"تم تهيئة قاعدة البيانات: {db_path}")
     
     def _create_tables(self) -> None:
         """إنشاء جداول قاعدة البيانات"""
         SQLModel.metadata.create_all(self.engine)
+        # create_all لا يضيف الفهارس الجديدة إلى الجداول الموجودة مسبقاً
+        for index in DownloadedVideo.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        self._add_missing_columns(ResolvedPin)
+        self._seed_counters()
+    
+    def _add_missing_columns(self, model: type) -> None:
+        """إضافة الأعمدة الجديدة (القابلة لـ NULL) إلى جدول موجود مسبقاً، لأن create_all لا يعدل الجداول"""
+        table = model.__table__
+        existing = {column["name"] for column in inspect(self.engine).get_columns(table.name)}
+        with self.engine.begin() as connection:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    logger.info(f"تمت إضافة العمود {column.name} إلى الجدول {table.name}")
+    
+    def _seed_counters(self) -> None:
+        """تهيئة العدادات من الجداول مرة واحدة (قواعد البيانات السابقة لجدول العدادات)"""
+        with Session(self.engine) as session:
+            for key, model in (("users", User), ("videos", DownloadedVideo)):
+                if session.get(StatCounter, key) is None:
+                    total = session.exec(select(func.count()).select_from(model)).one()
+                    session.execute(insert(StatCounter).values(key=key, value=total).on_conflict_do_nothing())
+                    logger.info(f"تم تهيئة العداد {key}: {total}")
+            session.commit()
+    
+    @staticmethod
+    def _increment_counter(session: Session, key: str, amount: int = 1) -> None:
+        """زيادة عداد إجمالي داخل معاملة الإضافة نفسها (ذرية مع الكتّاب الآخرين)"""
+        statement = insert(StatCounter).values(key=key, value=amount)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[StatCounter.key],
+            set_={"value": StatCounter.value + amount}
+        ))
+    
+    @staticmethod
+    def _increment_daily(session: Session, **amounts: int) -> None:
+        """زيادة إحصائيات اليوم الحالي (active_users و new_users و downloads)"""
+        day = datetime.utcnow().date().isoformat()
+        statement = insert(DailyStats).values(day=day, **amounts)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[DailyStats.day],
+            set_={name: getattr(DailyStats, name) + amount for name, amount in amounts.items()}
+        ))
     
     def add_user(
         self, 
@@ -85,10 +205,14 @@ class Database:
             statement = select(User).where(User.user_id == user_id)
             user = session.exec(statement).first()
             
+            now = datetime.utcnow()
             if user:
+                # أول نشاط للمستخدم اليوم يُحسب في المستخدمين النشطين يومياً
+                if user.last_activity.date() < now.date():
+                    self._increment_daily(session, active_users=1)
                 user.username = username
                 user.first_name = first_name
-                user.last_activity = datetime.utcnow()
+                user.last_activity = now
             else:
                 user = User(
                     user_id=user_id,
@@ -96,6 +220,8 @@ class Database:
                     first_name=first_name
                 )
                 session.add(user)
+                self._increment_counter(session, "users")
+                self._increment_daily(session, active_users=1, new_users=1)
             
             session.commit()
             session.refresh(user)
@@ -167,8 +293,10 @@ class Database:
                     duration=duration
                 )
                 session.add(video)
+                self._increment_counter(session, "videos")
                 logger.info(f"تم إضافة فيديو جديد: {url}")
             
+            self._increment_daily(session, downloads=1)
             session.commit()
             session.refresh(video)
             return video
@@ -189,15 +317,152 @@ class Database:
     
     def get_total_users(self) -> int:
         """الحصول على عدد المستخدمين الكلي"""
-        with Session(self.engine) as session:
-            statement = select(User)
-            return len(session.exec(statement).all())
+        return self._get_counter("users")
     
     def get_total_videos(self) -> int:
         """الحصول على عدد الفيديوهات المحملة"""
+        return self._get_counter("videos")
+    
+    def _get_counter(self, key: str) -> int:
         with Session(self.engine) as session:
-            statement = select(DownloadedVideo)
-            return len(session.exec(statement).all())
+            counter = session.get(StatCounter, key)
+            return counter.value if counter else 0
+    
+    def get_daily_stats(self, days: int = 7) -> List[DailyStats]:
+        """
+        الحصول على الإحصائيات اليومية لآخر الأيام
+        
+        Args:
+            days: عدد الأيام (بما فيها اليوم الحالي)
+            
+        Returns:
+            قائمة الإحصائيات اليومية من الأحدث إلى الأقدم (الأيام بلا نشاط غير مدرجة)
+        """
+        since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+        with Session(self.engine) as session:
+            statement = select(DailyStats).where(DailyStats.day >= since).order_by(DailyStats.day.desc())
+            return list(session.exec(statement).all())
+    
+    def get_top_videos(self, limit: int = 5) -> List[DownloadedVideo]:
+        """
+        الحصول على أكثر الفيديوهات تحميلاً (عبر فهرس download_count)
+        
+        Args:
+            limit: عدد الفيديوهات
+            
+        Returns:
+            قائمة الفيديوهات مرتبة حسب عدد التحميلات
+        """
+        with Session(self.engine) as session:
+            statement = select(DownloadedVideo).order_by(DownloadedVideo.download_count.desc()).limit(limit)
+            return list(session.exec(statement).all())
+    
+    def get_stats(self, days: int = 7, top: int = 5) -> Dict[str, Any]:
+        """
+        ملخص الإحصائيات من العدادات والتجميعات اليومية
+        
+        Args:
+            days: عدد الأيام في الإحصائيات اليومية
+            top: عدد أكثر الفيديوهات تحميلاً
+            
+        Returns:
+            قاموس بالمجاميع والإحصائيات اليومية وأكثر الفيديوهات تحميلاً
+        """
+        today = datetime.utcnow().date().isoformat()
+        daily = self.get_daily_stats(days)
+        return {
+            "total_users": self.get_total_users(),
+            "total_videos": self.get_total_videos(),
+            "today": next((row for row in daily if row.day == today), DailyStats(day=today)),
+            "daily": daily,
+            "top_videos": self.get_top_videos(top),
+        }
+    
+    def get_resolved_pin(self, pin_id: str) -> Optional[ResolvedPin]:
+        """
+        البحث عن بيانات Pin محللة مسبقاً
+        
+        Args:
+            pin_id: معرف Pin
+            
+        Returns:
+            كائن البيانات المحللة أو None
+        """
+        with Session(self.engine) as session:
+            statement = select(ResolvedPin).where(ResolvedPin.pin_id == pin_id)
+            return session.exec(statement).first()
+    
+    def save_resolved_pin(
+        self,
+        pin_id: str,
+        video_url: str,
+        quality: Optional[str] = None,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        thumbnail: Optional[str] = None,
+        variants: Optional[str] = None
+    ) -> None:
+        """
+        حفظ أو تحديث بيانات Pin المحللة
+        
+        Args:
+            pin_id: معرف Pin
+            video_url: رابط الفيديو
+            quality: جودة الفيديو
+            title: العنوان
+            description: الوصف
+            thumbnail: رابط الصورة المصغرة
+            variants: الجودات البديلة بصيغة JSON
+        """
+        with Session(self.engine) as session:
+            statement = select(ResolvedPin).where(ResolvedPin.pin_id == pin_id)
+            resolved = session.exec(statement).first()
+            
+            if not resolved:
+                resolved = ResolvedPin(pin_id=pin_id, video_url=video_url)
+                session.add(resolved)
+            
+            resolved.video_url = video_url
+            resolved.quality = quality
+            resolved.title = title
+            resolved.description = description
+            resolved.thumbnail = thumbnail
+            resolved.variants = variants
+            resolved.resolved_at = datetime.utcnow()
+            
+            session.commit()
+    
+    def get_short_link(self, code: str) -> Optional[str]:
+        """
+        البحث عن الرابط الكامل لرابط مختصر
+        
+        Args:
+            code: رمز الرابط المختصر (pin.it/<code>)
+            
+        Returns:
+            الرابط الكامل أو None
+        """
+        with Session(self.engine) as session:
+            statement = select(ShortLink).where(ShortLink.code == code)
+            link = session.exec(statement).first()
+            return link.target_url if link else None
+    
+    def save_short_link(self, code: str, target_url: str) -> None:
+        """
+        حفظ الرابط الكامل لرابط مختصر (لا يتغير هدف الروابط المختصرة)
+        
+        Args:
+            code: رمز الرابط المختصر
+            target_url: الرابط الكامل
+        """
+        with Session(self.engine) as session:
+            statement = select(ShortLink).where(ShortLink.code == code)
+            if session.exec(statement).first():
+                return
+            
+            session.add(ShortLink(code=code, target_url=target_url))
+            session.commit()
+            logger.info(f"تم حفظ الرابط المختصر: {code} -> {target_url}")
     
     def get_setting(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """
@@ -236,3 +501,106 @@ class Database:
             
             session.commit()
             logger.info(f"تم تحديث الإعداد: {key} = {value}")
+
+
+class AsyncDatabase:
+    """
+    واجهة غير حاجبة لـ Database: كل استعلام يُنفذ على خيط مخصص لقاعدة البيانات
+    بدل حلقة الأحداث، والاستعلامات تُنفذ بالتسلسل فلا تتنافس كتابات البوت على القفل
+    """
+    
+    def __init__(self, db_path: str = "pinterest_bot.db", database: Optional[Database] = None):
+        """
+        تهيئة قاعدة البيانات غير المتزامنة
+        
+        Args:
+            db_path: مسار ملف قاعدة البيانات
+            database: كائن Database قائم لاستخدامه بدل إنشاء واحد جديد
+        """
+        self.sync = database or Database(db_path)
+        self.db_path = self.sync.db_path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+    
+    async def _run(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+    
+    async def add_user(
+        self, 
+        user_id: int, 
+        username: Optional[str] = None, 
+        first_name: Optional[str] = None
+    ) -> User:
+        """إضافة مستخدم جديد أو تحديث معلوماته"""
+        return await self._run(self.sync.add_user, user_id, username, first_name)
+    
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """الحصول على معلومات المستخدم"""
+        return await self._run(self.sync.get_user, user_id)
+    
+    async def update_subscription_status(self, user_id: int, is_subscribed: bool) -> None:
+        """تحديث حالة اشتراك المستخدم"""
+        await self._run(self.sync.update_subscription_status, user_id, is_subscribed)
+    
+    async def add_downloaded_video(
+        self, 
+        url: str, 
+        file_id: str, 
+        title: Optional[str] = None,
+        duration: Optional[int] = None
+    ) -> DownloadedVideo:
+        """إضافة فيديو محمل إلى قاعدة البيانات"""
+        return await self._run(self.sync.add_downloaded_video, url, file_id, title, duration)
+    
+    async def get_downloaded_video(self, url: str) -> Optional[DownloadedVideo]:
+        """البحث عن فيديو محمل في قاعدة البيانات"""
+        return await self._run(self.sync.get_downloaded_video, url)
+    
+    async def get_total_users(self) -> int:
+        """الحصول على عدد المستخدمين الكلي"""
+        return await self._run(self.sync.get_total_users)
+    
+    async def get_total_videos(self) -> int:
+        """الحصول على عدد الفيديوهات المحملة"""
+        return await self._run(self.sync.get_total_videos)
+    
+    async def get_daily_stats(self, days: int = 7) -> List[DailyStats]:
+        """الحصول على الإحصائيات اليومية لآخر الأيام"""
+        return await self._run(self.sync.get_daily_stats, days)
+    
+    async def get_top_videos(self, limit: int = 5) -> List[DownloadedVideo]:
+        """الحصول على أكثر الفيديوهات تحميلاً"""
+        return await self._run(self.sync.get_top_videos, limit)
+    
+    async def get_stats(self, days: int = 7, top: int = 5) -> Dict[str, Any]:
+        """ملخص الإحصائيات من العدادات والتجميعات اليومية"""
+        return await self._run(self.sync.get_stats, days, top)
+    
+    async def get_resolved_pin(self, pin_id: str) -> Optional[ResolvedPin]:
+        """البحث عن بيانات Pin محللة مسبقاً"""
+        return await self._run(self.sync.get_resolved_pin, pin_id)
+    
+    async def save_resolved_pin(self, pin_id: str, video_url: str, **data: Any) -> None:
+        """حفظ أو تحديث بيانات Pin المحللة"""
+        await self._run(self.sync.save_resolved_pin, pin_id, video_url, **data)
+    
+    async def get_short_link(self, code: str) -> Optional[str]:
+        """البحث عن الرابط الكامل لرابط مختصر"""
+        return await self._run(self.sync.get_short_link, code)
+    
+    async def save_short_link(self, code: str, target_url: str) -> None:
+        """حفظ الرابط الكامل لرابط مختصر"""
+        await self._run(self.sync.save_short_link, code, target_url)
+    
+    async def get_setting(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """الحصول على إعداد من قاعدة البيانات"""
+        return await self._run(self.sync.get_setting, key, default)
+    
+    async def set_setting(self, key: str, value: str) -> None:
+        """تعيين إعداد في قاعدة البيانات"""
+        await self._run(self.sync.set_setting, key, value)
+    
+    def close(self) -> None:
+        """انتظار الاستعلامات الجارية ثم إغلاق الخيط والاتصالات"""
+        self._executor.shutdown(wait=True)
+        self.sync.engine.dispose()
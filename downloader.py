@@ -7,138 +7,2673 @@ import os
 import logging
 import re
 import json
+import shutil
 import asyncio
 import aiohttp
 import aiofiles
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable, AsyncIterator, AsyncIterable, Iterable, Union
 import hashlib
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from urllib.parse import urlparse, parse_qs, unquote
+from urllib.parse import urlparse, parse_qs, unquote, urljoin
 import time
 import random
-from fake_useragent import UserAgent
+import threading
+
+from metrics import REGISTRY, THROUGHPUT_BUCKETS, MetricBindings, MetricsRegistry
+from useragents import random_user_agent
 
 logger = logging.getLogger(__name__)
 
+# خصائص وسوم m3u8 مثل: BANDWIDTH=1280000,RESOLUTION=720x1280,CODECS="avc1,mp4a"
+_M3U8_ATTR_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
 
-class AdvancedPinterestDownloader:
-    """نظام تحميل متقدم لفيديوهات Pinterest"""
+# روابط Pinterest و pin.it داخل نص حر، مع البروتوكول أو بدونه (مسح واحد لكل الرسالة)
+_PINTEREST_LINK_RE = re.compile(
+    r'(?<![\w.-])(?:https?://)?(?:[a-z]{2,3}\.)?'
+    r'(?:pinterest\.[a-z]{2,3}(?:\.[a-z]{2})?(?:/[^\s<>"\']*)?|pin\.it/[a-z0-9]+)',
+    re.IGNORECASE
+)
+_PIN_PATH_RE = re.compile(r'/pin/(\d+)', re.IGNORECASE)
+
+# علامات الترقيم التي تلتصق بنهاية الرابط في النص
+_LINK_TRAILING = '.,;:!?)]}>\'"'
+
+# حالات HTTP المؤقتة التي تستحق إعادة المحاولة
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# الحد الأقصى لرفع الملفات عبر Telegram Bot API
+TELEGRAM_UPLOAD_LIMIT = 50 * 1024 * 1024
+
+
+class DownloadJournal:
+    """سجل تقدم التحميل على القرص بجانب الملف الجزئي لاستئناف التحميل بعد إعادة التشغيل"""
     
-    def __init__(self, download_dir: str = "downloads"):
+    SUFFIX = '.journal'
+    # حفظ السجل مع checkpoint كل SAVE_EVERY تحديثات أو كل SAVE_INTERVAL ثانية
+    SAVE_EVERY = 16
+    SAVE_INTERVAL = 2.0
+    
+    def __init__(self, data_path: Path, kind: str, source_url: str, total: int = 0, **identity: Any):
         """
-        تهيئة النظام المتقدم
+        فتح سجل موجود إن كان يطابق نفس التحميل، أو إنشاء سجل جديد
         
         Args:
-            download_dir: مجلد التحميل
+            data_path: مسار الملف الجزئي
+            kind: نوع التحميل (hls / ranged / stream)
+            source_url: رابط المصدر
+            total: عدد المقاطع أو حجم الملف الكلي
+            identity: حقول إضافية يجب أن تتطابق للاستئناف (مثل part_size)
         """
-        self.download_dir = Path(download_dir)
-        self.download_dir.mkdir(exist_ok=True)
+        self.data_path = data_path
+        self.path = data_path.with_name(data_path.name + self.SUFFIX)
+        self.state: Dict[str, Any] = {
+            'kind': kind,
+            'url': source_url,
+            'total': total,
+            'identity': identity,
+            'next_index': 0,
+            'offset': 0,
+            'done': [],
+            'updated_at': time.time(),
+        }
+        self.resumed = False
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
         
-        self.ua = UserAgent()
-        self.session = None
+        previous = self.read(data_path)
+        if (
+            previous
+            and data_path.exists()
+            and all(previous.get(key) == self.state[key] for key in ('kind', 'url', 'total', 'identity'))
+            and data_path.stat().st_size >= previous.get('offset', 0)
+        ):
+            self.state.update(previous)
+            self.resumed = True
+    
+    @classmethod
+    def read(cls, data_path: Path) -> Optional[Dict[str, Any]]:
+        """قراءة السجل المرتبط بملف جزئي، أو None إن لم يوجد أو كان تالفاً"""
+        journal_path = data_path.with_name(data_path.name + cls.SUFFIX)
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            return state if isinstance(state, dict) else None
+        except (OSError, ValueError):
+            return None
+    
+    def save(self, **changes: Any) -> None:
+        """تحديث السجل وحفظه بشكل ذري"""
+        self.state.update(changes)
+        self.state['updated_at'] = time.time()
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+    
+    def checkpoint(self, **changes: Any) -> None:
+        """
+        تحديث السجل في الذاكرة وحفظه على القرص دورياً فقط؛ التقدم غير المحفوظ
+        يُعاد تحميله عند الاستئناف (السجل لا يسبق البيانات المكتوبة أبداً)
+        """
+        self.state.update(changes)
+        self._unsaved += 1
+        if self._unsaved >= self.SAVE_EVERY or time.monotonic() - self._saved_at >= self.SAVE_INTERVAL:
+            self.save()
+    
+    def mark_done(self, index: int) -> None:
+        """تسجيل اكتمال جزء معين"""
+        if index not in self.state['done']:
+            self.state['done'].append(index)
+        self.save()
+    
+    def is_done(self, index: int) -> bool:
+        return index in self.state['done']
+    
+    def discard(self) -> None:
+        """حذف السجل بعد اكتمال التحميل أو إلغائه"""
+        if self.path.exists():
+            self.path.unlink()
+
+
+class HTTPSessionManager:
+    """جلسة HTTP مشتركة طويلة العمر مع تجميع اتصالات keep-alive لكل مضيف"""
+    
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+        total_timeout: float = 60,
+        connect_timeout: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+        resolver: Optional[aiohttp.abc.AbstractResolver] = None
+    ):
+        """
+        تهيئة مدير الجلسة (تُنشأ الجلسة فعلياً عند أول استخدام داخل حلقة الأحداث)
         
-        # Pinterest API endpoints
-        self.api_endpoints = {
-            'pin_data': 'https://www.pinterest.com/resource/PinResource/get/',
-            'video_data': 'https://www.pinterest.com/_ngjs/resource/PinResource/get/',
-            'search': 'https://www.pinterest.com/resource/BaseSearchResource/get/'
-        }
+        Args:
+            limit: الحد الأقصى لكل الاتصالات المفتوحة
+            limit_per_host: الحد الأقصى للاتصالات لكل مضيف
+            keepalive_timeout: مدة إبقاء الاتصال الخامل مفتوحاً بالثواني
+            ttl_dns_cache: مدة تخزين نتائج DNS بالثواني
+            total_timeout: المهلة الكلية للطلب بالثواني
+            connect_timeout: مهلة الاتصال بالثواني
+            headers: headers افتراضية للجلسة
+            resolver: محلل DNS بديل (مثل توجيه النطاقات إلى خادم محلي في قياس الأداء)
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.headers = headers
+        self.resolver = resolver
         
-        # Headers متقدمة تحاكي المتصفح الحقيقي
-        self.base_headers = {
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0'
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock: Optional[asyncio.Lock] = None
+    
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        الحصول على الجلسة المشتركة، وإنشاؤها مرة واحدة فقط حتى مع الاستدعاءات المتزامنة
+        
+        Returns:
+            جلسة aiohttp المشتركة
+        """
+        if not self.closed:
+            return self._session
+        
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            if self.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                    use_dns_cache=True,
+                    ssl=False,
+                    enable_cleanup_closed=True,
+                    resolver=self.resolver
+                )
+                
+                # إنشاء الجلسة مع دعم أفضل للتشفير
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=self.timeout,
+                    headers=self.headers,
+                    auto_decompress=True,  # فك الضغط التلقائي
+                    trust_env=True
+                )
+                logger.info(
+                    f"تم إنشاء جلسة HTTP مشتركة (limit={self.limit}, limit_per_host={self.limit_per_host})"
+                )
+        
+        return self._session
+    
+    async def close(self) -> None:
+        """إغلاق الجلسة وكل الاتصالات المفتوحة"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("تم إغلاق جلسة HTTP المشتركة")
+        self._session = None
+
+
+class PinPageExtractor:
+    """مستخرج تدريجي لكتلة بيانات الحالة من صفحة Pin أثناء قراءتها على دفعات"""
+    
+    # بدايات كتل بيانات الحالة المعروفة في صفحة Pin
+    BLOCK_START_RE = re.compile(
+        rb'<script[^>]*\bid="(?:__PWS_DATA__|__PWS_INITIAL_PROPS__)"[^>]*>'
+        rb'|window\.(?:__PWS_DATA__|__INITIAL_STATE__)\s*=\s*'
+    )
+    BLOCK_END = b'</script>'
+    TITLE_RE = re.compile(r'<title[^>]*>([^<]+)</title>')
+    OG_DESCRIPTION_RE = re.compile(r'property="og:description"\s+content="([^"]*)"')
+    
+    # أطول بداية كتلة ممكنة، لتجنب فقدان بداية مقسومة بين دفعتين
+    _OVERLAP = 128
+    
+    def __init__(self, encoding: str = 'utf-8', max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            encoding: ترميز الصفحة
+            max_bytes: أقصى حجم يُقرأ من الصفحة
+        """
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.block: Optional[bytes] = None
+        self._buffer = bytearray()
+        self._scan_pos = 0
+        self._block_start: Optional[int] = None
+    
+    @property
+    def text(self) -> str:
+        """النص المقروء حتى الآن"""
+        return self._buffer.decode(self.encoding, errors='replace')
+    
+    @property
+    def exhausted(self) -> bool:
+        """تم بلوغ الحد الأقصى للقراءة"""
+        return len(self._buffer) >= self.max_bytes
+    
+    def feed(self, chunk: bytes) -> bool:
+        """
+        إضافة دفعة جديدة من الصفحة
+        
+        Args:
+            chunk: البايتات المقروءة
+            
+        Returns:
+            True عند اكتمال كتلة بيانات (متاحة في self.block)
+        """
+        self._buffer += chunk
+        return self._scan()
+    
+    def skip_block(self) -> bool:
+        """
+        تجاهل الكتلة الحالية ومتابعة البحث فيما قُرئ بالفعل
+        
+        Returns:
+            True إذا اكتملت كتلة تالية
+        """
+        self.block = None
+        self._block_start = None
+        return self._scan()
+    
+    def _scan(self) -> bool:
+        """البحث من آخر موضع فقط، دون إعادة فحص ما سبق"""
+        if self.block is not None:
+            return True
+        
+        if self._block_start is None:
+            match = self.BLOCK_START_RE.search(self._buffer, self._scan_pos)
+            if not match:
+                self._scan_pos = max(self._scan_pos, len(self._buffer) - self._OVERLAP)
+                return False
+            self._block_start = match.end()
+            self._scan_pos = match.end()
+        
+        end = self._buffer.find(self.BLOCK_END, self._scan_pos)
+        if end == -1:
+            self._scan_pos = max(self._block_start, len(self._buffer) - len(self.BLOCK_END))
+            return False
+        
+        self.block = bytes(self._buffer[self._block_start:end]).strip().rstrip(b';')
+        self._scan_pos = end + len(self.BLOCK_END)
+        return True
+    
+    def mentions_pin(self, pin_id: str) -> bool:
+        """هل تحتوي الكتلة الحالية على عقدة بمعرف Pin المطلوب"""
+        if self.block is None:
+            return False
+        pattern = rb'"id":\s*"' + re.escape(pin_id.encode()) + rb'"'
+        return re.search(pattern, self.block) is not None
+    
+    def page_metadata(self) -> Dict[str, str]:
+        """العنوان والوصف والصورة المصغرة من وسوم الصفحة المقروءة"""
+        head = self._buffer[:self._block_start] if self._block_start else self._buffer
+        head = head.decode(self.encoding, errors='replace')
+        
+        title_match = self.TITLE_RE.search(head)
+        title = title_match.group(1).replace(' | Pinterest', '').strip() if title_match else ''
+        description_match = self.OG_DESCRIPTION_RE.search(head)
+        
+        return {
+            'title': title,
+            'description': description_match.group(1) if description_match else '',
+            'thumbnail': AdvancedPinterestDownloader._extract_thumbnail_from_html(head),
         }
+
+
+def parse_pin_block(raw: bytes, pin_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    تحليل كتلة بيانات صفحة Pin واستخراج الفيديو منها
+    (دالة نقية تعمل داخل مجمع الخيوط أو العمليات)
+    
+    Args:
+        raw: بايتات JSON لكتلة البيانات
+        pin_id: معرف Pin المطلوب
         
-        logger.info(f"تم تهيئة النظام المتقدم: {download_dir}")
+    Returns:
+        معلومات الفيديو أو None
+    """
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return None
     
-    async def __aenter__(self):
-        """إنشاء جلسة HTTP عند دخول السياق"""
-        connector = aiohttp.TCPConnector(
-            limit=30,
-            ttl_dns_cache=300,
-            use_dns_cache=True,
-            ssl=False,
-            enable_cleanup_closed=True
-        )
+    return AdvancedPinterestDownloader._extract_video_from_data(data, pin_id)
+
+
+async def _call_store(method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """استدعاء دالة الطبقة الدائمة: مباشرة إن كانت غير متزامنة (AsyncDatabase وخيطها المخصص)، وإلا في خيط"""
+    if asyncio.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await asyncio.to_thread(method, *args, **kwargs)
+
+
+class PinResolutionCache:
+    """ذاكرة مؤقتة لبيانات Pins المحللة حسب معرف Pin (LRU مع مدة صلاحية وطبقة SQLite اختيارية)"""
+    
+    FIELDS = ('video_url', 'quality', 'title', 'description', 'thumbnail')
+    
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 2048, store: Any = None):
+        """
+        Args:
+            ttl_seconds: مدة الصلاحية (أقل من مدة صلاحية روابط CDN)
+            max_entries: الحد الأقصى للعناصر في الذاكرة
+            store: طبقة ثانية تدعم get_resolved_pin و save_resolved_pin (مثل Database أو AsyncDatabase)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self.stats = {'hits': 0, 'store_hits': 0, 'misses': 0}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    async def get(self, pin_id: str) -> Optional[Dict[str, Any]]:
+        """
+        البحث عن بيانات Pin في الذاكرة ثم في الطبقة الثانية
+        
+        Args:
+            pin_id: معرف Pin
+            
+        Returns:
+            نسخة من البيانات المحللة أو None
+        """
+        entry = self._entries.get(pin_id)
+        if entry:
+            expires_at, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(pin_id)
+                self.stats['hits'] += 1
+                return dict(data, variants=list(data.get('variants') or []))
+            del self._entries[pin_id]
         
-        timeout = aiohttp.ClientTimeout(total=60, connect=30)
+        if self.store is not None:
+            try:
+                row = await _call_store(self.store.get_resolved_pin, pin_id)
+            except Exception as e:
+                logger.warning(f"فشل قراءة ذاكرة التحليل من قاعدة البيانات: {str(e)}")
+                row = None
+            
+            # الصفوف السابقة لعمود الجودات البديلة تُعامل كعدم وجود، لأن اختيار الجودة
+            # حسب الحجم لا يعمل بدونها
+            if row is not None and getattr(row, 'variants', None) is not None:
+                age = (datetime.utcnow() - row.resolved_at).total_seconds()
+                if age < self.ttl_seconds:
+                    data = {field: getattr(row, field) or '' for field in self.FIELDS}
+                    try:
+                        data['variants'] = json.loads(row.variants)
+                    except ValueError:
+                        data['variants'] = []
+                    self._remember(pin_id, data, self.ttl_seconds - age)
+                    self.stats['store_hits'] += 1
+                    return dict(data, variants=list(data['variants']))
         
-        # إنشاء الجلسة مع دعم أفضل للتشفير
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers=self.base_headers,
-            auto_decompress=True,  # فك الضغط التلقائي
-            trust_env=True
-        )
-        return self
+        self.stats['misses'] += 1
+        return None
     
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """إغلاق الجلسة عند الخروج من السياق"""
-        if self.session:
-            await self.session.close()
+    async def set(self, pin_id: str, video_data: Dict[str, Any]) -> None:
+        """
+        حفظ بيانات Pin محللة في الذاكرة والطبقة الثانية
+        
+        Args:
+            pin_id: معرف Pin
+            video_data: بيانات الفيديو المستخرجة
+        """
+        data = {field: video_data.get(field) or '' for field in self.FIELDS}
+        variants = list(video_data.get('variants') or [])
+        self._remember(pin_id, dict(data, variants=variants), self.ttl_seconds)
+        
+        if self.store is not None:
+            try:
+                await _call_store(self.store.save_resolved_pin, pin_id, variants=json.dumps(variants), **data)
+            except Exception as e:
+                logger.warning(f"فشل حفظ ذاكرة التحليل في قاعدة البيانات: {str(e)}")
     
-    def _get_fresh_headers(self) -> Dict[str, str]:
-        """إنشاء headers جديدة لكل طلب"""
-        headers = self.base_headers.copy()
-        headers['User-Agent'] = self.ua.random
+    def _remember(self, pin_id: str, data: Dict[str, Any], ttl: float) -> None:
+        self._entries[pin_id] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(pin_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ShortLinkCache:
+    """ذاكرة دائمة لتوسيع روابط pin.it المختصرة مع ذاكرة أمامية في الذاكرة"""
+    
+    def __init__(self, max_entries: int = 10000, store: Any = None):
+        """
+        Args:
+            max_entries: الحد الأقصى للعناصر في الذاكرة
+            store: طبقة دائمة تدعم get_short_link و save_short_link (مثل Database أو AsyncDatabase)
+        """
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self.stats = {'hits': 0, 'store_hits': 0, 'misses': 0}
+    
+    async def get(self, code: str) -> Optional[str]:
+        """
+        البحث عن الرابط الكامل لرمز مختصر
         
-        # إضافة headers عشوائية إضافية
-        additional_headers = [
-            ('DNT', '1'),
-            ('Sec-GPC', '1'),
-        ]
+        Args:
+            code: رمز الرابط المختصر
+            
+        Returns:
+            الرابط الكامل أو None
+        """
+        target_url = self._entries.get(code)
+        if target_url:
+            self._entries.move_to_end(code)
+            self.stats['hits'] += 1
+            return target_url
         
-        for header, value in random.sample(additional_headers, k=random.randint(0, 1)):
-            headers[header] = value
+        if self.store is not None:
+            try:
+                target_url = await _call_store(self.store.get_short_link, code)
+            except Exception as e:
+                logger.warning(f"فشل قراءة الرابط المختصر من قاعدة البيانات: {str(e)}")
+            
+            if target_url:
+                self._remember(code, target_url)
+                self.stats['store_hits'] += 1
+                return target_url
         
-        # التأكد من عدم طلب Brotli
-        headers['Accept-Encoding'] = 'gzip, deflate'
+        self.stats['misses'] += 1
+        return None
+    
+    async def set(self, code: str, target_url: str) -> None:
+        """
+        حفظ الرابط الكامل لرمز مختصر
+        
+        Args:
+            code: رمز الرابط المختصر
+            target_url: الرابط الكامل
+        """
+        self._remember(code, target_url)
+        
+        if self.store is not None:
+            try:
+                await _call_store(self.store.save_short_link, code, target_url)
+            except Exception as e:
+                logger.warning(f"فشل حفظ الرابط المختصر في قاعدة البيانات: {str(e)}")
+    
+    def _remember(self, code: str, target_url: str) -> None:
+        self._entries[code] = target_url
+        self._entries.move_to_end(code)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """دمج الطلبات المتزامنة لنفس المفتاح في عملية واحدة ينتظر الجميع نتيجتها"""
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {'leaders': 0, 'followers': 0}
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+    
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        تنفيذ func مرة واحدة لكل مفتاح قيد التنفيذ
+        
+        Args:
+            key: مفتاح الدمج (مثل معرف Pin)
+            func: دالة غير متزامنة تُستدعى فقط إن لم تكن هناك عملية جارية لنفس المفتاح
             
-        return headers
+        Returns:
+            نتيجة العملية المشتركة
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # العملية تعمل في مهمة مستقلة حتى لا يلغيها إلغاء الطلب الأول
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.stats['leaders'] += 1
+        else:
+            self.stats['followers'] += 1
+        
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+class KeyedLock:
+    """أقفال حسب المفتاح تُنشأ عند الحاجة وتُحذف عند انتهاء استخدامها"""
+    
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+    
+    def locked(self, key: str) -> bool:
+        entry = self._locks.get(key)
+        return entry is not None and entry[0].locked()
+    
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        """الانتظار حتى يتحرر قفل المفتاح ثم حجزه طوال تنفيذ الكتلة"""
+        lock, users = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+
+class ContentStore:
+    """مخزن ملفات معنون بالمحتوى (معرف Pin + بصمة المحتوى) مع حد أقصى للحجم وإخلاء LRU"""
+    
+    INDEX_NAME = 'index.json'
+    
+    def __init__(self, root: Path, quota_bytes: int = 2 * 1024 ** 3):
+        """
+        Args:
+            root: مجلد المخزن
+            quota_bytes: الحد الأقصى لحجم المخزن بالبايت
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.quota_bytes = quota_bytes
+        self._index_path = self.root / self.INDEX_NAME
+        # يحفظ flush الفهرس من خيط الصيانة بينما تعدله الحلقة: كل وصول إلى العناصر تحت القفل
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load_index()
+        # أوقات الوصول تُحدّث في الذاكرة عند كل إصابة وتُحفظ على دفعات عبر flush
+        self._dirty = False
+        self.stats = {'hits': 0, 'misses': 0, 'dedup': 0, 'evicted': 0}
+    
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry['size'] for entry in self._entries.values())
+    
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """تحميل الفهرس، أو إعادة بنائه من الملفات الموجودة إن كان مفقوداً أو تالفاً"""
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+            if not isinstance(entries, dict):
+                raise ValueError("فهرس غير صالح")
+        except (OSError, ValueError):
+            entries = {}
+            for path in self.root.iterdir():
+                if path.is_file() and path.name != self.INDEX_NAME and '-' in path.stem:
+                    stat = path.stat()
+                    entries[path.name] = {
+                        'pin_id': path.stem.rsplit('-', 1)[0],
+                        'size': stat.st_size,
+                        'last_access': stat.st_mtime,
+                    }
+        
+        # تجاهل العناصر التي حُذفت ملفاتها
+        return {name: entry for name, entry in entries.items() if (self.root / name).exists()}
+    
+    def _save_index(self) -> None:
+        # القفل يمنع تعديل العناصر أثناء كتابتها، وتداخل حفظين من خيطين في نفس الملف المؤقت
+        with self._lock:
+            self._dirty = False
+            tmp_path = self._index_path.with_name(self.INDEX_NAME + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._entries, file)
+            os.replace(tmp_path, self._index_path)
+    
+    def flush(self) -> bool:
+        """
+        حفظ أوقات الوصول المتراكمة منذ آخر حفظ للفهرس
+        
+        Returns:
+            True إن حُفظ الفهرس
+        """
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._save_index()
+            return True
     
     @staticmethod
-    def is_pinterest_url(url: str) -> bool:
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def lookup(self, pin_id: str) -> Optional[Path]:
         """
-        فحص متقدم لروابط Pinterest
+        البحث عن أحدث ملف مخزن لـ Pin
         
         Args:
-            url: الرابط المراد فحصه
+            pin_id: معرف Pin
             
         Returns:
-            True إذا كان رابط Pinterest صالح
+            مسار الملف داخل المخزن أو None
         """
-        if not url or not isinstance(url, str):
-            return False
+        with self._lock:
+            matches = [
+                (entry['last_access'], name)
+                for name, entry in self._entries.items()
+                if entry['pin_id'] == pin_id
+            ]
+            if not matches:
+                self.stats['misses'] += 1
+                return None
+            
+            _, name = max(matches)
+            path = self.root / name
+            if not path.exists():
+                del self._entries[name]
+                self.stats['misses'] += 1
+                return None
+            
+            self._entries[name]['last_access'] = time.time()
+            self._dirty = True
+            self.stats['hits'] += 1
+            return path
+    
+    async def put(self, pin_id: str, source: Path) -> Path:
+        """
+        إضافة ملف مكتمل إلى المخزن (يُنقل الملف، أو يُحذف إن كان محتواه مخزناً مسبقاً)
         
-        url = url.strip().lower()
+        Args:
+            pin_id: معرف Pin
+            source: مسار الملف المحمل
+            
+        Returns:
+            مسار الملف داخل المخزن
+        """
+        digest = await asyncio.to_thread(self._hash_file, source)
+        name = f"{pin_id}-{digest[:16]}{source.suffix}"
+        path = self.root / name
         
-        # أنماط Pinterest المحدثة
-        pinterest_patterns = [
-            r'(https?://)?(www\.)?pinterest\.com/pin/[\w-]+',
-            r'(https?://)?(www\.)?pin\.it/[\w-]+',
-            r'(https?://)?pinterest\.com/.*',
-            r'(https?://)?.*\.pinterest\.com/.*',
-            r'(https?://)?(br|ar|fr|de|es|it|ru)\.pinterest\.com/.*'
-        ]
+        if path.exists():
+            source.unlink()
+            self.stats['dedup'] += 1
+        else:
+            os.replace(source, path)
         
-        for pattern in pinterest_patterns:
-            if re.search(pattern, url):
-                return True
+        with self._lock:
+            self._entries[name] = {
+                'pin_id': pin_id,
+                'size': path.stat().st_size,
+                'last_access': time.time(),
+            }
+            self.evict(keep=name)
+            self._save_index()
+        return path
+    
+    def checkout(self, path: Path, destination: Path) -> Path:
+        """
+        إنشاء نسخة خاصة بالطلب عبر رابط صلب، فيبقى الملف صالحاً للقراءة والرفع
+        حتى لو أُخلي من المخزن، ويحذفها المستدعي دون أن يمس المخزن
+        
+        Args:
+            path: مسار الملف داخل المخزن
+            destination: مسار النسخة الخاصة بالطلب
+            
+        Returns:
+            مسار النسخة
+        """
+        try:
+            os.link(path, destination)
+        except OSError:
+            # نظام ملفات لا يدعم الروابط الصلبة
+            shutil.copyfile(path, destination)
+        os.utime(destination)
+        return destination
+    
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        إخلاء الملفات الأقل استخداماً حتى يصبح حجم المخزن ضمن الحد
+        
+        Args:
+            keep: اسم ملف لا يُخلى (الملف المضاف للتو)
+            
+        Returns:
+            عدد الملفات المحذوفة
+        """
+        with self._lock:
+            total = self.total_bytes
+            evicted = 0
+            
+            for name, entry in sorted(self._entries.items(), key=lambda item: item[1]['last_access']):
+                if total <= self.quota_bytes:
+                    break
+                if name == keep:
+                    continue
+                
+                # النسخ الخاصة بالطلبات الجارية روابط صلبة مستقلة، فحذف الأصل لا يؤثر عليها
+                try:
+                    (self.root / name).unlink()
+                except FileNotFoundError:
+                    pass
+                total -= entry['size']
+                del self._entries[name]
+                evicted += 1
+            
+            if evicted:
+                self.stats['evicted'] += evicted
+                self._save_index()
+        
+        if evicted:
+            logger.info(f"تم إخلاء {evicted} ملف من المخزن ({total / (1024*1024):.1f} MB متبقية)")
+        
+        return evicted
+
+
+class VideoStream:
+    """بث فيديو عبر مخزن مؤقت محدود في الذاكرة يُملأ مسبقاً بالتوازي مع قراءة المستهلك"""
+    
+    CHUNK_SIZE = 64 * 1024
+    
+    def __init__(
+        self,
+        source: AsyncIterator[bytes],
+        size: Optional[int] = None,
+        buffer_bytes: int = 4 * 1024 * 1024,
+        on_close: Optional[Callable[['VideoStream'], None]] = None,
+        estimated_size: Optional[int] = None,
+        **info: Any
+    ):
+        """
+        Args:
+            source: مصدر البيانات (مولد غير متزامن بدأ تشغيله)
+            size: الحجم الكلي إن كان معروفاً مسبقاً
+            buffer_bytes: الحد الأقصى للبيانات المحجوزة في الذاكرة بانتظار المستهلك
+            on_close: دالة تُستدعى عند الإغلاق (لتسجيل المقاييس)
+            estimated_size: الحجم المقدر عند عدم معرفة الحجم الدقيق (معدل البت × المدة في HLS)
+            info: معلومات الفيديو (العنوان، الامتداد، ...)
+        """
+        self.size = size
+        self.estimated_size = estimated_size
+        self.info = info
+        self.buffer_bytes = buffer_bytes
+        self.buffered = 0
+        self.peak_buffered = 0
+        self.received = 0
+        self._on_close = on_close
+        self._opened_at = time.perf_counter()
+        self._source = source
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer_bytes // self.CHUNK_SIZE))
+        self._producer = asyncio.create_task(self._produce())
+    
+    async def _produce(self) -> None:
+        """نقل البيانات من المصدر إلى المخزن المؤقت (يتوقف عند امتلائه)"""
+        try:
+            async for data in self._source:
+                for start in range(0, len(data), self.CHUNK_SIZE):
+                    chunk = data[start:start + self.CHUNK_SIZE]
+                    await self._queue.put(chunk)
+                    self.buffered += len(chunk)
+                    self.peak_buffered = max(self.peak_buffered, self.buffered)
+            await self._queue.put(None)
+        except Exception as e:
+            await self._queue.put(e)
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            self.buffered -= len(item)
+            self.received += len(item)
+            yield item
+    
+    async def aclose(self) -> None:
+        """إيقاف القراءة من المصدر وإغلاق اتصاله"""
+        self._producer.cancel()
+        await asyncio.gather(self._producer, return_exceptions=True)
+        await self._source.aclose()
+        
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close(self)
+    
+    @property
+    def elapsed(self) -> float:
+        """الزمن منذ فتح البث بالثواني"""
+        return time.perf_counter() - self._opened_at
+    
+    async def __aenter__(self) -> 'VideoStream':
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+
+class TransientDownloadError(Exception):
+    """خطأ مؤقت من الخادم يستحق إعادة المحاولة (مثل 429 أو 503)"""
+
+
+class VariantTooLargeError(Exception):
+    """حجم الجودة (المقدر أو الفعلي) يتجاوز الحد المسموح"""
+    
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(
+            f"حجم الفيديو {size / (1024*1024):.1f} MB يتجاوز الحد {max_bytes / (1024*1024):.1f} MB"
+        )
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    هل الخطأ مؤقت (انقطاع أو مهلة أو حالة HTTP مؤقتة) بحيث تنفع إعادة المحاولة
+    
+    Args:
+        error: الاستثناء
+        
+    Returns:
+        True إذا كان الخطأ مؤقتاً
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in TRANSIENT_STATUSES
+    return isinstance(error, (
+        TransientDownloadError,
+        asyncio.TimeoutError,
+        aiohttp.ClientConnectionError,
+        aiohttp.ClientPayloadError,
+    ))
+
+
+class LatencyTracker:
+    """نافذة منزلقة لأزمنة الاستجابة لحساب النسب المئوية (مثل p95 لزمن أول بايت)"""
+    
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Args:
+            window: عدد آخر العينات المحفوظة
+            min_samples: أقل عدد عينات قبل اعتماد النسب المئوية
+        """
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        النسبة المئوية لأزمنة النافذة الحالية
+        
+        Args:
+            percent: النسبة (0-100)
+            
+        Returns:
+            الزمن بالثواني أو None إذا كانت العينات غير كافية
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+
+class AdaptiveRateLimiter:
+    """محدد معدل طلبات لكل مضيف (Token Bucket) يضيق تلقائياً عند إشارات الحظر ويسترخي مع الاستجابات السليمة"""
+    
+    # حالات HTTP التي تعني أن Pinterest بدأ بالحد من الطلبات
+    THROTTLE_STATUSES = (403, 429)
+    
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: int = 5,
+        min_rate: float = 0.1,
+        backoff_factor: float = 0.5,
+        recovery_factor: float = 1.2
+    ):
+        """
+        Args:
+            rate: المعدل الطبيعي (طلبات في الثانية لكل مضيف)
+            burst: سعة الدلو (عدد الطلبات الفورية المسموحة بعد فترة خمول)
+            min_rate: أدنى معدل عند التضييق
+            backoff_factor: معامل خفض المعدل عند إشارة حظر
+            recovery_factor: معامل رفع المعدل مع كل استجابة سليمة حتى المعدل الطبيعي
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.backoff_factor = backoff_factor
+        self.recovery_factor = recovery_factor
+        self._buckets: Dict[str, Dict[str, Any]] = {}
+    
+    def _bucket(self, host: str) -> Dict[str, Any]:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = {
+                'tokens': float(self.burst),
+                'rate': self.rate,
+                'updated': time.monotonic(),
+                'paused_until': 0.0,
+                'lock': asyncio.Lock(),
+            }
+            self._buckets[host] = bucket
+        return bucket
+    
+    def current_rate(self, host: str) -> float:
+        return self._bucket(host)['rate']
+    
+    async def acquire(self, host: str) -> float:
+        """
+        انتظار رمز للمضيف (فوري عند توفر رموز في الدلو)
+        
+        Args:
+            host: اسم المضيف
+            
+        Returns:
+            مدة الانتظار بالثواني
+        """
+        bucket = self._bucket(host)
+        waited = 0.0
+        
+        # القفل يحافظ على ترتيب المنتظرين
+        async with bucket['lock']:
+            while True:
+                now = time.monotonic()
+                bucket['tokens'] = min(
+                    self.burst, bucket['tokens'] + (now - bucket['updated']) * bucket['rate']
+                )
+                bucket['updated'] = now
+                
+                delay = max(0.0, bucket['paused_until'] - now)
+                if not delay and bucket['tokens'] >= 1:
+                    bucket['tokens'] -= 1
+                    return waited
+                
+                delay = max(delay, (1 - bucket['tokens']) / bucket['rate'])
+                await asyncio.sleep(delay)
+                waited += delay
+    
+    def record(self, host: str, status: Optional[int] = None, empty: bool = False, retry_after: Optional[float] = None) -> None:
+        """
+        تعديل المعدل حسب الاستجابة
+        
+        Args:
+            host: اسم المضيف
+            status: حالة HTTP للاستجابة
+            empty: الصفحة لم تحتوِ على بيانات متوقعة (إشارة حظر محتملة)
+            retry_after: مدة الإيقاف التي طلبها الخادم بالثواني
+        """
+        bucket = self._bucket(host)
+        
+        if empty or status in self.THROTTLE_STATUSES:
+            bucket['rate'] = max(self.min_rate, bucket['rate'] * self.backoff_factor)
+            bucket['tokens'] = 0.0
+            if retry_after:
+                bucket['paused_until'] = time.monotonic() + retry_after
+            logger.warning(f"تضييق معدل الطلبات إلى {host}: {bucket['rate']:.2f} طلب/ثانية")
+        elif status is not None and 200 <= status < 400:
+            bucket['rate'] = min(self.rate, bucket['rate'] * self.recovery_factor)
+
+
+class AdvancedPinterestDownloader:
+    """نظام تحميل متقدم لفيديوهات Pinterest"""
+    
+    # مسارات معروفة لعقدة Pin داخل حالة الصفحة؛ None تعني معرف Pin المطلوب
+    PIN_HOT_PATHS = (
+        ('props', 'initialReduxState', 'pins', None),
+        ('initialReduxState', 'pins', None),
+        ('pins', None),
+        ('props', 'pageProps', 'pin'),
+        ('pin',),
+    )
+    
+    # ترتيب تفضيل جودات الفيديو
+    VIDEO_QUALITY_KEYS = ('V_HLSV4', 'V_HLSV3', 'V_HLSV3_WEB', 'V_HLSV3_MOBILE')
+    
+    # حدود البحث الاحتياطي في حالة الصفحة
+    LOCATOR_MAX_DEPTH = 8
+    LOCATOR_MAX_NODES = 50000
+    
+    # أول جزء في مسار الرابط الذي لا يمثل اسم مستخدم
+    RESERVED_PATHS = frozenset({
+        'pin', 'search', 'ideas', 'today', 'explore', 'business', 'settings', 'login', 'signup',
+        'resource', '_ngjs', 'news_hub', 'videos', 'shopping', 'categories', 'topics',
+        'url_shortener', 'password', 'about', 'homefeed', 'notifications', 'board',
+    })
+    
+    # تبويبات صفحة الملف الشخصي
+    PROFILE_TABS = frozenset({'_saved', '_created', 'pins', 'boards', '_profile'})
+    
+    # عدد Pins في كل صفحة من استجابات الموارد
+    COLLECTION_PAGE_SIZE = 25
+    
+    def __init__(
+        self,
+        download_dir: str = "downloads",
+        hls_concurrency: int = 8,
+        range_connections: int = 4,
+        range_part_size: int = 4 * 1024 * 1024,
+        session_manager: Optional[HTTPSessionManager] = None,
+        parse_executor: str = "thread",
+        parse_workers: Optional[int] = None,
+        resolution_cache: Optional[PinResolutionCache] = None,
+        short_link_cache: Optional[ShortLinkCache] = None,
+        store_quota_bytes: int = 2 * 1024 ** 3,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+        hedge_percentile: Optional[float] = 95.0,
+        stall_timeout: float = 20.0,
+        stream_buffer_bytes: int = 4 * 1024 * 1024,
+        api_base_url: str = "https://www.pinterest.com",
+        api_fast_path: bool = True,
+        partial_retention_hours: float = 6,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """
+        تهيئة النظام المتقدم
+        
+        Args:
+            download_dir: مجلد التحميل
+            hls_concurrency: عدد مقاطع HLS التي تُحمّل بالتوازي
+            range_connections: عدد اتصالات HTTP Range المتوازية للملفات المباشرة (1 لتعطيلها)
+            range_part_size: حجم كل جزء في التحميل المقسم بالبايت
+            session_manager: مدير جلسة HTTP مشتركة (يُنشأ مدير خاص إن لم يُمرر)
+            parse_executor: مكان تحليل بيانات الصفحة: thread أو process أو inline
+            parse_workers: عدد عمال مجمع التحليل (الافتراضي حسب عدد المعالجات)
+            resolution_cache: ذاكرة مؤقتة لبيانات Pins المحللة (تُنشأ ذاكرة داخلية إن لم تُمرر)
+            short_link_cache: ذاكرة توسيع روابط pin.it (تُنشأ ذاكرة داخلية إن لم تُمرر)
+            store_quota_bytes: الحد الأقصى لحجم مخزن الفيديوهات المحملة
+            rate_limiter: محدد معدل الطلبات إلى Pinterest (يُنشأ محدد افتراضي إن لم يُمرر)
+            max_retries: عدد مرات إعادة المحاولة للأخطاء المؤقتة
+            retry_base_delay: التأخير الأول بين المحاولات بالثواني (يتضاعف مع كل محاولة)
+            retry_max_delay: الحد الأقصى للتأخير بين المحاولات
+            hedge_percentile: النسبة المئوية لزمن أول بايت التي يُرسل بعدها طلب تحوّط ثانٍ للصفحة (None لتعطيله)
+            stall_timeout: المدة القصوى دون استلام بيانات أثناء تحميل الفيديو قبل اعتباره متوقفاً
+            stream_buffer_bytes: حجم المخزن المؤقت في الذاكرة لكل فيديو في وضع البث
+            api_base_url: عنوان Pinterest لاستجابات الموارد (قابل للتغيير لخادم محلي للاختبار)
+            api_fast_path: تحليل Pin عبر مورد PinResource قبل الرجوع إلى صفحة HTML
+            partial_retention_hours: مدة الاحتفاظ بالملفات الجزئية وسجلاتها لاستئنافها منذ آخر تقدم
+            metrics: سجل المقاييس (الافتراضي السجل المشترك)
+        """
+        self.download_dir = Path(download_dir)
+        self.partial_retention_hours = partial_retention_hours
+        self.download_dir.mkdir(exist_ok=True)
+        
+        self.session = None
+        self.hls_concurrency = max(1, hls_concurrency)
+        self.range_connections = max(1, range_connections)
+        self.range_part_size = max(64 * 1024, range_part_size)
+        
+        # تحليل JSON والبحث عن الفيديو يعملان خارج حلقة الأحداث
+        self.parse_executor_kind = parse_executor
+        self.parse_workers = parse_workers
+        self._parse_executor: Optional[Executor] = None
+        
+        self.resolution_cache = resolution_cache or PinResolutionCache()
+        self.short_link_cache = short_link_cache or ShortLinkCache()
+        self._inflight = SingleFlight()
+        self._partial_locks = KeyedLock()
+        self.content_store = ContentStore(self.download_dir / 'store', store_quota_bytes)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        
+        # إعادة المحاولة والتحوّط ضد بطء الاستجابات النادرة
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_percentile = hedge_percentile
+        self.page_latency = LatencyTracker()
+        # مهلة توقف البيانات بدلاً من مهلة كلية حتى لا تنقطع الملفات الكبيرة على الاتصالات البطيئة
+        self._media_timeout = aiohttp.ClientTimeout(total=None, connect=30, sock_read=stall_timeout)
+        
+        # وضع البث دون المرور بالقرص
+        self.stream_buffer_bytes = stream_buffer_bytes
+        
+        # طريقة تحليل كل Pin (cache / api / html) وزمنها لآخر الطلبات
+        self.api_fast_path = api_fast_path
+        self.resolution_log: deque = deque(maxlen=1000)
+        
+        self.metrics = metrics or REGISTRY
+        self._metric_bindings = MetricBindings(self)
+        self._register_metrics()
+        
+        # Pinterest API endpoints
+        self.api_base_url = api_base_url.rstrip('/')
+        self.api_endpoints = {
+            'pin_data': f'{self.api_base_url}/resource/PinResource/get/',
+            'video_data': f'{self.api_base_url}/_ngjs/resource/PinResource/get/',
+            'search': f'{self.api_base_url}/resource/BaseSearchResource/get/',
+            'board': f'{self.api_base_url}/resource/BoardResource/get/',
+            'board_feed': f'{self.api_base_url}/resource/BoardFeedResource/get/',
+            'board_section': f'{self.api_base_url}/resource/BoardSectionResource/get/',
+            'section_feed': f'{self.api_base_url}/resource/BoardSectionPinsResource/get/',
+            'user_pins': f'{self.api_base_url}/resource/UserPinsResource/get/'
+        }
+        
+        # Headers متقدمة تحاكي المتصفح الحقيقي
+        self.base_headers = {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Cache-Control': 'max-age=0'
+        }
+        
+        self.session_manager = session_manager or HTTPSessionManager(headers=self.base_headers)
+        
+        logger.info(f"تم تهيئة النظام المتقدم: {download_dir}")
+    
+    def _register_metrics(self) -> None:
+        """إنشاء مقاييس المحمّل وربط إحصائيات المكونات بها"""
+        metrics = self.metrics
+        self._stage_seconds = metrics.histogram(
+            'pinterest_stage_seconds', 'Duration of each download pipeline stage', ['stage']
+        )
+        self._resolutions = metrics.counter(
+            'pinterest_resolutions_total', 'Pin resolutions by strategy and result', ['strategy', 'result']
+        )
+        self._resilience_events = metrics.counter(
+            'pinterest_resilience_events_total', 'Retries, hedged requests and quality fallbacks', ['event']
+        )
+        self._transfer_bytes = metrics.counter(
+            'pinterest_transfer_bytes_total', 'Media bytes transferred', ['mode']
+        )
+        self._throughput = metrics.histogram(
+            'pinterest_transfer_bytes_per_second', 'Media transfer throughput', ['mode'], THROUGHPUT_BUCKETS
+        )
+        self._active_downloads = metrics.gauge('pinterest_active_downloads', 'download_video calls in progress')
+        self._queued_downloads = metrics.gauge(
+            'pinterest_download_queue_depth', 'Batch downloads waiting for a concurrency slot'
+        )
+        self._stream_peak = metrics.gauge(
+            'pinterest_stream_peak_buffer_bytes', 'Highest read-ahead buffer of a single stream'
+        )
+        
+        # دوال القراءة تصل إلى المحمّل عبر مرجع ضعيف وتُزال عند إغلاقه
+        bindings = self._metric_bindings
+        cache_requests = metrics.counter(
+            'pinterest_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result']
+        )
+        for cache_name, attribute in (('resolution', 'resolution_cache'), ('short_link', 'short_link_cache')):
+            for result in ('hits', 'store_hits', 'misses'):
+                bindings.bind(
+                    cache_requests,
+                    lambda downloader, attribute=attribute, result=result: getattr(downloader, attribute).stats[result],
+                    cache=cache_name, result=result
+                )
+        for result in ('hits', 'misses'):
+            bindings.bind(
+                cache_requests,
+                lambda downloader, result=result: downloader.content_store.stats[result],
+                cache='content_store', result=result
+            )
+        
+        store_events = metrics.counter('pinterest_store_events_total', 'Content store dedup and evictions', ['event'])
+        for event in ('dedup', 'evicted'):
+            bindings.bind(
+                store_events, lambda downloader, event=event: downloader.content_store.stats[event], event=event
+            )
+        bindings.bind(
+            metrics.gauge('pinterest_store_bytes', 'Bytes held in the content store'),
+            lambda downloader: downloader.content_store.total_bytes
+        )
+        
+        inflight = metrics.gauge('pinterest_inflight_operations', 'Coalesced resolutions and downloads in flight')
+        bindings.bind(inflight, lambda downloader: downloader._inflight.in_flight)
+        coalesced = metrics.counter(
+            'pinterest_coalesced_requests_total', 'Single-flight leaders and followers', ['role']
+        )
+        for role in ('leaders', 'followers'):
+            bindings.bind(coalesced, lambda downloader, role=role: downloader._inflight.stats[role], role=role)
+    
+    def _record_transfer(self, mode: str, size: int, seconds: float) -> None:
+        """تسجيل حجم وسرعة نقل ملف وسائط"""
+        self._transfer_bytes.inc(size, mode=mode)
+        if seconds > 0 and size:
+            self._throughput.observe(size / seconds, mode=mode)
+    
+    async def start(self) -> 'AdvancedPinterestDownloader':
+        """ربط الجلسة المشتركة (آمن للاستدعاء المتكرر والمتزامن)"""
+        self.session = await self.session_manager.get_session()
+        return self
+    
+    async def close(self) -> None:
+        """إغلاق الجلسة المشتركة ومجمع التحليل وحفظ فهرس المخزن وفصل مقاييسه"""
+        await self.session_manager.close()
+        self.session = None
+        self.content_store.flush()
+        self._metric_bindings.unbind()
+        
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+    
+    async def __aenter__(self):
+        """ربط جلسة HTTP عند دخول السياق"""
+        return await self.start()
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """إغلاق الجلسة عند الخروج من السياق"""
+        await self.close()
+    
+    def _get_fresh_headers(self) -> Dict[str, str]:
+        """إنشاء headers جديدة لكل طلب"""
+        headers = self.base_headers.copy()
+        headers['User-Agent'] = random_user_agent()
+        
+        # إضافة headers عشوائية إضافية
+        additional_headers = [
+            ('DNT', '1'),
+            ('Sec-GPC', '1'),
+        ]
+        
+        for header, value in random.sample(additional_headers, k=random.randint(0, 1)):
+            headers[header] = value
+        
+        # التأكد من عدم طلب Brotli
+        headers['Accept-Encoding'] = 'gzip, deflate'
+            
+        return headers
+    
+    @staticmethod
+    def is_pinterest_url(url: str) -> bool:
+        """
+        فحص متقدم لروابط Pinterest
+        
+        Args:
+            url: الرابط المراد فحصه
+            
+        Returns:
+            True إذا كان رابط Pinterest صالح
+        """
+        if not url or not isinstance(url, str):
+            return False
+        
+        url = url.strip().lower()
+        
+        # أنماط Pinterest المحدثة
+        pinterest_patterns = [
+            r'(https?://)?(www\.)?pinterest\.com/pin/[\w-]+',
+            r'(https?://)?(www\.)?pin\.it/[\w-]+',
+            r'(https?://)?pinterest\.com/.*',
+            r'(https?://)?.*\.pinterest\.com/.*',
+            r'(https?://)?(br|ar|fr|de|es|it|ru)\.pinterest\.com/.*'
+        ]
+        
+        for pattern in pinterest_patterns:
+            if re.search(pattern, url):
+                return True
+        
+        return 'pinterest' in url and ('pin' in url or '/idea' in url)
+    
+    @staticmethod
+    def canonical_pin_url(pin_id: str) -> str:
+        """الرابط القانوني لصفحة Pin"""
+        return f"https://www.pinterest.com/pin/{pin_id}/"
+    
+    @classmethod
+    def extract_pinterest_urls(cls, text: str) -> List[str]:
+        """
+        استخراج كل روابط Pinterest من رسالة بمسح واحد، بصيغتها القانونية ودون تكرار
+        
+        Args:
+            text: نص الرسالة
+            
+        Returns:
+            الروابط بترتيب ظهورها (روابط Pins بالصيغة القانونية، و pin.it كما هي)
+        """
+        urls: Dict[str, None] = {}
+        for match in _PINTEREST_LINK_RE.finditer(text or ''):
+            url = cls._canonical_link(match.group(0))
+            if url:
+                urls.setdefault(url)
+        return list(urls)
+    
+    @classmethod
+    def _canonical_link(cls, link: str) -> Optional[str]:
+        """
+        الصيغة القانونية لرابط Pinterest (دون query أو fragment أو علامات ترقيم لاحقة)،
+        أو None إن لم يكن رابط Pin أو لوحة أو قسم أو ملف شخصي (مثل البحث وصفحات الأفكار)
+        """
+        link = link.rstrip(_LINK_TRAILING)
+        parsed = urlparse(link if '://' in link else f"https://{link}")
+        host = parsed.netloc.lower()
+        path = parsed.path.rstrip('/')
+        
+        if host.endswith('pin.it'):
+            return f"https://pin.it{path}" if path else None
+        
+        pin_match = _PIN_PATH_RE.match(path)
+        if pin_match:
+            return cls.canonical_pin_url(pin_match.group(1))
+        if not path:
+            return None
+        url = f"https://{host}{path}/"
+        return url if cls.parse_collection_url(url) else None
+    
+    def _extract_pin_id(self, url: str) -> Optional[str]:
+        """
+        استخراج معرف Pin من الرابط
+        
+        Args:
+            url: رابط Pinterest
+            
+        Returns:
+            معرف Pin أو None
+        """
+        # أنماط استخراج Pin ID
+        patterns = [
+            r'/pin/(\d+)',
+            r'pin\.it/([a-zA-Z0-9]+)',
+            r'pinterest\.com/pin/(\d+)',
+            r'/pin/([a-zA-Z0-9]+)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, url, re.IGNORECASE)
+            if match:
+                return match.group(1)
+        
+        return None
+    
+    async def _expand_short_url(self, url: str) -> str:
+        """
+        توسيع الروابط المختصرة
+        
+        Args:
+            url: الرابط المختصر
+            
+        Returns:
+            الرابط الكامل
+        """
+        code_match = re.search(r'pin\.it/([a-zA-Z0-9]+)', url)
+        if not code_match:
+            return url
+        
+        code = code_match.group(1)
+        target_url = await self.short_link_cache.get(code)
+        if target_url:
+            return target_url
+        
+        try:
+            headers = self._get_fresh_headers()
+            host = urlparse(url).netloc
+            await self.rate_limiter.acquire(host)
+            
+            with self._stage_seconds.time(stage='expand_short_url'):
+                async with self.session.head(url, headers=headers, allow_redirects=True) as response:
+                    expanded = str(response.url)
+                    self.rate_limiter.record(host, response.status)
+        except Exception as e:
+            logger.warning(f"فشل توسيع الرابط: {str(e)}")
+            return url
+        
+        # حفظ الرابط بصيغته القانونية فقط إذا وصل التوسيع إلى Pinterest فعلاً
+        parsed = urlparse(expanded)
+        if 'pinterest.' not in parsed.netloc:
+            return expanded
+        
+        pin_match = re.search(r'/pin/(\d+)', parsed.path)
+        if pin_match:
+            target_url = self.canonical_pin_url(pin_match.group(1))
+        else:
+            target_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+        
+        await self.short_link_cache.set(code, target_url)
+        return target_url
+    
+    async def _get_pin_data_from_page(self, url: str, pin_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        استخراج بيانات Pin من صفحة الويب مع إعادة المحاولة للأخطاء المؤقتة،
+        وإرسال طلب تحوّط ثانٍ إذا تأخر أول بايت عن المعتاد
+        
+        Args:
+            url: رابط Pin
+            pin_id: معرف Pin المطلوب
+            
+        Returns:
+            بيانات Pin أو None
+        """
+        try:
+            return await self._with_retries(
+                lambda: self._hedged(lambda first_byte: self._fetch_pin_page(url, pin_id, first_byte)),
+                "جلب صفحة Pin"
+            )
+        except Exception as e:
+            logger.error(f"خطأ في استخراج بيانات Pin: {str(e)}")
+            return None
+    
+    async def _fetch_pin_page(
+        self,
+        url: str,
+        pin_id: Optional[str],
+        first_byte: asyncio.Event
+    ) -> Optional[Dict[str, Any]]:
+        """
+        محاولة واحدة لقراءة صفحة Pin مع التوقف عن القراءة فور اكتمال
+        كتلة البيانات التي تحتوي على الفيديو
+        
+        Args:
+            url: رابط Pin
+            pin_id: معرف Pin المطلوب
+            first_byte: حدث يُضبط عند وصول headers الاستجابة
+            
+        Returns:
+            بيانات Pin أو None
+            
+        Raises:
+            TransientDownloadError: عند حالة HTTP مؤقتة
+        """
+        headers = self._get_fresh_headers()
+        host = urlparse(url).netloc
+        await self.rate_limiter.acquire(host)
+        
+        started = time.monotonic()
+        async with self.session.get(url, headers=headers) as response:
+            self.page_latency.record(time.monotonic() - started)
+            first_byte.set()
+            
+            retry_after = response.headers.get('Retry-After', '')
+            self.rate_limiter.record(
+                host, response.status, retry_after=float(retry_after) if retry_after.isdigit() else None
+            )
+            if response.status in TRANSIENT_STATUSES:
+                raise TransientDownloadError(f"فشل تحميل الصفحة: {response.status}")
+            if response.status != 200:
+                logger.warning(f"فشل تحميل الصفحة: {response.status}")
+                return None
+            
+            extractor = PinPageExtractor(response.charset or 'utf-8')
+            parsed_state = False
+            
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                found = extractor.feed(chunk)
+                while found:
+                    parsed_state = True
+                    video_data = await self._extract_video_from_block(extractor, pin_id)
+                    if video_data:
+                        # لا حاجة لبقية الصفحة
+                        response.close()
+                        return video_data
+                    if pin_id is not None and extractor.mentions_pin(pin_id):
+                        # بيانات الـ Pin المطلوب اكتملت بلا فيديو: بقية الصفحة لن تغير النتيجة
+                        response.close()
+                        logger.warning(f"الـ Pin {pin_id} لا يحتوي على فيديو")
+                        return None
+                    found = extractor.skip_block()
+                
+                if extractor.exhausted:
+                    break
+            
+            # طريقة بديلة عند غياب بيانات الحالة فقط: البحث بالنص يلتقط أول فيديو في
+            # الصفحة، وقد يكون لـ Pin مقترح إذا لم يكن للـ Pin المطلوب فيديو
+            if not parsed_state:
+                video_data = self._extract_video_from_html(extractor.text)
+                if video_data:
+                    return video_data
+            
+            # صفحة بلا بيانات حالة غالباً صفحة حظر أو تحقق
+            if not parsed_state and not extractor.exhausted:
+                self.rate_limiter.record(host, empty=True)
+            
+            logger.warning("لم يتم العثور على بيانات فيديو في الصفحة")
+            return None
+    
+    async def _with_retries(self, func: Callable[[], Awaitable[Any]], description: str) -> Any:
+        """
+        تنفيذ عملية مع إعادة المحاولة للأخطاء المؤقتة بتأخير أسي عشوائي
+        
+        Args:
+            func: دالة تُنشئ المحاولة
+            description: وصف العملية للسجلات
+            
+        Returns:
+            نتيجة أول محاولة ناجحة (الأخطاء الدائمة وخطأ المحاولة الأخيرة تُمرر كما هي)
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self._resilience_events.inc(event='retry')
+                logger.warning(
+                    f"{description}: خطأ مؤقت ({type(e).__name__}: {str(e)})، "
+                    f"إعادة المحاولة {attempt + 1}/{self.max_retries} بعد {delay:.1f} ثانية"
+                )
+                await asyncio.sleep(delay)
+    
+    async def _hedged(self, attempt: Callable[[asyncio.Event], Awaitable[Any]]) -> Any:
+        """
+        تنفيذ طلب مع إرسال نسخة ثانية إذا لم يصل أول بايت خلال النسبة المئوية
+        المحددة لأزمنة الاستجابة السابقة، واعتماد أول نتيجة ناجحة
+        
+        Args:
+            attempt: دالة تُنشئ المحاولة وتضبط الحدث المُمرر عند وصول أول بايت
+            
+        Returns:
+            نتيجة أول محاولة ناجحة
+        """
+        threshold = self.page_latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        if threshold is None:
+            return await attempt(asyncio.Event())
+        
+        primary_byte = asyncio.Event()
+        primary = asyncio.create_task(attempt(primary_byte))
+        byte_waiter = asyncio.create_task(primary_byte.wait())
+        try:
+            await asyncio.wait({primary, byte_waiter}, timeout=threshold, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            primary.cancel()
+            raise
+        finally:
+            byte_waiter.cancel()
+        
+        if primary.done() or primary_byte.is_set():
+            return await primary
+        
+        self._resilience_events.inc(event='hedge')
+        logger.info(f"تأخر أول بايت أكثر من {threshold:.2f} ثانية، إرسال طلب تحوّط")
+        hedge = asyncio.create_task(attempt(asyncio.Event()))
+        
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result() is not None:
+                        if task is hedge:
+                            self._resilience_events.inc(event='hedge_win')
+                        return task.result()
+            
+            # فشلت المحاولتان: نتيجة الطلب الأصلي أو خطؤه
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+            await asyncio.gather(primary, hedge, return_exceptions=True)
+    
+    def _get_parse_executor(self) -> Optional[Executor]:
+        """إنشاء مجمع التحليل عند أول استخدام"""
+        if self._parse_executor is None and self.parse_executor_kind != 'inline':
+            if self.parse_executor_kind == 'process':
+                self._parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            else:
+                self._parse_executor = ThreadPoolExecutor(
+                    max_workers=self.parse_workers, thread_name_prefix='pin-parse'
+                )
+        return self._parse_executor
+    
+    async def _parse_block(self, raw: bytes, pin_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        تشغيل تحليل JSON والبحث عن الفيديو خارج حلقة الأحداث
+        
+        Args:
+            raw: بايتات كتلة البيانات
+            pin_id: معرف Pin المطلوب
+            
+        Returns:
+            معلومات الفيديو أو None
+        """
+        with self._stage_seconds.time(stage='parse'):
+            executor = self._get_parse_executor()
+            if executor is None:
+                return parse_pin_block(raw, pin_id)
+            return await asyncio.get_running_loop().run_in_executor(executor, parse_pin_block, raw, pin_id)
+    
+    async def _extract_video_from_block(
+        self,
+        extractor: PinPageExtractor,
+        pin_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        تحليل كتلة البيانات المكتملة واستخراج الفيديو منها، مع إكمال
+        العنوان والوصف والصورة المصغرة من وسوم الصفحة عند غيابها
+        
+        Args:
+            extractor: المستخرج الذي اكتملت لديه كتلة بيانات
+            pin_id: معرف Pin المطلوب
+            
+        Returns:
+            معلومات الفيديو أو None
+        """
+        video_data = await self._parse_block(extractor.block, pin_id)
+        if not video_data:
+            return None
+        
+        metadata = extractor.page_metadata()
+        for key in ('title', 'description', 'thumbnail'):
+            if not video_data.get(key) and metadata[key]:
+                video_data[key] = metadata[key]
+        video_data['title'] = video_data['title'] or 'Pinterest Video'
+        
+        return video_data
+    
+    def _extract_video_from_html(self, html_content: str) -> Optional[Dict[str, Any]]:
+        """
+        البحث عن روابط الفيديو مباشرة في نص HTML عند غياب كتلة البيانات
+        (أول تطابق في الصفحة، دون معرفة Pin الذي ينتمي إليه الرابط)
+        
+        Args:
+            html_content: محتوى HTML
+            
+        Returns:
+            معلومات الفيديو أو None
+        """
+        video_patterns = [
+            r'"video_list":\s*\{[^}]*"V_HLSV4":\s*\{[^}]*"url":\s*"([^"]+)"',
+            r'"videos":\s*\{[^}]*"video_list":\s*\{[^}]*"V_HLSV3":\s*\{[^}]*"url":\s*"([^"]+)"',
+            r'"story_pin_data_id":[^}]*"video_url":\s*"([^"]+)"',
+            r'contentUrl":\s*"([^"]*\.mp4[^"]*)"',
+            r'"video":\s*\{[^}]*"url":\s*"([^"]+\.mp4[^"]*)"',
+        ]
+        
+        for pattern in video_patterns:
+            match = re.search(pattern, html_content)
+            if match:
+                video_url = match.group(1).replace('\\/', '/')
+                if video_url.startswith('http'):
+                    # استخراج العنوان والوصف من الصفحة
+                    title_match = re.search(r'<title[^>]*>([^<]+)</title>', html_content)
+                    title = title_match.group(1) if title_match else "Pinterest Video"
+                    title = title.replace(' | Pinterest', '').strip()
+                    
+                    description_match = re.search(r'"description":\s*"([^"]*)"', html_content)
+                    description = description_match.group(1) if description_match else ""
+                    
+                    return {
+                        'video_url': video_url,
+                        'title': title,
+                        'description': description,
+                        'thumbnail': self._extract_thumbnail_from_html(html_content)
+                    }
+        
+        return None
+    
+    @staticmethod
+    def _extract_video_from_data(data: Dict[str, Any], pin_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        استخراج معلومات الفيديو من البيانات المهيكلة
+        
+        Args:
+            data: البيانات المستخرجة من الصفحة
+            pin_id: معرف Pin المطلوب، للوصول إليه مباشرة وتجنب فيديوهات Pins المقترحة
+            
+        Returns:
+            معلومات الفيديو أو None
+        """
+        try:
+            return AdvancedPinterestDownloader._locate_video(data, pin_id)
+        except Exception as e:
+            logger.warning(f"خطأ في استخراج الفيديو من البيانات: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _locate_video(data: Any, pin_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        تحديد موقع بيانات فيديو Pin دون زيارة كل عقد الحالة: المسارات المعروفة أولاً،
+        ثم استجابات الموارد، ثم بحث بالعرض محدود العمق وعدد العقد
+        
+        Args:
+            data: البيانات المستخرجة من الصفحة
+            pin_id: معرف Pin المطلوب (بدونه تُعاد أول عقدة تحتوي فيديو)
+            
+        Returns:
+            معلومات الفيديو، أو None إن لم توجد عقدة بمعرف Pin المطلوب تحتوي فيديو
+            (فيديوهات Pins المقترحة في نفس الصفحة لا تُعاد بدلاً منه)
+        """
+        cls = AdvancedPinterestDownloader
+        
+        # 1) المسارات المعروفة
+        for path in cls.PIN_HOT_PATHS:
+            node = data
+            for key in path:
+                if key is None:
+                    key = pin_id
+                if not isinstance(node, dict) or key not in node:
+                    break
+                node = node[key]
+            else:
+                if pin_id is not None and isinstance(node, dict) and str(node.get('id', pin_id)) != pin_id:
+                    continue
+                video_info = cls._video_info_from_pin(node)
+                if video_info:
+                    return video_info
+        
+        # 2) استجابات الموارد المضمنة في الصفحة
+        props = data.get('props', {}) if isinstance(data, dict) else {}
+        redux_state = props.get('initialReduxState', {}) if isinstance(props, dict) else {}
+        resources = redux_state.get('resources', {}) if isinstance(redux_state, dict) else {}
+        pin_resources = resources.get('PinResource', {}) if isinstance(resources, dict) else {}
+        candidates = [entry.get('data') for entry in pin_resources.values() if isinstance(entry, dict)] \
+            if isinstance(pin_resources, dict) else []
+        
+        for holder in (data, props):
+            responses = holder.get('resourceResponses') if isinstance(holder, dict) else None
+            if isinstance(responses, list):
+                candidates.extend(
+                    response.get('response', {}).get('data')
+                    for response in responses
+                    if isinstance(response, dict) and isinstance(response.get('response'), dict)
+                )
+        
+        for node in candidates:
+            if isinstance(node, dict) and (pin_id is None or str(node.get('id')) == pin_id):
+                video_info = cls._video_info_from_pin(node)
+                if video_info:
+                    return video_info
+        
+        # 3) بحث بالعرض محدود: أول عقدة بمعرف Pin المطلوب تحتوي فيديو
+        queue = deque([(data, 0)])
+        visited = 0
+        while queue and visited < cls.LOCATOR_MAX_NODES:
+            node, depth = queue.popleft()
+            visited += 1
+            
+            if isinstance(node, dict):
+                if pin_id is None or str(node.get('id')) == pin_id:
+                    video_info = cls._video_info_from_pin(node)
+                    if video_info:
+                        return video_info
+                children = node.values()
+            elif isinstance(node, list):
+                children = node
+            else:
+                continue
+            
+            if depth < cls.LOCATOR_MAX_DEPTH:
+                queue.extend((child, depth + 1) for child in children if isinstance(child, (dict, list)))
+        
+        return None
+    
+    @staticmethod
+    def _video_list_of(node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """قائمة جودات الفيديو الخاصة بعقدة Pin (فيديو عادي أو Story Pin)"""
+        videos = node.get('videos')
+        if isinstance(videos, dict) and isinstance(videos.get('video_list'), dict):
+            return videos['video_list']
+        
+        if isinstance(node.get('video_list'), dict):
+            return node['video_list']
+        
+        story = node.get('story_pin_data')
+        if isinstance(story, dict):
+            for page in story.get('pages') or []:
+                for block in (page or {}).get('blocks') or []:
+                    video = (block or {}).get('video')
+                    if isinstance(video, dict) and isinstance(video.get('video_list'), dict):
+                        return video['video_list']
+        
+        return None
+    
+    @staticmethod
+    def _video_info_from_pin(node: Any) -> Optional[Dict[str, Any]]:
+        """
+        بناء معلومات الفيديو من عقدة Pin إن كانت تحتوي على فيديو
+        
+        Args:
+            node: عقدة Pin
+            
+        Returns:
+            معلومات الفيديو أو None
+        """
+        if not isinstance(node, dict):
+            return None
+        
+        cls = AdvancedPinterestDownloader
+        video_list = cls._video_list_of(node)
+        
+        if video_list:
+            # الجودات المفضلة أولاً ثم أي جودة أخرى متاحة
+            ordered = [key for key in cls.VIDEO_QUALITY_KEYS if key in video_list]
+            ordered += [key for key in video_list if key not in cls.VIDEO_QUALITY_KEYS]
+            # كل الجودات المتاحة بالترتيب المفضل لاستخدامها كبدائل عند فشل الأولى
+            variants = [
+                {'quality': key, 'url': video_list[key]['url']}
+                for key in ordered
+                if isinstance(video_list[key], dict) and video_list[key].get('url')
+            ]
+            if variants:
+                return {
+                    'video_url': variants[0]['url'],
+                    'title': node.get('title') or node.get('grid_title') or '',
+                    'description': node.get('description') or '',
+                    'thumbnail': (node.get('images') or {}).get('orig', {}).get('url', ''),
+                    'quality': variants[0]['quality'],
+                    'variants': variants
+                }
+        
+        if isinstance(node.get('video_url'), str) and node['video_url']:
+            return {
+                'video_url': node['video_url'],
+                'title': node.get('title') or '',
+                'description': node.get('description') or '',
+                'thumbnail': node.get('thumbnail') or ''
+            }
+        
+        return None
+    
+    @staticmethod
+    def _extract_thumbnail_from_html(html_content: str) -> str:
+        """
+        استخراج رابط الصورة المصغرة من HTML
+        
+        Args:
+            html_content: محتوى HTML
+            
+        Returns:
+            رابط الصورة المصغرة
+        """
+        thumbnail_patterns = [
+            r'"images":\s*\{[^}]*"orig":\s*\{[^}]*"url":\s*"([^"]+)"',
+            r'property="og:image"\s+content="([^"]+)"',
+            r'"thumbnail":\s*"([^"]+)"',
+        ]
+        
+        for pattern in thumbnail_patterns:
+            match = re.search(pattern, html_content)
+            if match:
+                return match.group(1).replace('\\/', '/')
+        
+        return ""
+    
+    def _build_filepath(self, pin_id: str, file_extension: str) -> Path:
+        """بناء مسار ملف جديد داخل مجلد التحميل"""
+        filename = f"pinterest_{pin_id}_{int(time.time())}_{os.urandom(3).hex()}.{file_extension}"
+        return self.download_dir / filename
+    
+    @staticmethod
+    def _is_hls_url(url: str) -> bool:
+        """فحص ما إذا كان الرابط قائمة تشغيل HLS (m3u8)"""
+        return urlparse(url).path.lower().endswith('.m3u8')
+    
+    @staticmethod
+    def _parse_m3u8_attributes(line: str) -> Dict[str, str]:
+        """
+        تحليل خصائص وسم m3u8
+        
+        Args:
+            line: نص الخصائص بعد النقطتين
+            
+        Returns:
+            قاموس الخصائص بدون علامات التنصيص
+        """
+        return {
+            match.group(1): match.group(2).strip('"')
+            for match in _M3U8_ATTR_RE.finditer(line)
+        }
+    
+    @staticmethod
+    def _parse_m3u8_byterange(value: str, previous_end: int) -> Tuple[int, int]:
+        """
+        تحليل قيمة BYTERANGE بصيغة <length>[@<offset>]
+        
+        Returns:
+            (الطول, الإزاحة)
+        """
+        length, _, offset = value.partition('@')
+        return int(length), int(offset) if offset else previous_end
+    
+    def _parse_m3u8(self, text: str, base_url: str) -> Dict[str, Any]:
+        """
+        تحليل قائمة تشغيل HLS (رئيسية أو قائمة مقاطع)
+        
+        Args:
+            text: محتوى ملف m3u8
+            base_url: رابط القائمة لحل الروابط النسبية
+            
+        Returns:
+            قاموس يحتوي variants و segments و init و encrypted
+        """
+        playlist: Dict[str, Any] = {
+            'variants': [],
+            'segments': [],
+            'init': None,
+            'encrypted': False,
+        }
+        
+        pending_variant: Optional[Dict[str, Any]] = None
+        duration = 0.0
+        byterange: Optional[str] = None
+        last_end: Dict[str, int] = {}
+        
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
+            
+            if line.startswith('#EXT-X-STREAM-INF:'):
+                attrs = self._parse_m3u8_attributes(line.split(':', 1)[1])
+                resolution = attrs.get('RESOLUTION', '')
+                width, _, height = resolution.partition('x')
+                pending_variant = {
+                    'bandwidth': int(attrs.get('BANDWIDTH', 0) or 0),
+                    'average_bandwidth': int(attrs.get('AVERAGE-BANDWIDTH', 0) or 0),
+                    'resolution': (int(width), int(height)) if height.isdigit() and width.isdigit() else (0, 0),
+                    'audio': attrs.get('AUDIO'),
+                }
+            elif line.startswith('#EXTINF:'):
+                value = line.split(':', 1)[1].split(',', 1)[0]
+                try:
+                    duration = float(value)
+                except ValueError:
+                    duration = 0.0
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                # تُحل الإزاحة عند معرفة رابط المقطع التالي
+                byterange = line.split(':', 1)[1]
+            elif line.startswith('#EXT-X-MAP:') and playlist['init'] is None:
+                attrs = self._parse_m3u8_attributes(line.split(':', 1)[1])
+                init_url = urljoin(base_url, attrs.get('URI', ''))
+                init_range = None
+                if 'BYTERANGE' in attrs:
+                    init_range = self._parse_m3u8_byterange(attrs['BYTERANGE'], 0)
+                playlist['init'] = {'url': init_url, 'duration': 0.0, 'byterange': init_range}
+            elif line.startswith('#EXT-X-KEY:'):
+                attrs = self._parse_m3u8_attributes(line.split(':', 1)[1])
+                if attrs.get('METHOD', 'NONE') != 'NONE':
+                    playlist['encrypted'] = True
+            elif line.startswith('#'):
+                continue
+            elif pending_variant is not None:
+                pending_variant['url'] = urljoin(base_url, line)
+                playlist['variants'].append(pending_variant)
+                pending_variant = None
+            else:
+                segment_url = urljoin(base_url, line)
+                segment_range = None
+                if byterange is not None:
+                    segment_range = self._parse_m3u8_byterange(
+                        byterange, last_end.get(segment_url, 0)
+                    )
+                    last_end[segment_url] = segment_range[0] + segment_range[1]
+                    byterange = None
+                playlist['segments'].append({
+                    'url': segment_url,
+                    'duration': duration,
+                    'byterange': segment_range,
+                })
+                duration = 0.0
+        
+        return playlist
+    
+    @staticmethod
+    def _select_hls_variant(
+        variants: List[Dict[str, Any]],
+        duration: float = 0.0,
+        max_bytes: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        اختيار أعلى جودة من القائمة الرئيسية يتسع حجمها المقدر للحد المسموح
+        
+        Args:
+            variants: جودات القائمة الرئيسية
+            duration: مدة الفيديو بالثواني (0 إن كانت غير معروفة)
+            max_bytes: الحد الأقصى للحجم (None بلا حد)
+            
+        Returns:
+            الجودة المختارة أو None إذا لم تتسع أي جودة
+        """
+        ordered = sorted(variants, key=lambda v: (v['bandwidth'], v['resolution']), reverse=True)
+        if not max_bytes or not duration:
+            return ordered[0]
+        
+        for variant in ordered:
+            if AdvancedPinterestDownloader._estimate_hls_size(variant, duration) <= max_bytes:
+                return variant
+        return None
+    
+    @staticmethod
+    def _estimate_hls_size(variant: Dict[str, Any], duration: float) -> int:
+        """تقدير حجم جودة HLS من معدل البت × المدة"""
+        bandwidth = variant.get('average_bandwidth') or variant['bandwidth']
+        return int(bandwidth * duration / 8)
+    
+    @staticmethod
+    def _playlist_duration(playlist: Dict[str, Any]) -> float:
+        return sum(segment['duration'] for segment in playlist['segments'])
+    
+    @staticmethod
+    def _playlist_exact_size(playlist: Dict[str, Any]) -> Optional[int]:
+        """الحجم الدقيق لقائمة مقاطع BYTERANGE (None إن لم تكن كل المقاطع محددة النطاق)"""
+        segments = playlist['segments'] + ([playlist['init']] if playlist['init'] else [])
+        if not segments or not all(segment['byterange'] for segment in segments):
+            return None
+        return sum(segment['byterange'][0] for segment in segments)
+    
+    async def _fetch_hls_playlist(self, url: str, headers: Dict[str, str]) -> Optional[str]:
+        """
+        جلب نص قائمة تشغيل HLS
+        
+        Args:
+            url: رابط القائمة
+            headers: headers الطلب
+            
+        Returns:
+            محتوى القائمة أو None
+        """
+        async with self.session.get(url, headers=headers) as response:
+            if response.status in TRANSIENT_STATUSES:
+                raise TransientDownloadError(f"فشل تحميل قائمة HLS: {response.status}")
+            if response.status != 200:
+                logger.error(f"فشل تحميل قائمة HLS: {response.status}")
+                return None
+            return await response.text()
+    
+    async def _resolve_hls_media_playlist(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        max_bytes: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        الوصول إلى قائمة المقاطع، مع اختيار أعلى جودة ذات صوت مدمج يتسع حجمها
+        المقدر للحد إن كانت القائمة رئيسية
+        
+        Args:
+            url: رابط قائمة HLS
+            headers: headers الطلب
+            max_bytes: الحد الأقصى لحجم الفيديو (None بلا حد)
+            
+        Returns:
+            قائمة المقاطع المحللة أو None (ومنها عدم وجود جودة بصوت مدمج)
+            
+        Raises:
+            VariantTooLargeError: إذا تجاوز حجم كل الجودات الحد
+        """
+        text = await self._fetch_hls_playlist(url, headers)
+        if text is None:
+            return None
+        
+        playlist = self._parse_m3u8(text, url)
+        if playlist['variants']:
+            # الجودات ذات المسار الصوتي المنفصل (AUDIO) تُنتج فيديو بلا صوت عند تحميل مقاطعها وحدها
+            variants = [v for v in playlist['variants'] if not v.get('audio')]
+            if not variants:
+                logger.error("كل جودات HLS تستخدم مساراً صوتياً منفصلاً وغير مدعومة")
+                return None
+            
+            # قائمة أعلى جودة أولاً، ومنها تُعرف مدة الفيديو لتقدير أحجام الجودات الأخرى
+            variant = self._select_hls_variant(variants)
+            text = await self._fetch_hls_playlist(variant['url'], headers)
+            if text is None:
+                return None
+            playlist = self._parse_m3u8(text, variant['url'])
+            
+            duration = self._playlist_duration(playlist)
+            fitting = self._select_hls_variant(variants, duration, max_bytes)
+            if fitting is None:
+                smallest = min(self._estimate_hls_size(v, duration) for v in variants)
+                raise VariantTooLargeError(smallest, max_bytes)
+            
+            if fitting is not variant:
+                variant = fitting
+                text = await self._fetch_hls_playlist(variant['url'], headers)
+                if text is None:
+                    return None
+                playlist = self._parse_m3u8(text, variant['url'])
+            
+            playlist['estimated_size'] = self._estimate_hls_size(variant, duration)
+            logger.info(
+                f"تم اختيار جودة HLS: {variant['resolution'][0]}x{variant['resolution'][1]} "
+                f"({variant['bandwidth']} bps، الحجم المقدر "
+                f"{playlist['estimated_size'] / (1024*1024):.1f} MB)"
+            )
+        
+        if not playlist['segments']:
+            logger.error("قائمة HLS لا تحتوي على مقاطع")
+            return None
+        
+        exact_size = self._playlist_exact_size(playlist)
+        if max_bytes and exact_size and exact_size > max_bytes:
+            raise VariantTooLargeError(exact_size, max_bytes)
+        
+        return playlist
+    
+    async def _fetch_hls_segment(self, segment: Dict[str, Any], headers: Dict[str, str]) -> bytes:
+        """
+        تحميل مقطع HLS واحد إلى الذاكرة
+        
+        Args:
+            segment: بيانات المقطع (url و byterange)
+            headers: headers الطلب
+            
+        Returns:
+            محتوى المقطع
+        """
+        if segment['byterange']:
+            length, offset = segment['byterange']
+            headers = dict(headers, Range=f"bytes={offset}-{offset + length - 1}")
+        
+        async with self.session.get(segment['url'], headers=headers, timeout=self._media_timeout) as response:
+            response.raise_for_status()
+            return await response.read()
+    
+    async def _download_hls(
+        self,
+        playlist_url: str,
+        pin_id: str,
+        headers: Dict[str, str],
+        max_bytes: Optional[int] = None
+    ) -> Optional[Path]:
+        """
+        تحميل فيديو HLS بجلب المقاطع بالتوازي ضمن نافذة محدودة
+        وكتابتها في الملف بالترتيب فور وصولها، مع استئناف التحميل المنقطع
+        
+        Args:
+            playlist_url: رابط قائمة m3u8
+            pin_id: معرف Pin
+            headers: headers الطلب
+            max_bytes: الحد الأقصى لحجم الفيديو (None بلا حد)
+            
+        Returns:
+            مسار الملف أو None
+        """
+        playlist = await self._resolve_hls_media_playlist(playlist_url, headers, max_bytes)
+        if not playlist:
+            return None
+        
+        if playlist['encrypted']:
+            logger.error("قائمة HLS مشفرة وغير مدعومة")
+            return None
+        
+        segments = playlist['segments']
+        if playlist['init']:
+            # مقاطع fMP4: مقطع التهيئة أولاً ثم مقاطع الوسائط
+            segments = [playlist['init']] + segments
+        
+        file_extension = 'mp4' if playlist['init'] else 'ts'
+        part_path = self._partial_path(pin_id, playlist_url, file_extension)
+        # طلبا تحميل لنفس المصدر (بحدود حجم مختلفة) لا يكتبان في نفس الملف الجزئي معاً
+        async with self._partial_locks.hold(part_path.name):
+            journal = DownloadJournal(part_path, 'hls', playlist_url, len(segments))
+            
+            start = journal.state['next_index'] if journal.resumed else 0
+            offset = journal.state['offset'] if journal.resumed else 0
+            if start:
+                logger.info(f"استئناف تحميل HLS من المقطع {start}/{len(segments)}")
+            else:
+                journal.save(next_index=0, offset=0)
+            
+            logger.info(f"تحميل {len(segments) - start} مقطع HLS بالتوازي ({self.hls_concurrency} في نفس الوقت)")
+            
+            pending: deque = deque()
+            try:
+                async with aiofiles.open(part_path, 'r+b' if start else 'wb') as file:
+                    if start:
+                        await file.truncate(offset)
+                        await file.seek(offset)
+                    
+                    for segment in segments[start:]:
+                        # النافذة ممتلئة: انتظار أقدم مقطع وكتابته قبل جدولة مقطع جديد
+                        if len(pending) >= self.hls_concurrency:
+                            await self._write_hls_segment(file, pending, journal, max_bytes)
+                        pending.append(asyncio.create_task(self._fetch_hls_segment(segment, headers)))
+                    
+                    while pending:
+                        await self._write_hls_segment(file, pending, journal, max_bytes)
+            except BaseException:
+                # يبقى الملف الجزئي وسجله (بآخر تقدم مكتوب) لاستئناف التحميل لاحقاً
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                journal.save()
+                raise
+            
+            return self._finalize_partial(part_path, journal, pin_id, file_extension)
+        
+    @staticmethod
+    async def _write_hls_segment(
+        file,
+        pending: deque,
+        journal: DownloadJournal,
+        max_bytes: Optional[int] = None
+    ) -> None:
+        """كتابة أقدم مقطع في النافذة ثم تحديث السجل (يُحفظ على القرص دورياً)"""
+        data = await pending.popleft()
+        if max_bytes and journal.state['offset'] + len(data) > max_bytes:
+            # التقدير كان أقل من الحجم الفعلي
+            raise VariantTooLargeError(journal.state['offset'] + len(data), max_bytes)
+        await file.write(data)
+        await file.flush()
+        journal.checkpoint(
+            next_index=journal.state['next_index'] + 1,
+            offset=journal.state['offset'] + len(data)
+        )
+    
+    async def _probe_video(self, video_url: str, headers: Dict[str, str]) -> Optional[Tuple[str, int, bool]]:
+        """
+        فحص حجم الملف ودعم الخادم لطلبات Range عبر HEAD
+        
+        Args:
+            video_url: رابط الفيديو المباشر
+            headers: headers الطلب
+            
+        Returns:
+            (الرابط النهائي بعد التحويلات, حجم الملف أو 0 إن كان غير معروف, دعم Range) أو None
+        """
+        try:
+            async with self.session.head(video_url, headers=headers, allow_redirects=True) as response:
+                if response.status != 200:
+                    return None
+                accept_ranges = response.headers.get('Accept-Ranges', '').lower()
+                total_size = int(response.headers.get('Content-Length', 0) or 0)
+                final_url = str(response.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"فشل فحص الملف: {str(e)}")
+            return None
+        
+        return final_url, total_size, accept_ranges == 'bytes' and total_size > 0
+    
+    async def _download_range_part(
+        self,
+        video_url: str,
+        filepath: Path,
+        index: int,
+        start: int,
+        end: int,
+        headers: Dict[str, str],
+        semaphore: asyncio.Semaphore,
+        journal: DownloadJournal
+    ) -> None:
+        """
+        تحميل جزء من الملف وكتابته في موضعه داخل الملف المحجوز مسبقاً
+        
+        Args:
+            video_url: رابط الفيديو المباشر
+            filepath: مسار الملف المحجوز
+            index: رقم الجزء في السجل
+            start: بداية الجزء (شاملة)
+            end: نهاية الجزء (شاملة)
+            headers: headers الطلب
+            semaphore: محدد عدد الاتصالات المتزامنة
+            journal: سجل التقدم
+        """
+        part_headers = dict(headers, Range=f"bytes={start}-{end}")
+        
+        async with semaphore:
+            async with self.session.get(video_url, headers=part_headers, timeout=self._media_timeout) as response:
+                response.raise_for_status()
+                if response.status != 206:
+                    # الخادم تجاهل Range
+                    raise aiohttp.ClientPayloadError(
+                        f"الخادم لم يُرجع جزءاً (HTTP {response.status}) للنطاق {start}-{end}"
+                    )
+                
+                async with aiofiles.open(filepath, 'r+b') as file:
+                    await file.seek(start)
+                    position = start
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        await file.write(chunk)
+                        position += len(chunk)
+        
+        if position != end + 1:
+            raise aiohttp.ClientPayloadError(f"جزء غير مكتمل: {start}-{end} ({position - start} bytes)")
+        
+        journal.mark_done(index)
+    
+    async def _download_ranged(
+        self,
+        video_url: str,
+        filepath: Path,
+        total_size: int,
+        headers: Dict[str, str],
+        journal: DownloadJournal
+    ) -> None:
+        """
+        تحميل الملف على أجزاء متوازية عبر عدة اتصالات HTTP Range
+        
+        Args:
+            video_url: رابط الفيديو المباشر
+            filepath: مسار الملف
+            total_size: حجم الملف الكلي
+            headers: headers الطلب
+            journal: سجل الأجزاء المكتملة
+        """
+        # طلب المحتوى بدون ضغط حتى تطابق الإزاحات حجم الملف الفعلي
+        headers = dict(headers, **{'Accept-Encoding': 'identity'})
+        
+        if not journal.resumed or filepath.stat().st_size != total_size:
+            # حجز الملف مسبقاً بحجمه الكامل ليكتب كل جزء في موضعه
+            async with aiofiles.open(filepath, 'wb') as file:
+                await file.truncate(total_size)
+            journal.save(done=[])
+        
+        semaphore = asyncio.Semaphore(self.range_connections)
+        starts = range(0, total_size, self.range_part_size)
+        tasks = [
+            asyncio.create_task(self._download_range_part(
+                video_url, filepath, index, start, min(start + self.range_part_size, total_size) - 1,
+                headers, semaphore, journal
+            ))
+            for index, start in enumerate(starts)
+            if not journal.is_done(index)
+        ]
+        
+        if journal.resumed:
+            logger.info(f"استئناف التحميل المقسم: {len(starts) - len(tasks)}/{len(starts)} جزء مكتمل مسبقاً")
+        logger.info(
+            f"تحميل مقسم: {len(tasks)} جزء عبر {self.range_connections} اتصال "
+            f"({total_size / (1024*1024):.2f} MB)"
+        )
+        
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    
+    async def _download_single_stream(
+        self,
+        video_url: str,
+        filepath: Path,
+        headers: Dict[str, str],
+        journal: DownloadJournal,
+        max_bytes: Optional[int] = None
+    ) -> bool:
+        """
+        تحميل الملف عبر اتصال واحد، مع المتابعة من آخر بايت محفوظ إن أمكن
+        
+        Args:
+            video_url: رابط الفيديو المباشر
+            filepath: مسار الملف
+            headers: headers الطلب
+            journal: سجل التقدم
+            max_bytes: الحد الأقصى لحجم الملف (None بلا حد)
+            
+        Returns:
+            True عند النجاح
+        """
+        offset = journal.state['offset'] if journal.resumed else 0
+        if offset:
+            headers = dict(headers, Range=f"bytes={offset}-", **{'Accept-Encoding': 'identity'})
+        
+        async with self.session.get(video_url, headers=headers, timeout=self._media_timeout) as response:
+            if response.status == 206 and offset:
+                logger.info(f"استئناف التحميل من {offset / (1024*1024):.2f} MB")
+            elif response.status == 200:
+                offset = 0
+            elif response.status in TRANSIENT_STATUSES:
+                raise TransientDownloadError(f"فشل تحميل الفيديو: {response.status}")
+            else:
+                logger.error(f"فشل تحميل الفيديو: {response.status}")
+                return False
+            
+            total_size = offset + int(response.headers.get('content-length', 0))
+            if max_bytes and total_size > max_bytes:
+                raise VariantTooLargeError(total_size, max_bytes)
+            journal.save(offset=offset)
+            
+            async with aiofiles.open(filepath, 'r+b' if offset else 'wb') as file:
+                if offset:
+                    await file.truncate(offset)
+                    await file.seek(offset)
+                
+                downloaded = offset
+                checkpoint = offset + 1024 * 1024
+                async for chunk in response.content.iter_chunked(8192):
+                    await file.write(chunk)
+                    downloaded += len(chunk)
+                    if max_bytes and downloaded > max_bytes:
+                        # الخادم لم يرسل Content-Length
+                        raise VariantTooLargeError(downloaded, max_bytes)
+                    
+                    # تسجيل التقدم وحفظ السجل كل MB
+                    if downloaded >= checkpoint:
+                        checkpoint = downloaded + 1024 * 1024
+                        await file.flush()
+                        journal.save(offset=downloaded)
+                        progress = (downloaded / total_size * 100) if total_size > 0 else 0
+                        logger.info(f"تقدم التحميل: {progress:.1f}%")
+        
+        return True
+    
+    async def _download_progressive(
+        self,
+        video_url: str,
+        pin_id: str,
+        headers: Dict[str, str],
+        max_bytes: Optional[int] = None
+    ) -> Optional[Path]:
+        """
+        تحميل ملف فيديو مباشر (mp4/webm/mov)، على أجزاء متوازية إن دعم الخادم Range
+        
+        Args:
+            video_url: رابط الفيديو المباشر
+            pin_id: معرف Pin
+            headers: headers الطلب
+            max_bytes: الحد الأقصى لحجم الملف (None بلا حد)
+            
+        Returns:
+            مسار الملف أو None
+            
+        Raises:
+            VariantTooLargeError: إذا تجاوز حجم الملف الحد
+        """
+        # تحديد امتداد الملف
+        file_extension = 'mp4'
+        if '.webm' in video_url:
+            file_extension = 'webm'
+        elif '.mov' in video_url:
+            file_extension = 'mov'
+        
+        part_path = self._partial_path(pin_id, video_url, file_extension)
+        # طلبا تحميل لنفس المصدر (بحدود حجم مختلفة) لا يكتبان في نفس الملف الجزئي معاً
+        async with self._partial_locks.hold(part_path.name):
+            probe = None
+            if self.range_connections > 1 or max_bytes:
+                probe = await self._probe_video(video_url, headers)
+            
+            # رفض الملفات الكبيرة قبل تحميل أي بايت
+            if probe and max_bytes and probe[1] > max_bytes:
+                raise VariantTooLargeError(probe[1], max_bytes)
+            
+            if probe and probe[2] and self.range_connections > 1 and probe[1] > self.range_part_size:
+                final_url, total_size, _ = probe
+                journal = DownloadJournal(
+                    part_path, 'ranged', video_url, total_size, part_size=self.range_part_size
+                )
+                try:
+                    await self._download_ranged(final_url, part_path, total_size, headers, journal)
+                    return self._finalize_partial(part_path, journal, pin_id, file_extension)
+                except aiohttp.ClientPayloadError as e:
+                    # الخادم تجاهل Range أو قطع الجزء: الرجوع إلى الاتصال الواحد
+                    logger.warning(f"فشل التحميل المقسم، الرجوع إلى اتصال واحد: {str(e)}")
+            
+            journal = DownloadJournal(part_path, 'stream', video_url)
+            if not await self._download_single_stream(video_url, part_path, headers, journal, max_bytes):
+                return None
+            
+            return self._finalize_partial(part_path, journal, pin_id, file_extension)
+        
+    def _partial_path(self, pin_id: str, source_url: str, file_extension: str) -> Path:
+        """
+        مسار ثابت للملف الجزئي حتى يستأنف أي طلب لاحق لنفس المصدر من حيث توقف
+        
+        Args:
+            pin_id: معرف Pin
+            source_url: رابط المصدر (بدون معاملات الاستعلام)
+            file_extension: امتداد الملف
+            
+        Returns:
+            مسار الملف الجزئي
+        """
+        parsed = urlparse(source_url)
+        digest = hashlib.sha1(f"{parsed.netloc}{parsed.path}".encode()).hexdigest()[:12]
+        return self.download_dir / f"pinterest_{pin_id}_{digest}.{file_extension}.part"
+    
+    def _finalize_partial(self, part_path: Path, journal: DownloadJournal, pin_id: str, file_extension: str) -> Path:
+        """نقل الملف الجزئي المكتمل إلى اسمه النهائي وحذف سجله"""
+        filepath = self._build_filepath(pin_id, file_extension)
+        os.replace(part_path, filepath)
+        journal.discard()
+        return filepath
+    
+    def recover_partial_downloads(self, max_age_hours: Optional[float] = None) -> Dict[str, int]:
+        """
+        مراجعة الملفات الجزئية (عند بدء التشغيل ومع كل تنظيف دوري): إبقاء ما يمكن
+        استئنافه وحذف الملفات القديمة أو التي لا سجل لها
+        
+        Args:
+            max_age_hours: أقصى عمر لآخر تقدم مسجل حتى يبقى الملف قابلاً للاستئناف
+                (الافتراضي partial_retention_hours)
+            
+        Returns:
+            عدد الملفات القابلة للاستئناف والمحذوفة
+        """
+        resumable = 0
+        discarded = 0
+        now = time.time()
+        if max_age_hours is None:
+            max_age_hours = self.partial_retention_hours
+        max_age_seconds = max_age_hours * 3600
+        
+        try:
+            for path in list(self.download_dir.iterdir()):
+                if not path.is_file():
+                    continue
+                
+                if path.name.endswith(DownloadJournal.SUFFIX):
+                    # سجل بلا ملف بيانات
+                    data_path = path.with_name(path.name[:-len(DownloadJournal.SUFFIX)])
+                    if not data_path.exists():
+                        path.unlink()
+                    continue
+                
+                if not path.name.endswith('.part'):
+                    continue
+                
+                state = DownloadJournal.read(path)
+                if (
+                    state
+                    and now - state.get('updated_at', 0) <= max_age_seconds
+                    and path.stat().st_size >= state.get('offset', 0)
+                ):
+                    resumable += 1
+                    continue
+                
+                path.unlink()
+                journal_path = path.with_name(path.name + DownloadJournal.SUFFIX)
+                if journal_path.exists():
+                    journal_path.unlink()
+                discarded += 1
+        except Exception as e:
+            logger.error(f"خطأ في مراجعة الملفات الجزئية: {str(e)}")
+        
+        logger.info(f"الملفات الجزئية: {resumable} قابل للاستئناف، {discarded} محذوف")
+        return {'resumable': resumable, 'discarded': discarded}
+    
+    async def _download_video_file(
+        self,
+        video_url: str,
+        pin_id: str,
+        fallback_urls: Iterable[str] = (),
+        max_bytes: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        تحميل ملف الفيديو مع إعادة المحاولة للأخطاء المؤقتة (يُستأنف من الملف الجزئي)،
+        والانتقال إلى الجودة التالية إذا فشلت الجودة المختارة أو توقفت أو تجاوز حجمها الحد
+        
+        Args:
+            video_url: رابط الفيديو المباشر أو قائمة HLS
+            pin_id: معرف Pin
+            fallback_urls: روابط الجودات البديلة بالترتيب المفضل
+            max_bytes: الحد الأقصى لحجم الفيديو (None بلا حد)
+            
+        Returns:
+            مسار الملف المحمل أو None
+        """
+        candidates = list(dict.fromkeys([video_url, *fallback_urls]))
+        
+        for index, candidate in enumerate(candidates):
+            if index:
+                self._resilience_events.inc(event='quality_fallback')
+                logger.warning(f"الانتقال إلى الجودة البديلة {index}/{len(candidates) - 1}: {candidate}")
+            
+            try:
+                filepath = await self._with_retries(
+                    lambda: self._download_variant(candidate, pin_id, max_bytes), "تحميل الفيديو"
+                )
+            except VariantTooLargeError as e:
+                logger.warning(f"تخطي الجودة: {str(e)}")
+                continue
+            except Exception as e:
+                logger.error(f"خطأ في تحميل الفيديو: {str(e)}")
+                continue
+            
+            if filepath:
+                return filepath
+        
+        return None
+    
+    async def _download_variant(self, video_url: str, pin_id: str, max_bytes: Optional[int] = None) -> Optional[str]:
+        """
+        محاولة واحدة لتحميل جودة محددة
+        
+        Args:
+            video_url: رابط الفيديو المباشر أو قائمة HLS
+            pin_id: معرف Pin
+            max_bytes: الحد الأقصى لحجم الفيديو (None بلا حد)
+            
+        Returns:
+            مسار الملف المحمل أو None عند فشل دائم
+        """
+        headers = self._get_fresh_headers()
+        headers['Referer'] = 'https://www.pinterest.com/'
+        
+        logger.info(f"بدء تحميل الفيديو: {video_url}")
+        
+        started = time.perf_counter()
+        with self._stage_seconds.time(stage='transfer'):
+            if self._is_hls_url(video_url):
+                filepath = await self._download_hls(video_url, pin_id, headers, max_bytes)
+            else:
+                filepath = await self._download_progressive(video_url, pin_id, headers, max_bytes)
+        
+        if not filepath:
+            return None
+        
+        file_size = filepath.stat().st_size
+        self._record_transfer('file', file_size, time.perf_counter() - started)
+        if file_size < 1024:  # أقل من 1KB
+            logger.error(f"الملف المحمل صغير جداً: {file_size} bytes")
+            filepath.unlink()
+            return None
         
-        return 'pinterest' in url and ('pin' in url or '/idea' in url)
+        logger.info(f"تم تحميل الفيديو بنجاح: {filepath} ({file_size / (1024*1024):.2f} MB)")
+        return str(filepath)
     
-    def _extract_pin_id(self, url: str) -> Optional[str]:
+    async def resolve_pin_id(self, url: str) -> Optional[str]:
         """
-        استخراج معرف Pin من الرابط
+        الحصول على معرف Pin القانوني للرابط (بعد توسيع الروابط المختصرة)
         
         Args:
             url: رابط Pinterest
@@ -146,354 +2681,776 @@ class AdvancedPinterestDownloader:
         Returns:
             معرف Pin أو None
         """
-        # أنماط استخراج Pin ID
-        patterns = [
-            r'/pin/(\d+)',
-            r'pin\.it/([a-zA-Z0-9]+)',
-            r'pinterest\.com/pin/(\d+)',
-            r'/pin/([a-zA-Z0-9]+)',
-        ]
+        if 'pin.it' in url:
+            url = await self._expand_short_url(url)
+        return self._extract_pin_id(url)
+    
+    async def _resolve_pin_data(self, url: str, pin_id: str) -> Optional[Dict[str, Any]]:
+        """
+        الحصول على بيانات فيديو Pin من الذاكرة المؤقتة، أو من صفحته عند عدم وجودها،
+        مع دمج الطلبات المتزامنة لنفس Pin في جلب واحد
         
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        Args:
+            url: رابط Pin
+            pin_id: معرف Pin
+            
+        Returns:
+            بيانات الفيديو أو None
+        """
+        started = time.monotonic()
+        video_data = await self.resolution_cache.get(pin_id)
+        if video_data:
+            logger.info(f"تم استخدام البيانات المحللة مسبقاً للـ Pin: {pin_id}")
+            self._record_resolution(pin_id, 'cache', started, True)
+            return video_data
         
-        return None
+        video_data = await self._inflight.do(
+            f"resolve:{pin_id}", lambda: self._fetch_pin_data(url, pin_id)
+        )
+        return dict(video_data) if video_data else None
     
-    async def _expand_short_url(self, url: str) -> str:
+    async def _fetch_pin_data(self, url: str, pin_id: str) -> Optional[Dict[str, Any]]:
+        """جلب بيانات Pin عبر مورد JSON أولاً ثم من صفحته، وحفظها في الذاكرة المؤقتة"""
+        video_data = None
+        
+        if self.api_fast_path:
+            started = time.monotonic()
+            video_data = await self._get_pin_data_from_api(pin_id)
+            self._record_resolution(pin_id, 'api', started, bool(video_data))
+        
+        if not video_data:
+            # استخراج بيانات الفيديو من الصفحة
+            started = time.monotonic()
+            video_data = await self._get_pin_data_from_page(url, pin_id)
+            self._record_resolution(pin_id, 'html', started, bool(video_data and video_data.get('video_url')))
+        
+        if video_data and video_data.get('video_url'):
+            await self.resolution_cache.set(pin_id, video_data)
+        
+        return video_data
+    
+    async def _get_pin_data_from_api(self, pin_id: str) -> Optional[Dict[str, Any]]:
         """
-        توسيع الروابط المختصرة
+        تحليل Pin عبر مورد PinResource (استجابة JSON أصغر بكثير من صفحة HTML)
         
         Args:
-            url: الرابط المختصر
+            pin_id: معرف Pin
             
         Returns:
-            الرابط الكامل
+            معلومات الفيديو أو None (ليُستخدم تحليل الصفحة)
         """
+        if not pin_id.isdigit():
+            return None
+        
         try:
-            if 'pin.it' in url:
-                headers = self._get_fresh_headers()
-                
-                async with self.session.head(url, headers=headers, allow_redirects=True) as response:
-                    return str(response.url)
+            response = await self._fetch_resource(
+                'pin_data', {'id': pin_id, 'field_set_key': 'detailed'}, f"/pin/{pin_id}/"
+            )
         except Exception as e:
-            logger.warning(f"فشل توسيع الرابط: {str(e)}")
+            logger.warning(f"فشل تحليل Pin عبر API: {str(e)}")
+            return None
+        
+        video_data = self._video_info_from_pin((response or {}).get('data'))
+        if video_data:
+            video_data['title'] = video_data['title'] or 'Pinterest Video'
+        return video_data
+    
+    def _record_resolution(self, pin_id: str, strategy: str, started: float, success: bool) -> None:
+        """تسجيل طريقة تحليل Pin وزمنها"""
+        seconds = time.monotonic() - started
+        self._stage_seconds.observe(seconds, stage=f"resolve_{strategy}")
+        self._resolutions.inc(strategy=strategy, result='success' if success else 'failure')
         
-        return url
+        self.resolution_log.append({
+            'pin_id': pin_id,
+            'strategy': strategy,
+            'seconds': seconds,
+            'success': success,
+            'at': time.time(),
+        })
+        logger.info(f"تحليل Pin {pin_id} عبر {strategy}: {seconds * 1000:.0f}ms ({'نجاح' if success else 'فشل'})")
     
-    async def _get_pin_data_from_page(self, url: str) -> Optional[Dict[str, Any]]:
+    async def download_video(
+        self,
+        url: str,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT
+    ) -> Optional[Dict[str, Any]]:
         """
-        استخراج بيانات Pin من صفحة الويب مباشرة
+        تحميل فيديو Pinterest بالنظام المتقدم، بأعلى جودة يتسع حجمها للحد المسموح
         
         Args:
-            url: رابط Pin
+            url: رابط Pinterest
+            max_bytes: الحد الأقصى لحجم الفيديو (الافتراضي حد رفع Telegram، None بلا حد)
             
         Returns:
-            بيانات Pin أو None
+            معلومات الفيديو المحمل أو None
         """
         try:
-            headers = self._get_fresh_headers()
-            
-            async with self.session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    logger.warning(f"فشل تحميل الصفحة: {response.status}")
-                    return None
-                
-                html_content = await response.text()
-                
-                # البحث عن JSON data في الصفحة
-                json_patterns = [
-                    r'<script[^>]*>\s*window\.__PWS_DATA__\s*=\s*({.*?});\s*</script>',
-                    r'<script[^>]*>\s*window\.__INITIAL_STATE__\s*=\s*({.*?});\s*</script>',
-                    r'"__PWS_DATA__":\s*({.*?}),',
-                    r'"resourceDataCache":\s*({.*?}),',
-                ]
-                
-                for pattern in json_patterns:
-                    matches = re.findall(pattern, html_content, re.DOTALL)
-                    for match in matches:
-                        try:
-                            data = json.loads(match)
-                            
-                            # البحث عن بيانات الفيديو في البيانات المستخرجة
-                            video_data = self._extract_video_from_data(data)
-                            if video_data:
-                                return video_data
-                                
-                        except json.JSONDecodeError:
-                            continue
-                
-                # طريقة بديلة: البحث عن روابط الفيديو مباشرة في HTML
-                video_patterns = [
-                    r'"video_list":\s*\{[^}]*"V_HLSV4":\s*\{[^}]*"url":\s*"([^"]+)"',
-                    r'"videos":\s*\{[^}]*"video_list":\s*\{[^}]*"V_HLSV3":\s*\{[^}]*"url":\s*"([^"]+)"',
-                    r'"story_pin_data_id":[^}]*"video_url":\s*"([^"]+)"',
-                    r'contentUrl":\s*"([^"]*\.mp4[^"]*)"',
-                    r'"video":\s*\{[^}]*"url":\s*"([^"]+\.mp4[^"]*)"',
-                ]
-                
-                for pattern in video_patterns:
-                    matches = re.findall(pattern, html_content)
-                    if matches:
-                        video_url = matches[0].replace('\\/', '/')
-                        if video_url.startswith('http'):
-                            # استخراج العنوان والوصف من الصفحة
-                            title_match = re.search(r'<title[^>]*>([^<]+)</title>', html_content)
-                            title = title_match.group(1) if title_match else "Pinterest Video"
-                            title = title.replace(' | Pinterest', '').strip()
-                            
-                            description_match = re.search(r'"description":\s*"([^"]*)"', html_content)
-                            description = description_match.group(1) if description_match else ""
-                            
-                            return {
-                                'video_url': video_url,
-                                'title': title,
-                                'description': description,
-                                'thumbnail': self._extract_thumbnail_from_html(html_content)
-                            }
-                
-                logger.warning("لم يتم العثور على بيانات فيديو في الصفحة")
-                return None
-                
+            with self._active_downloads.track_inprogress(), self._stage_seconds.time(stage='download_video'):
+                return await self._download_video(url, max_bytes)
         except Exception as e:
-            logger.error(f"خطأ في استخراج بيانات Pin: {str(e)}")
+            logger.error(f"خطأ في تحميل الفيديو: {str(e)}")
+            return None
+    
+    async def _download_video(self, url: str, max_bytes: Optional[int]) -> Optional[Dict[str, Any]]:
+        """تنفيذ download_video"""
+        resolved = await self._resolve_video(url)
+        if not resolved:
+            return None
+        pin_id, video_data = resolved
+        video_url = video_data['video_url']
+        
+        # إعادة استخدام نسخة مخزنة مسبقاً، وإلا تحميل الفيديو وإضافته للمخزن
+        stored = self._stored_within(pin_id, max_bytes)
+        if stored:
+            logger.info(f"تم استخدام الفيديو المخزن مسبقاً: {stored.name}")
+        else:
+            fallback_urls = [variant['url'] for variant in video_data.get('variants') or []]
+            stored = await self._inflight.do(
+                f"download:{pin_id}:{max_bytes}",
+                lambda: self._download_to_store(video_url, pin_id, fallback_urls, max_bytes)
+            )
+            if not stored:
+                return None
+        
+        filepath = str(self.content_store.checkout(stored, self._build_filepath(pin_id, stored.suffix[1:])))
+        
+        return {
+            'filepath': filepath,
+            'title': video_data.get('title', 'Pinterest Video'),
+            'description': video_data.get('description', ''),
+            'thumbnail': video_data.get('thumbnail', ''),
+            'pin_id': pin_id,
+            'video_url': video_url,
+            'filesize': Path(filepath).stat().st_size
+        }
+    
+    async def _resolve_video(self, url: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        توسيع الرابط واستخراج معرف Pin وبيانات الفيديو
+        
+        Args:
+            url: رابط Pinterest
+            
+        Returns:
+            (معرف Pin, بيانات الفيديو) أو None
+        """
+        if not self.is_pinterest_url(url):
+            logger.error(f"الرابط ليس من Pinterest: {url}")
+            return None
+        
+        # توسيع الروابط المختصرة
+        if 'pin.it' in url:
+            url = await self._expand_short_url(url)
+        
+        # استخراج معرف Pin
+        pin_id = self._extract_pin_id(url)
+        if not pin_id:
+            logger.error(f"فشل استخراج معرف Pin: {url}")
+            return None
+        
+        logger.info(f"بدء تحميل Pin: {pin_id}")
+        
+        video_data = await self._resolve_pin_data(url, pin_id)
+        if not video_data:
+            logger.error("فشل استخراج بيانات الفيديو")
+            return None
+        
+        if not video_data.get('video_url'):
+            logger.error("لم يتم العثور على رابط الفيديو")
+            return None
+        
+        return pin_id, video_data
+    
+    def _stored_within(self, pin_id: str, max_bytes: Optional[int]) -> Optional[Path]:
+        """نسخة Pin في المخزن إن وُجدت ولم تتجاوز الحد (قد تكون حُملت بحد أكبر)"""
+        stored = self.content_store.lookup(pin_id)
+        if stored and max_bytes and stored.stat().st_size > max_bytes:
             return None
+        return stored
     
-    def _extract_video_from_data(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def stream_video(
+        self,
+        url: str,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT,
+        buffer_bytes: Optional[int] = None
+    ) -> Optional[VideoStream]:
         """
-        استخراج معلومات الفيديو من البيانات المهيكلة
+        فتح بث لفيديو Pinterest من CDN مباشرة دون كتابته على القرص،
+        بأعلى جودة يتسع حجمها للحد المسموح
         
         Args:
-            data: البيانات المستخرجة من الصفحة
+            url: رابط Pinterest
+            max_bytes: الحد الأقصى لحجم الفيديو (None بلا حد)
+            buffer_bytes: حجم المخزن المؤقت في الذاكرة (الافتراضي stream_buffer_bytes)
             
         Returns:
-            معلومات الفيديو أو None
+            بث الفيديو (يجب إغلاقه بعد الاستخدام، مثلاً عبر async with) أو None
         """
         try:
-            # البحث في مسارات مختلفة للبيانات
-            search_paths = [
-                ['props', 'initialReduxState', 'pins'],
-                ['props', 'pageProps', 'pin'],
-                ['resourceDataCache'],
-                ['pins'],
-                ['pin']
-            ]
+            resolved = await self._resolve_video(url)
+            if not resolved:
+                return None
+            pin_id, video_data = resolved
             
-            for path in search_paths:
-                current_data = data
-                for key in path:
-                    if isinstance(current_data, dict) and key in current_data:
-                        current_data = current_data[key]
-                    else:
-                        break
-                else:
-                    # تم العثور على البيانات، البحث عن الفيديو
-                    video_info = self._find_video_in_structure(current_data)
-                    if video_info:
-                        return video_info
+            info = {
+                'title': video_data.get('title', 'Pinterest Video'),
+                'description': video_data.get('description', ''),
+                'thumbnail': video_data.get('thumbnail', ''),
+                'pin_id': pin_id,
+            }
+            buffer_bytes = buffer_bytes or self.stream_buffer_bytes
+            
+            # نسخة مخزنة مسبقاً تُقرأ من القرص بدلاً من تحميلها مجدداً
+            stored = self._stored_within(pin_id, max_bytes)
+            if stored:
+                opened = await self._open_stream_source(self._iter_file_stream(stored))
+                if opened:
+                    source, meta = opened
+                    return VideoStream(
+                        source, meta['size'], buffer_bytes, self._on_stream_closed,
+                        video_url=video_data['video_url'], extension=meta['extension'], **info
+                    )
+            
+            candidates = [video_data['video_url']]
+            candidates += [variant['url'] for variant in video_data.get('variants') or []]
+            
+            for candidate in dict.fromkeys(candidates):
+                try:
+                    opened = await self._with_retries(
+                        lambda: self._open_variant_stream(candidate, max_bytes), "فتح بث الفيديو"
+                    )
+                except VariantTooLargeError as e:
+                    logger.warning(f"تخطي الجودة: {str(e)}")
+                    continue
+                except Exception as e:
+                    logger.error(f"خطأ في فتح بث الفيديو: {str(e)}")
+                    continue
+                
+                if opened:
+                    source, meta = opened
+                    logger.info(f"بدء بث الفيديو: {candidate}")
+                    return VideoStream(
+                        source, meta['size'], buffer_bytes, self._on_stream_closed,
+                        estimated_size=meta.get('estimated_size'),
+                        video_url=candidate, extension=meta['extension'], **info
+                    )
             
             return None
             
         except Exception as e:
-            logger.warning(f"خطأ في استخراج الفيديو من البيانات: {str(e)}")
+            logger.error(f"خطأ في بث الفيديو: {str(e)}")
             return None
     
-    def _find_video_in_structure(self, data: Any) -> Optional[Dict[str, Any]]:
+    def _on_stream_closed(self, stream: VideoStream) -> None:
+        """تسجيل مقاييس البث عند إغلاقه"""
+        self._stage_seconds.observe(stream.elapsed, stage='stream')
+        self._record_transfer('stream', stream.received, stream.elapsed)
+        self._stream_peak.set_max(stream.peak_buffered)
+    
+    async def _open_variant_stream(
+        self,
+        video_url: str,
+        max_bytes: Optional[int] = None
+    ) -> Optional[Tuple[AsyncIterator[bytes], Dict[str, Any]]]:
         """
-        البحث عن معلومات الفيديو في هيكل البيانات
+        فتح مصدر بث لجودة محددة، مع فحص الحجم قبل استلام أول بايت من الوسائط
         
         Args:
-            data: البيانات للبحث فيها
+            video_url: رابط الفيديو المباشر أو قائمة HLS
+            max_bytes: الحد الأقصى لحجم الفيديو
             
         Returns:
-            معلومات الفيديو أو None
+            (المصدر, معلومات الحجم والامتداد) أو None
         """
-        if isinstance(data, dict):
-            # البحث عن مفاتيح الفيديو المعروفة
-            video_keys = ['video_list', 'videos', 'story_pin_data', 'video_url']
-            
-            for key in video_keys:
-                if key in data:
-                    video_data = data[key]
-                    
-                    if key == 'video_list' and isinstance(video_data, dict):
-                        # تجربة أنواع جودة مختلفة
-                        quality_keys = ['V_HLSV4', 'V_HLSV3', 'V_HLSV3_WEB', 'V_HLSV3_MOBILE']
-                        for quality_key in quality_keys:
-                            if quality_key in video_data and 'url' in video_data[quality_key]:
-                                url = video_data[quality_key]['url']
-                                if url:
-                                    return {
-                                        'video_url': url,
-                                        'title': data.get('title', data.get('grid_title', 'Pinterest Video')),
-                                        'description': data.get('description', ''),
-                                        'thumbnail': data.get('images', {}).get('orig', {}).get('url', ''),
-                                        'quality': quality_key
-                                    }
-                    
-                    elif key == 'video_url' and isinstance(video_data, str):
-                        return {
-                            'video_url': video_data,
-                            'title': data.get('title', 'Pinterest Video'),
-                            'description': data.get('description', ''),
-                            'thumbnail': data.get('thumbnail', '')
-                        }
-            
-            # البحث المتكرر في البيانات المتداخلة
-            for value in data.values():
-                result = self._find_video_in_structure(value)
-                if result:
-                    return result
-        
-        elif isinstance(data, list):
-            for item in data:
-                result = self._find_video_in_structure(item)
-                if result:
-                    return result
+        headers = self._get_fresh_headers()
+        headers['Referer'] = 'https://www.pinterest.com/'
         
-        return None
+        if self._is_hls_url(video_url):
+            source = self._iter_hls_stream(video_url, headers, max_bytes)
+        else:
+            source = self._iter_progressive_stream(video_url, headers, max_bytes)
+        return await self._open_stream_source(source)
     
-    def _extract_thumbnail_from_html(self, html_content: str) -> str:
+    @staticmethod
+    async def _open_stream_source(source: AsyncIterator[Any]) -> Optional[Tuple[AsyncIterator[bytes], Dict[str, Any]]]:
         """
-        استخراج رابط الصورة المصغرة من HTML
+        بدء تشغيل مولد البث حتى أول عنصر (معلومات الحجم والامتداد)، فتُكتشف
+        أخطاء الاتصال والحجم قبل تسليم البث ويبقى الاتصال مفتوحاً حتى إغلاقه
+        """
+        try:
+            meta = await source.__anext__()
+        except StopAsyncIteration:
+            return None
+        return source, meta
+    
+    async def _iter_progressive_stream(
+        self,
+        video_url: str,
+        headers: Dict[str, str],
+        max_bytes: Optional[int] = None
+    ) -> AsyncIterator[Any]:
+        """مولد بث ملف مباشر: معلومات الحجم أولاً ثم أجزاء المحتوى"""
+        # بدون ضغط حتى يطابق Content-Length الحجم الفعلي
+        headers = dict(headers, **{'Accept-Encoding': 'identity'})
         
-        Args:
-            html_content: محتوى HTML
+        async with self.session.get(video_url, headers=headers, timeout=self._media_timeout) as response:
+            if response.status in TRANSIENT_STATUSES:
+                raise TransientDownloadError(f"فشل تحميل الفيديو: {response.status}")
+            if response.status != 200:
+                logger.error(f"فشل تحميل الفيديو: {response.status}")
+                return
             
-        Returns:
-            رابط الصورة المصغرة
-        """
-        thumbnail_patterns = [
-            r'"images":\s*\{[^}]*"orig":\s*\{[^}]*"url":\s*"([^"]+)"',
-            r'property="og:image"\s+content="([^"]+)"',
-            r'"thumbnail":\s*"([^"]+)"',
-        ]
+            size = int(response.headers.get('Content-Length', 0) or 0) or None
+            if max_bytes and size and size > max_bytes:
+                raise VariantTooLargeError(size, max_bytes)
+            
+            extension = 'webm' if '.webm' in video_url else 'mov' if '.mov' in video_url else 'mp4'
+            yield {'size': size, 'extension': extension}
+            
+            received = 0
+            async for chunk in response.content.iter_chunked(VideoStream.CHUNK_SIZE):
+                received += len(chunk)
+                if max_bytes and received > max_bytes:
+                    raise VariantTooLargeError(received, max_bytes)
+                yield chunk
+    
+    async def _iter_hls_stream(
+        self,
+        playlist_url: str,
+        headers: Dict[str, str],
+        max_bytes: Optional[int] = None
+    ) -> AsyncIterator[Any]:
+        """مولد بث HLS: معلومات الحجم أولاً ثم المقاطع بالترتيب مع جلبها بالتوازي ضمن نافذة محدودة"""
+        playlist = await self._resolve_hls_media_playlist(playlist_url, headers, max_bytes)
+        if not playlist:
+            return
+        if playlist['encrypted']:
+            logger.error("قائمة HLS مشفرة وغير مدعومة")
+            return
         
-        for pattern in thumbnail_patterns:
-            match = re.search(pattern, html_content)
-            if match:
-                return match.group(1).replace('\\/', '/')
+        segments = ([playlist['init']] if playlist['init'] else []) + playlist['segments']
+        yield {
+            'size': self._playlist_exact_size(playlist),
+            'estimated_size': playlist.get('estimated_size'),
+            'extension': 'mp4' if playlist['init'] else 'ts',
+        }
         
-        return ""
+        pending: deque = deque()
+        received = 0
+        try:
+            for segment in segments + [None]:
+                # النافذة ممتلئة أو انتهت المقاطع: تسليم أقدم مقطع
+                while pending and (segment is None or len(pending) >= self.hls_concurrency):
+                    data = await pending.popleft()
+                    received += len(data)
+                    if max_bytes and received > max_bytes:
+                        raise VariantTooLargeError(received, max_bytes)
+                    yield data
+                if segment is not None:
+                    pending.append(asyncio.create_task(self._fetch_hls_segment(segment, headers)))
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
     
-    async def _download_video_file(self, video_url: str, pin_id: str) -> Optional[str]:
+    @staticmethod
+    async def _iter_file_stream(filepath: Path) -> AsyncIterator[Any]:
+        """مولد بث ملف محلي من المخزن"""
+        yield {'size': filepath.stat().st_size, 'extension': filepath.suffix[1:]}
+        async with aiofiles.open(filepath, 'rb') as file:
+            while True:
+                chunk = await file.read(VideoStream.CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    
+    async def download_many(
+        self,
+        urls: Union[Iterable[str], AsyncIterable[str]],
+        max_concurrency: int = 8,
+        per_host_concurrency: int = 4,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
-        تحميل ملف الفيديو من الرابط المباشر
+        تحميل مجموعة روابط بالتوازي مع إرجاع كل نتيجة فور اكتمالها (وليس بترتيب الإدخال)
         
         Args:
-            video_url: رابط الفيديو المباشر
-            pin_id: معرف Pin
+            urls: روابط Pinterest، قائمة أو مصدر غير متزامن (يُقرأ المصدر بقدر ما يستوعبه
+                التحميل فقط)
+            max_concurrency: الحد الأقصى للتحميلات المتزامنة كلياً
+            per_host_concurrency: الحد الأقصى للتحميلات المتزامنة لكل مضيف وسائط (CDN)
+            max_bytes: الحد الأقصى لحجم كل فيديو
             
-        Returns:
-            مسار الملف المحمل أو None
+        Yields:
+            قاموس لكل رابط مُدخل: url و result (معلومات الفيديو أو None) و error و duplicate_of
+            (الرابط الأول لنفس Pin إن كان الرابط مكرراً، فيشاركه نتيجته دون تحميل آخر)
         """
-        try:
-            headers = self._get_fresh_headers()
-            headers['Referer'] = 'https://www.pinterest.com/'
+        global_limit = asyncio.Semaphore(max_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+        # عدد الروابط المقروءة من المصدر ولم تكتمل بعد
+        intake = asyncio.Semaphore(max_concurrency * 2)
+        finished: asyncio.Queue = asyncio.Queue()
+        tasks: set = set()
+        started = 0
+        # الرابط الأول لكل رابط ولكل Pin مع نتيجته المنتظرة: الروابط المكررة ومختلف
+        # الروابط لنفس Pin (صيغ مختلفة أو pin.it) تنتظر نتيجة التحميل الأول
+        leaders_by_url: Dict[str, Tuple[str, asyncio.Future]] = {}
+        leaders_by_pin: Dict[str, Tuple[str, asyncio.Future]] = {}
+        
+        async def follow(url: str, leader_url: str, outcome: asyncio.Future) -> Dict[str, Any]:
+            item = await asyncio.shield(outcome)
+            return {
+                'url': url,
+                'result': item['result'],
+                'error': item['error'],
+                'duplicate_of': item['duplicate_of'] or leader_url,
+            }
+        
+        async def run(url: str) -> Dict[str, Any]:
+            if url in leaders_by_url:
+                return await follow(url, *leaders_by_url[url])
+            outcome = asyncio.get_running_loop().create_future()
+            leaders_by_url[url] = (url, outcome)
+            try:
+                item = await lead(url)
+                outcome.set_result(item)
+                return item
+            finally:
+                if not outcome.done():
+                    outcome.cancel()
+        
+        async def lead(url: str) -> Dict[str, Any]:
+            try:
+                pin_id = await self.resolve_pin_id(url)
+            except Exception as e:
+                return {'url': url, 'result': None, 'error': str(e), 'duplicate_of': None}
+            if pin_id in leaders_by_pin:
+                return await follow(url, *leaders_by_pin[pin_id])
+            if pin_id:
+                leaders_by_pin[pin_id] = leaders_by_url[url]
             
-            # تحديد امتداد الملف
-            file_extension = 'mp4'
-            if '.webm' in video_url:
-                file_extension = 'webm'
-            elif '.mov' in video_url:
-                file_extension = 'mov'
+            # حد المضيف يخص مضيف الوسائط الفعلي (CDN) لا مضيف رابط Pinterest
+            try:
+                resolved = await self._resolve_video(url)
+            except Exception as e:
+                return {'url': url, 'result': None, 'error': str(e), 'duplicate_of': None}
+            if not resolved:
+                return {'url': url, 'result': None, 'error': "فشل استخراج بيانات الفيديو", 'duplicate_of': None}
             
-            filename = f"pinterest_{pin_id}_{int(time.time())}.{file_extension}"
-            filepath = self.download_dir / filename
+            host = urlparse(resolved[1]['video_url']).netloc.lower()
+            host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host_concurrency))
             
-            logger.info(f"بدء تحميل الفيديو: {video_url}")
+            # حد المضيف أولاً حتى لا يحجز رابط ينتظر مضيفاً مزدحماً مكاناً من الحد العام
+            with self._queued_downloads.track_inprogress():
+                await host_limit.acquire()
+                try:
+                    await global_limit.acquire()
+                except BaseException:
+                    host_limit.release()
+                    raise
             
-            async with self.session.get(video_url, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"فشل تحميل الفيديو: {response.status}")
-                    return None
+            try:
+                result = await self.download_video(url, max_bytes)
+            except Exception as e:
+                return {'url': url, 'result': None, 'error': str(e), 'duplicate_of': None}
+            finally:
+                global_limit.release()
+                host_limit.release()
+            
+            return {
+                'url': url,
+                'result': result,
+                'error': None if result else "فشل تحميل الفيديو",
+                'duplicate_of': None,
+            }
+        
+        def on_done(task: asyncio.Task) -> None:
+            intake.release()
+            finished.put_nowait(task)
+        
+        async def feed() -> None:
+            nonlocal started
+            async for url in self._iter_urls(urls):
+                url = url.strip() if url else ''
+                if not url:
+                    continue
                 
-                total_size = int(response.headers.get('content-length', 0))
+                await intake.acquire()
+                task = asyncio.create_task(run(url))
+                tasks.add(task)
+                task.add_done_callback(on_done)
+                started += 1
+        
+        feeder = asyncio.create_task(feed())
+        getter: Optional[asyncio.Future] = None
+        completed = 0
+        try:
+            while not (feeder.done() and completed == started):
+                getter = asyncio.ensure_future(finished.get())
+                if not feeder.done():
+                    await asyncio.wait({getter, feeder}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        # انتهى المصدر: انتظار ما تبقى من التحميلات
+                        getter.cancel()
+                        if not feeder.cancelled() and feeder.exception():
+                            logger.error(f"فشل قراءة مصدر الروابط: {str(feeder.exception())}")
+                        continue
                 
-                async with aiofiles.open(filepath, 'wb') as file:
-                    downloaded = 0
-                    async for chunk in response.content.iter_chunked(8192):
-                        await file.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # تسجيل التقدم كل MB
-                        if downloaded % (1024 * 1024) == 0:
-                            progress = (downloaded / total_size * 100) if total_size > 0 else 0
-                            logger.info(f"تقدم التحميل: {progress:.1f}%")
-            
-            file_size = filepath.stat().st_size
-            if file_size < 1024:  # أقل من 1KB
-                logger.error(f"الملف المحمل صغير جداً: {file_size} bytes")
-                filepath.unlink()
-                return None
-            
-            logger.info(f"تم تحميل الفيديو بنجاح: {filepath} ({file_size / (1024*1024):.2f} MB)")
-            return str(filepath)
+                task = await getter
+                tasks.discard(task)
+                completed += 1
+                yield task.result()
+        finally:
+            # المستهلك توقف مبكراً: إلغاء ما تبقى
+            if getter is not None:
+                getter.cancel()
+            feeder.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(feeder, *tasks, return_exceptions=True)
+    
+    @staticmethod
+    async def _iter_urls(urls: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+        """توحيد المصادر المتزامنة وغير المتزامنة"""
+        if hasattr(urls, '__aiter__'):
+            async for url in urls:
+                yield url
+        else:
+            for url in urls:
+                yield url
+    
+    @classmethod
+    def parse_collection_url(cls, url: str) -> Optional[Dict[str, str]]:
+        """
+        تحليل رابط لوحة أو قسم لوحة أو ملف شخصي
+        
+        Args:
+            url: رابط Pinterest (بعد توسيع الروابط المختصرة)
             
-        except Exception as e:
-            logger.error(f"خطأ في تحميل الفيديو: {str(e)}")
+        Returns:
+            قاموس يحتوي type (board / section / profile) و username و board و section، أو None
+        """
+        parsed = urlparse(url if '://' in url else f"https://{url}")
+        if 'pinterest.' not in parsed.netloc.lower():
             return None
+        
+        parts = [unquote(part) for part in parsed.path.split('/') if part]
+        if not parts or parts[0].lower() in cls.RESERVED_PATHS:
+            return None
+        
+        username = parts[0]
+        if len(parts) == 1 or parts[1].lower() in cls.PROFILE_TABS:
+            return {'type': 'profile', 'username': username, 'board': '', 'section': ''}
+        
+        if len(parts) == 2:
+            return {'type': 'board', 'username': username, 'board': parts[1], 'section': ''}
+        
+        return {'type': 'section', 'username': username, 'board': parts[1], 'section': parts[2]}
     
-    async def download_video(self, url: str) -> Optional[Dict[str, Any]]:
+    async def resolve_collection(self, url: str) -> Optional[Dict[str, str]]:
         """
-        تحميل فيديو Pinterest بالنظام المتقدم
+        تحليل رابط لوحة أو ملف شخصي بعد توسيع الروابط المختصرة
         
         Args:
             url: رابط Pinterest
             
         Returns:
-            معلومات الفيديو المحمل أو None
+            معلومات المجموعة أو None إذا لم يكن الرابط لمجموعة
         """
-        if not self.is_pinterest_url(url):
-            logger.error(f"الرابط ليس من Pinterest: {url}")
-            return None
+        if 'pin.it' in url:
+            url = await self._expand_short_url(url)
+        return self.parse_collection_url(url)
+    
+    async def _fetch_resource(
+        self,
+        endpoint: str,
+        options: Dict[str, Any],
+        source_url: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        طلب استجابة مورد JSON من Pinterest
         
-        try:
-            # توسيع الروابط المختصرة
-            if 'pin.it' in url:
-                url = await self._expand_short_url(url)
+        Args:
+            endpoint: مفتاح المورد في api_endpoints
+            options: خيارات المورد (مثل board_id و bookmarks)
+            source_url: مسار الصفحة التي يُطلب منها المورد
             
-            # استخراج معرف Pin
-            pin_id = self._extract_pin_id(url)
-            if not pin_id:
-                logger.error(f"فشل استخراج معرف Pin: {url}")
-                return None
+        Returns:
+            resource_response أو None إذا لم يوجد المورد
             
-            logger.info(f"بدء تحميل Pin: {pin_id}")
+        Raises:
+            TransientDownloadError: عند حالة HTTP مؤقتة
+        """
+        url = self.api_endpoints[endpoint]
+        params = {
+            'source_url': source_url,
+            'data': json.dumps({'options': options, 'context': {}}, separators=(',', ':')),
+        }
+        headers = self._get_fresh_headers()
+        headers.update({
+            'Accept': 'application/json, text/javascript, */*; q=0.01',
+            'X-Requested-With': 'XMLHttpRequest',
+            'X-Pinterest-Source-Url': source_url,
+        })
+        
+        host = urlparse(url).netloc
+        await self.rate_limiter.acquire(host)
+        
+        async with self.session.get(url, params=params, headers=headers) as response:
+            self.rate_limiter.record(host, response.status)
+            if response.status in TRANSIENT_STATUSES:
+                raise TransientDownloadError(f"فشل طلب المورد: {response.status}")
+            if response.status != 200:
+                logger.warning(f"فشل طلب المورد {endpoint}: {response.status}")
+                return None
+            payload = await response.json(content_type=None)
+        
+        resource_response = payload.get('resource_response') if isinstance(payload, dict) else None
+        return resource_response if isinstance(resource_response, dict) else None
+    
+    async def _collection_feed(self, collection: Dict[str, str]) -> Optional[Tuple[str, Dict[str, Any], str]]:
+        """
+        تحديد مورد الصفحات لمجموعة (مع جلب معرف اللوحة أو القسم عند الحاجة)
+        
+        Args:
+            collection: نتيجة parse_collection_url
             
-            # إضافة تأخير عشوائي لتجنب الحظر
-            await asyncio.sleep(random.uniform(1, 3))
+        Returns:
+            (مفتاح المورد, الخيارات, source_url) أو None
+        """
+        username, board, section = collection['username'], collection['board'], collection['section']
+        
+        if collection['type'] == 'profile':
+            return 'user_pins', {'username': username}, f"/{username}/_created/"
+        
+        source_url = f"/{username}/{board}/"
+        if collection['type'] == 'board':
+            response = await self._with_retries(
+                lambda: self._fetch_resource('board', {'username': username, 'slug': board}, source_url),
+                "جلب بيانات اللوحة"
+            )
+            board_id = ((response or {}).get('data') or {}).get('id')
+            return ('board_feed', {'board_id': str(board_id)}, source_url) if board_id else None
+        
+        source_url = f"{source_url}{section}/"
+        response = await self._with_retries(
+            lambda: self._fetch_resource(
+                'board_section', {'username': username, 'slug': board, 'section_slug': section}, source_url
+            ),
+            "جلب بيانات القسم"
+        )
+        section_id = ((response or {}).get('data') or {}).get('id')
+        return ('section_feed', {'section_id': str(section_id)}, source_url) if section_id else None
+    
+    async def iter_collection_pins(
+        self,
+        url: str,
+        max_pins: Optional[int] = None,
+        videos_only: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        التنقل في صفحات لوحة أو قسم أو ملف شخصي عبر bookmarks وإرجاع معرفات Pins فور اكتشافها
+        
+        Args:
+            url: رابط المجموعة
+            max_pins: الحد الأقصى لعدد Pins (None بلا حد)
+            videos_only: تجاهل Pins التي لا تحتوي على فيديو
             
-            # استخراج بيانات الفيديو من الصفحة
-            video_data = await self._get_pin_data_from_page(url)
-            if not video_data:
-                logger.error("فشل استخراج بيانات الفيديو")
-                return None
+        Yields:
+            معرفات Pins
+        """
+        collection = await self.resolve_collection(url)
+        if not collection:
+            logger.error(f"الرابط ليس لوحة أو ملفاً شخصياً: {url}")
+            return
+        
+        feed = await self._collection_feed(collection)
+        if not feed:
+            logger.error(f"لم يتم العثور على المجموعة: {url}")
+            return
+        
+        endpoint, options, source_url = feed
+        bookmark = None
+        seen = set()
+        yielded = 0
+        
+        while True:
+            page_options = dict(options, page_size=self.COLLECTION_PAGE_SIZE)
+            if bookmark:
+                page_options['bookmarks'] = [bookmark]
             
-            video_url = video_data.get('video_url')
-            if not video_url:
-                logger.error("لم يتم العثور على رابط الفيديو")
-                return None
+            response = await self._with_retries(
+                lambda: self._fetch_resource(endpoint, page_options, source_url), "جلب صفحة المجموعة"
+            )
+            items = (response or {}).get('data')
+            if not isinstance(items, list) or not items:
+                return
             
-            # تحميل الفيديو
-            filepath = await self._download_video_file(video_url, pin_id)
-            if not filepath:
-                return None
+            for item in items:
+                if not isinstance(item, dict) or item.get('type', 'pin') != 'pin' or not item.get('id'):
+                    continue
+                pin_id = str(item['id'])
+                if pin_id in seen:
+                    continue
+                seen.add(pin_id)
+                
+                # بيانات الفيديو في الصفحة تُحفظ مسبقاً فلا حاجة لجلب صفحة كل Pin
+                video_info = self._video_info_from_pin(item)
+                if video_info:
+                    video_info['title'] = video_info['title'] or 'Pinterest Video'
+                    await self.resolution_cache.set(pin_id, video_info)
+                elif videos_only and not (item.get('is_video') or item.get('story_pin_data_id')):
+                    continue
+                
+                yield pin_id
+                yielded += 1
+                if max_pins and yielded >= max_pins:
+                    return
             
-            return {
-                'filepath': filepath,
-                'title': video_data.get('title', 'Pinterest Video'),
-                'description': video_data.get('description', ''),
-                'thumbnail': video_data.get('thumbnail', ''),
-                'pin_id': pin_id,
-                'video_url': video_url,
-                'filesize': Path(filepath).stat().st_size
-            }
+            bookmark = response.get('bookmark')
+            if not bookmark or bookmark == '-end-':
+                return
+    
+    async def download_collection(
+        self,
+        url: str,
+        max_pins: Optional[int] = None,
+        max_concurrency: int = 8,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        تحميل فيديوهات لوحة أو ملف شخصي بالتوازي أثناء التنقل في صفحاتها
+        
+        Args:
+            url: رابط المجموعة
+            max_pins: الحد الأقصى لعدد Pins
+            max_concurrency: الحد الأقصى للتحميلات المتزامنة
+            max_bytes: الحد الأقصى لحجم كل فيديو
             
-        except Exception as e:
-            logger.error(f"خطأ في تحميل الفيديو: {str(e)}")
+        Yields:
+            نتائج download_many
+        """
+        async def pin_urls() -> AsyncIterator[str]:
+            async for pin_id in self.iter_collection_pins(url, max_pins):
+                yield self.canonical_pin_url(pin_id)
+        
+        async for item in self.download_many(pin_urls(), max_concurrency, max_concurrency, max_bytes):
+            yield item
+    
+    async def _download_to_store(
+        self,
+        video_url: str,
+        pin_id: str,
+        fallback_urls: Iterable[str] = (),
+        max_bytes: Optional[int] = None
+    ) -> Optional[Path]:
+        """تحميل الفيديو ونقله إلى المخزن"""
+        filepath = await self._download_video_file(video_url, pin_id, fallback_urls, max_bytes)
+        if not filepath:
             return None
+        with self._stage_seconds.time(stage='store'):
+            return await self.content_store.put(pin_id, Path(filepath))
     
     async def get_video_info(self, url: str) -> Optional[Dict[str, Any]]:
         """
@@ -516,7 +3473,7 @@ class AdvancedPinterestDownloader:
             if not pin_id:
                 return None
             
-            video_data = await self._get_pin_data_from_page(url)
+            video_data = await self._resolve_pin_data(url, pin_id)
             if video_data:
                 return {
                     'title': video_data.get('title', 'Pinterest Video'),
@@ -543,14 +3500,14 @@ class AdvancedPinterestDownloader:
             logger.error(f"خطأ في حذف الملف: {str(e)}")
     
     def cleanup_old_files(self, max_age_hours: int = 2) -> None:
-        """حذف الملفات القديمة"""
+        """حذف الملفات المكتملة القديمة، وترك الملفات الجزئية لمدة الاحتفاظ الخاصة بالاستئناف"""
         try:
             current_time = time.time()
             max_age_seconds = max_age_hours * 3600
             deleted_count = 0
             
             for filepath in self.download_dir.iterdir():
-                if filepath.is_file():
+                if filepath.is_file() and not self._is_partial_file(filepath):
                     file_age = current_time - filepath.stat().st_mtime
                     if file_age > max_age_seconds:
                         filepath.unlink()
@@ -561,31 +3518,139 @@ class AdvancedPinterestDownloader:
                         
         except Exception as e:
             logger.error(f"خطأ في تنظيف الملفات: {str(e)}")
+        
+        self.recover_partial_downloads()
+        self.content_store.flush()
+    
+    @staticmethod
+    def _is_partial_file(path: Path) -> bool:
+        """ملف جزئي أو سجله (تُدار مدة بقائها في recover_partial_downloads)"""
+        return path.name.endswith(('.part', DownloadJournal.SUFFIX, DownloadJournal.SUFFIX + '.tmp'))
 
 
 # كلاس wrapper للتوافق مع الكود الحالي
 class PinterestDownloader:
     """كلاس للتوافق مع الكود الحالي"""
     
-    def __init__(self, download_dir: str = "downloads"):
+    def __init__(
+        self,
+        download_dir: str = "downloads",
+        session_manager: Optional[HTTPSessionManager] = None,
+        parse_executor: str = "thread",
+        parse_workers: Optional[int] = None,
+        resolution_cache: Optional[PinResolutionCache] = None,
+        short_link_cache: Optional[ShortLinkCache] = None,
+        store_quota_bytes: int = 2 * 1024 ** 3,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        hls_concurrency: int = 8,
+        range_connections: int = 4,
+        range_part_size: int = 4 * 1024 * 1024,
+        max_retries: int = 3,
+        hedge_percentile: Optional[float] = 95.0,
+        stream_buffer_bytes: int = 4 * 1024 * 1024,
+        api_base_url: str = "https://www.pinterest.com",
+        api_fast_path: bool = True,
+        partial_retention_hours: float = 6,
+        metrics: Optional[MetricsRegistry] = None
+    ):
         self.download_dir = download_dir
-        self.advanced_downloader = AdvancedPinterestDownloader(download_dir)
+        self.advanced_downloader = AdvancedPinterestDownloader(
+            download_dir,
+            session_manager=session_manager,
+            parse_executor=parse_executor,
+            parse_workers=parse_workers,
+            resolution_cache=resolution_cache,
+            short_link_cache=short_link_cache,
+            store_quota_bytes=store_quota_bytes,
+            rate_limiter=rate_limiter,
+            hls_concurrency=hls_concurrency,
+            range_connections=range_connections,
+            range_part_size=range_part_size,
+            max_retries=max_retries,
+            hedge_percentile=hedge_percentile,
+            stream_buffer_bytes=stream_buffer_bytes,
+            api_base_url=api_base_url,
+            api_fast_path=api_fast_path,
+            partial_retention_hours=partial_retention_hours,
+            metrics=metrics
+        )
         logger.info("تم تهيئة النظام المتقدم للتحميل")
     
     @staticmethod
     def is_pinterest_url(url: str) -> bool:
         return AdvancedPinterestDownloader.is_pinterest_url(url)
     
-    async def download_video(self, url: str) -> Optional[Dict[str, Any]]:
-        async with self.advanced_downloader as downloader:
-            return await downloader.download_video(url)
+    @staticmethod
+    def canonical_pin_url(pin_id: str) -> str:
+        return AdvancedPinterestDownloader.canonical_pin_url(pin_id)
+    
+    @staticmethod
+    def extract_pinterest_urls(text: str) -> List[str]:
+        return AdvancedPinterestDownloader.extract_pinterest_urls(text)
+    
+    async def start(self) -> None:
+        """إنشاء الجلسة المشتركة مرة واحدة عند بدء البوت"""
+        await self.advanced_downloader.start()
+    
+    async def close(self) -> None:
+        """إغلاق الجلسة المشتركة عند إيقاف البوت"""
+        await self.advanced_downloader.close()
+    
+    async def download_video(
+        self,
+        url: str,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT
+    ) -> Optional[Dict[str, Any]]:
+        downloader = await self.advanced_downloader.start()
+        return await downloader.download_video(url, max_bytes)
+    
+    async def stream_video(
+        self,
+        url: str,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT,
+        buffer_bytes: Optional[int] = None
+    ) -> Optional[VideoStream]:
+        downloader = await self.advanced_downloader.start()
+        return await downloader.stream_video(url, max_bytes, buffer_bytes)
+    
+    async def download_many(
+        self,
+        urls: Union[Iterable[str], AsyncIterable[str]],
+        max_concurrency: int = 8,
+        per_host_concurrency: int = 4,
+        max_bytes: Optional[int] = TELEGRAM_UPLOAD_LIMIT
+    ) -> AsyncIterator[Dict[str, Any]]:
+        downloader = await self.advanced_downloader.start()
+        async for item in downloader.download_many(urls, max_concurrency, per_host_concurrency, max_bytes):
+            yield item
+    
+    async def resolve_collection(self, url: str) -> Optional[Dict[str, str]]:
+        downloader = await self.advanced_downloader.start()
+        return await downloader.resolve_collection(url)
+    
+    async def iter_collection_pins(
+        self,
+        url: str,
+        max_pins: Optional[int] = None,
+        videos_only: bool = True
+    ) -> AsyncIterator[str]:
+        downloader = await self.advanced_downloader.start()
+        async for pin_id in downloader.iter_collection_pins(url, max_pins, videos_only):
+            yield pin_id
+    
+    async def resolve_pin_id(self, url: str) -> Optional[str]:
+        downloader = await self.advanced_downloader.start()
+        return await downloader.resolve_pin_id(url)
     
     async def get_video_info(self, url: str) -> Optional[Dict[str, Any]]:
-        async with self.advanced_downloader as downloader:
-            return await downloader.get_video_info(url)
+        downloader = await self.advanced_downloader.start()
+        return await downloader.get_video_info(url)
     
     def cleanup_file(self, filepath: str) -> None:
         self.advanced_downloader.cleanup_file(filepath)
     
+    def recover_partial_downloads(self, max_age_hours: Optional[float] = None) -> Dict[str, int]:
+        return self.advanced_downloader.recover_partial_downloads(max_age_hours)
+    
     def cleanup_old_files(self, max_age_hours: int = 2) -> None:
         self.advanced_downloader.cleanup_old_files(max_age_hours)
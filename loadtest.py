@@ -0,0 +1,578 @@
+"""
+اختبار حمل معالجات البوت: تحديثات Telegram تركيبية لمستخدمين كثر تمر عبر سلسلة
+معالجات Application الحقيقية، مع Bot API ومحمّل بديلين، وقياس زمن المعالجة وتأخر
+حلقة الأحداث وتنافس SQLite
+
+الاستخدام:
+    python loadtest.py                                   # معدلات 5 و 20 و 50 تحديث/ثانية
+    python loadtest.py --rates 10 50 100 --duration 15 --download-ms 800
+    python loadtest.py --db-writers 2 --output load.json # عمال آخرون يكتبون في نفس قاعدة البيانات
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+from telegram import Update
+from telegram.request import BaseRequest, RequestData
+
+from bot import PinterestBot
+from database import AsyncDatabase, Database
+from downloader import PinterestDownloader
+
+DEFAULT_MIX = "link:60,multi:10,start:10,stats:15,invalid:5"
+
+# عدد الروابط في رسائل multi
+MULTI_LINKS = 4
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """p50 و p95 و p99 والأقصى بالميلي ثانية"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def rank(percent: float) -> float:
+        return ordered[min(len(ordered) - 1, int(percent / 100 * len(ordered)))] * 1000
+
+    return {
+        "p50": round(rank(50), 2),
+        "p95": round(rank(95), 2),
+        "p99": round(rank(99), 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+class StubBotRequest(BaseRequest):
+    """Bot API بديل: يرد على كل طريقة باستجابة صالحة بعد تأخير ثابت ويحصي الاستدعاءات"""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._message_id = 0
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return 5.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _message(self, chat_id: Any, **fields: Any) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = int(chat_id or 0)
+        return dict(
+            message_id=self._message_id,
+            date=int(time.time()),
+            chat={"id": chat_id, "type": "private"},
+            **fields,
+        )
+
+    def _video(self) -> Dict[str, Any]:
+        file_id = f"stub-video-{self._message_id + 1}"
+        return {"file_id": file_id, "file_unique_id": file_id, "width": 720, "height": 1280, "duration": 10}
+
+    def _document(self) -> Dict[str, Any]:
+        file_id = f"stub-document-{self._message_id + 1}"
+        return {"file_id": file_id, "file_unique_id": file_id, "file_name": "video.ts"}
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = None,
+        write_timeout: Any = None,
+        connect_timeout: Any = None,
+        pool_timeout: Any = None,
+    ) -> Tuple[int, bytes]:
+        name = url.rsplit("/", 1)[-1]
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await asyncio.sleep(self.latency)
+
+        parameters = request_data.parameters if request_data else {}
+        chat_id = parameters.get("chat_id")
+        if name == "getMe":
+            result: Any = {"id": 1, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}
+        elif name in ("sendMessage", "editMessageText"):
+            result = self._message(chat_id, text=parameters.get("text", ""))
+        elif name == "sendVideo":
+            result = self._message(chat_id, video=self._video())
+        elif name == "sendDocument":
+            result = self._message(chat_id, document=self._document())
+        elif name == "sendMediaGroup":
+            media = parameters.get("media") or []
+            result = [self._message(chat_id, video=self._video()) for _ in media]
+        elif name == "getChatMember":
+            user = {"id": int(parameters.get("user_id", 0)), "is_bot": False, "first_name": "User"}
+            result = {"status": "member", "user": user}
+        else:
+            result = True
+
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+class StubDownloader:
+    """محمّل بديل بنفس واجهة PinterestDownloader: تأخير ثابت وملف صغير بدل Pinterest"""
+
+    PIN_ID = re.compile(r"/pin/(\d+)")
+
+    is_pinterest_url = staticmethod(PinterestDownloader.is_pinterest_url)
+    canonical_pin_url = staticmethod(PinterestDownloader.canonical_pin_url)
+    extract_pinterest_urls = staticmethod(PinterestDownloader.extract_pinterest_urls)
+
+    def __init__(self, directory: str, resolve_delay: float = 0.03, download_delay: float = 0.3,
+                 video_bytes: int = 64 * 1024):
+        self.directory = Path(directory)
+        self.resolve_delay = resolve_delay
+        self.download_delay = download_delay
+        self.video = bytes(video_bytes)
+        self.downloads = 0
+
+    async def start(self) -> "StubDownloader":
+        return self
+
+    async def close(self) -> None:
+        pass
+
+    def recover_partial_downloads(self) -> None:
+        pass
+
+    def cleanup_old_files(self) -> None:
+        pass
+
+    def cleanup_file(self, filepath: str) -> bool:
+        try:
+            os.remove(filepath)
+            return True
+        except OSError:
+            return False
+
+    async def resolve_collection(self, url: str) -> Optional[Dict[str, str]]:
+        return None
+
+    async def iter_collection_pins(self, url: str, max_pins: Optional[int] = None,
+                                   videos_only: bool = True) -> AsyncIterator[str]:
+        return
+        yield
+
+    async def resolve_pin_id(self, url: str) -> Optional[str]:
+        match = self.PIN_ID.search(url)
+        return match.group(1) if match else None
+
+    async def stream_video(self, url: str, max_bytes: Optional[int] = None, buffer_bytes: Optional[int] = None):
+        return None
+
+    async def download_video(self, url: str, max_bytes: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        pin_id = await self.resolve_pin_id(url)
+        if not pin_id:
+            return None
+        await asyncio.sleep(self.resolve_delay + self.download_delay)
+        self.downloads += 1
+
+        filepath = self.directory / f"pinterest_{pin_id}_{self.downloads}.mp4"
+        filepath.write_bytes(self.video)
+        return {
+            "filepath": str(filepath),
+            "title": f"Pin {pin_id}",
+            "description": "",
+            "thumbnail": "",
+            "pin_id": pin_id,
+            "video_url": f"https://v1.pinimg.com/videos/{pin_id}.mp4",
+            "filesize": len(self.video),
+        }
+
+    async def download_many(self, urls: Iterable[str], max_concurrency: int = 8, per_host_concurrency: int = 4,
+                            max_bytes: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        urls = [url async for url in urls] if hasattr(urls, "__aiter__") else list(urls)
+        limit = asyncio.Semaphore(max_concurrency)
+
+        async def run(url: str) -> Dict[str, Any]:
+            async with limit:
+                result = await self.download_video(url, max_bytes)
+            return {"url": url, "result": result, "error": None if result else "failed", "duplicate_of": None}
+
+        leaders = {url: asyncio.ensure_future(run(url)) for url in dict.fromkeys(urls)}
+        for finished in asyncio.as_completed(list(leaders.values())):
+            yield await finished
+        # الروابط المكررة تشارك نتيجة أول ظهور لها
+        for index, url in enumerate(urls):
+            if urls.index(url) != index:
+                yield dict(leaders[url].result(), url=url, duplicate_of=url)
+
+
+class DatabaseProbe:
+    """قياس زمن كل استدعاء لقاعدة البيانات وأخطاء القفل (يغلف دوال كائن Database أو AsyncDatabase)"""
+
+    def __init__(self, db: Any):
+        self.timings: Dict[str, List[float]] = {}
+        self.locked = 0
+        for name in dir(db):
+            if name.startswith("_"):
+                continue
+            method = getattr(db, name)
+            if callable(method):
+                setattr(db, name, self._wrap(name, method))
+
+    def _record(self, name: str, started: float, error: Optional[BaseException]) -> None:
+        self.timings.setdefault(name, []).append(time.perf_counter() - started)
+        if isinstance(error, OperationalError) and "locked" in str(error):
+            self.locked += 1
+
+    def _wrap(self, name: str, method: Any) -> Any:
+        if asyncio.iscoroutinefunction(method):
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                error = None
+                try:
+                    return await method(*args, **kwargs)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    self._record(name, started, error)
+            return timed_async
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            error = None
+            try:
+                return method(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._record(name, started, error)
+        return timed
+
+    def reset(self) -> Dict[str, Any]:
+        """ملخص الفترة الحالية ثم البدء من جديد"""
+        report = {
+            "locked_errors": self.locked,
+            "total_seconds": round(sum(sum(values) for values in self.timings.values()), 3),
+            "calls": {
+                name: dict(count=len(values), **_percentiles(values))
+                for name, values in sorted(self.timings.items())
+            },
+        }
+        self.timings = {}
+        self.locked = 0
+        return report
+
+
+class LoopLagMonitor:
+    """قياس تأخر حلقة الأحداث: الفرق بين موعد الاستيقاظ المطلوب والفعلي"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def reset(self) -> Dict[str, float]:
+        report = _percentiles(self.samples)
+        self.samples = []
+        return report
+
+
+def _background_writers(
+    db_path: str,
+    count: int,
+    rate: float,
+    stop: threading.Event,
+    stats: Dict[str, int]
+) -> List[threading.Thread]:
+    """خيوط تكتب في نفس ملف قاعدة البيانات (تحاكي عمالاً آخرين) لقياس التنافس على القفل"""
+    def write(worker: int) -> None:
+        db = Database(db_path)
+        user_id = 10_000_000 * (worker + 1)
+        while not stop.is_set():
+            user_id += 1
+            try:
+                db.add_user(user_id, f"writer{worker}", "Writer")
+                stats["writes"] += 1
+            except OperationalError:
+                stats["locked"] += 1
+            stop.wait(1 / rate)
+
+    threads = [threading.Thread(target=write, args=(worker,), daemon=True) for worker in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """تحليل نسب أنواع التحديثات مثل link:60,multi:10,start:10,stats:15,invalid:5"""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition(":")
+        if kind not in ("link", "multi", "start", "stats", "invalid"):
+            raise ValueError(f"نوع تحديث غير معروف: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+def build_update(update_id: int, user_id: int, kind: str, pin_ids: List[str]) -> Dict[str, Any]:
+    """
+    بناء تحديث رسالة Telegram تركيبي
+
+    Args:
+        update_id: رقم التحديث
+        user_id: المستخدم (والمحادثة الخاصة)
+        kind: link أو multi أو start أو stats أو invalid
+        pin_ids: معرفات Pins لرسائل الروابط (الأول فقط لرسائل link)
+
+    Returns:
+        قاموس التحديث بصيغة Bot API
+    """
+    text = {
+        "link": f"https://www.pinterest.com/pin/{pin_ids[0]}/",
+        "multi": "look at these: " + " ".join(f"pinterest.com/pin/{pin_id}" for pin_id in pin_ids),
+        "start": "/start",
+        "stats": "/stats",
+        "invalid": "hello there",
+    }[kind]
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+
+class LoadTest:
+    """تشغيل PinterestBot حقيقي ببدائل للشبكة وضخ تحديثات بمعدل ثابت"""
+
+    def __init__(self, args: argparse.Namespace, directory: str):
+        self.args = args
+        self.db_path = str(Path(directory) / "loadtest.db")
+        # الزمن المقاس يشمل الانتظار في طابور خيط قاعدة البيانات
+        self.db = AsyncDatabase(self.db_path)
+        self.db_probe = DatabaseProbe(self.db)
+        self.request = StubBotRequest(args.api_ms / 1000)
+        self.downloader = StubDownloader(
+            directory, args.resolve_ms / 1000, args.download_ms / 1000, args.video_kb * 1024
+        )
+        self.bot = PinterestBot("123456:LOADTEST", db=self.db, downloader=self.downloader, request=self.request)
+        self.app = self.bot.app
+        self.loop_lag = LoopLagMonitor()
+
+        self.weights = parse_mix(args.mix)
+        self.random = random.Random(args.seed)
+        self.pin_ids = [str(800_000_000 + index) for index in range(args.pins)]
+        self.next_update_id = 1
+
+        self.enqueued: Dict[int, Tuple[str, float]] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        self.handler_seconds: List[float] = []
+        self.errors = 0
+        self.processed = 0
+
+    def _instrument(self) -> None:
+        # يستدعي Application الدالة process_update لكل تحديث من الطابور
+        process_update = self.app.process_update
+
+        async def timed(update: object) -> None:
+            started = time.perf_counter()
+            try:
+                await process_update(update)
+            finally:
+                finished = time.perf_counter()
+                self.handler_seconds.append(finished - started)
+                if isinstance(update, Update) and update.update_id in self.enqueued:
+                    kind, enqueued = self.enqueued.pop(update.update_id)
+                    self.latencies.setdefault(kind, []).append(finished - enqueued)
+                self.processed += 1
+
+        self.app.process_update = timed
+
+        async def on_error(update: object, context: Any) -> None:
+            self.errors += 1
+
+        self.app.add_error_handler(on_error)
+
+    async def _offer(self, rate: float, duration: float) -> int:
+        """ضخ التحديثات بمعدل ثابت (حمل مفتوح لا ينتظر الردود)"""
+        kinds = list(self.weights)
+        weights = list(self.weights.values())
+        started = time.perf_counter()
+        sent = 0
+        while True:
+            due = started + sent / rate
+            now = time.perf_counter()
+            if due - started >= duration:
+                return sent
+            if due > now:
+                await asyncio.sleep(due - now)
+
+            kind = self.random.choices(kinds, weights)[0]
+            user_id = self.random.randint(1, self.args.users)
+            update_id = self.next_update_id
+            self.next_update_id += 1
+            data = build_update(update_id, user_id, kind, self.random.sample(self.pin_ids, MULTI_LINKS))
+            self.enqueued[update_id] = (kind, time.perf_counter())
+            await self.app.update_queue.put(Update.de_json(data, self.app.bot))
+            sent += 1
+
+    async def run_stage(self, rate: float) -> Dict[str, Any]:
+        """مرحلة بمعدل واحد: ضخ لمدة محددة ثم انتظار تفريغ الطابور"""
+        self.processed = 0
+        self.errors = 0
+        self.latencies = {}
+        self.handler_seconds = []
+        self.loop_lag.reset()
+        self.db_probe.reset()
+        calls_before = dict(self.request.calls)
+
+        started = time.perf_counter()
+        sent = await self._offer(rate, self.args.duration)
+        offered_seconds = time.perf_counter() - started
+        backlog = self.app.update_queue.qsize()
+
+        deadline = time.perf_counter() + self.args.drain_timeout
+        while self.processed < sent and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            "rate": rate,
+            "sent": sent,
+            "processed": self.processed,
+            "errors": self.errors,
+            "backlog_at_end_of_load": backlog,
+            "drain_seconds": round(elapsed - offered_seconds, 3),
+            "throughput": round(self.processed / elapsed, 2),
+            # لا يلاحق البوت الحمل إذا بقيت تحديثات بعد مهلة التفريغ أو تجاوز p95 الحد
+            "keeping_up": self.processed == sent and _percentiles(all_latencies)["p95"] <= self.args.slo_ms,
+            "latency_ms": _percentiles(all_latencies),
+            "latency_by_kind_ms": {kind: _percentiles(values) for kind, values in sorted(self.latencies.items())},
+            "handler_ms": _percentiles(self.handler_seconds),
+            "loop_lag_ms": self.loop_lag.reset(),
+            "database": self.db_probe.reset(),
+            "bot_api_calls": {
+                name: count - calls_before.get(name, 0)
+                for name, count in self.request.calls.items()
+                if count - calls_before.get(name, 0)
+            },
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        self._instrument()
+        stop_writers = threading.Event()
+        writer_stats = {"writes": 0, "locked": 0}
+
+        await self.app.initialize()
+        if self.app.post_init:
+            await self.app.post_init(self.app)
+        await self.app.start()
+        self.loop_lag.start()
+        if self.args.db_writers:
+            _background_writers(self.db_path, self.args.db_writers, self.args.db_writer_rate, stop_writers, writer_stats)
+
+        stages = []
+        try:
+            for rate in self.args.rates:
+                stage = await self.run_stage(rate)
+                stages.append(stage)
+                print(
+                    f"rate {rate}/s: p95 {stage['latency_ms']['p95']} ms, loop lag p99 "
+                    f"{stage['loop_lag_ms']['p99']} ms, keeping up: {stage['keeping_up']}",
+                    file=sys.stderr,
+                )
+        finally:
+            stop_writers.set()
+            await self.loop_lag.stop()
+            await self.app.stop()
+            await self.app.shutdown()
+            if self.app.post_shutdown:
+                await self.app.post_shutdown(self.app)
+
+        return {
+            "loadtest": "bot",
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": {key: value for key, value in vars(self.args).items() if key not in ("output", "json", "verbose")},
+            "background_writers": writer_stats,
+            "stages": stages,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="اختبار حمل معالجات البوت")
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 20, 50], help="معدلات التحديثات/ثانية")
+    parser.add_argument("--duration", type=float, default=10.0, help="مدة كل مرحلة بالثواني")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="مهلة تفريغ الطابور بعد كل مرحلة")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pins", type=int, default=300, help="عدد Pins المختلفة في الروابط")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="نسب أنواع التحديثات")
+    parser.add_argument("--api-ms", type=float, default=20.0, help="زمن كل استدعاء Bot API")
+    parser.add_argument("--resolve-ms", type=float, default=30.0, help="زمن تحليل Pin")
+    parser.add_argument("--download-ms", type=float, default=300.0, help="زمن تحميل الفيديو")
+    parser.add_argument("--video-kb", type=int, default=64)
+    parser.add_argument("--db-writers", type=int, default=0, help="خيوط كتابة إضافية على نفس قاعدة البيانات")
+    parser.add_argument("--db-writer-rate", type=float, default=20.0, help="كتابات/ثانية لكل خيط")
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="حد p95 لاعتبار البوت ملاحقاً للحمل")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="ملف JSON للنتائج")
+    parser.add_argument("--json", action="store_true", help="إخراج النتائج بصيغة JSON")
+    parser.add_argument("--verbose", action="store_true", help="إظهار سجلات البوت")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="pinbot-load-") as directory:
+        report = asyncio.run(LoadTest(args, directory).run())
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'rate':>6}{'sent':>6}{'done':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'lag p99':>9}{'db s':>7}{'locked':>7}  ok")
+    for stage in report["stages"]:
+        latency = stage["latency_ms"]
+        print(
+            f"{stage['rate']:>6g}{stage['sent']:>6}{stage['processed']:>6}{stage['errors']:>5}"
+            f"{latency['p50']:>9.1f}{latency['p95']:>9.1f}{latency['p99']:>9.1f}"
+            f"{stage['loop_lag_ms']['p99']:>9.1f}{stage['database']['total_seconds']:>7.2f}"
+            f"{stage['database']['locked_errors']:>7}  {'yes' if stage['keeping_up'] else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+مقاييس الأداء: عدادات ومؤشرات ومدرجات تكرارية لمراحل التحميل والرفع،
+مع تصدير بصيغة Prometheus عبر HTTP ولقطة داخلية لوضع polling
+"""
+import logging
+import math
+import time
+import weakref
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# حدود المدرجات الافتراضية للأزمنة بالثواني
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# حدود مدرجات سرعة النقل (بايت/ثانية): من 64KB/s إلى 128MB/s
+THROUGHPUT_BUCKETS = tuple(float(64 * 1024 * 2 ** power) for power in range(12))
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Metric:
+    """أساس المقاييس: قيم منفصلة لكل مجموعة قيم تسميات"""
+
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: التسميات المتوقعة {self.labelnames}، المستلمة {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_text(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def _label_key(self, key: LabelValues) -> str:
+        """مفتاح القيم في اللقطة الداخلية"""
+        return ','.join(f"{name}={value}" for name, value in zip(self.labelnames, key))
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+
+
+class _ValueMetric(_Metric):
+    """مقياس بقيمة واحدة لكل مجموعة تسميات، تُحدّث مباشرة أو تُقرأ من دالة عند كل تصدير"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # المقاييس بلا تسميات تُصدّر بالقيمة 0 منذ البداية
+        self._values: Dict[LabelValues, float] = {} if self.labelnames else {(): 0}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set_function(self, function: Callable[[], float], **labels: Any) -> None:
+        """قراءة القيمة من دالة عند التصدير (مثل إحصائيات مكون قائم أو طول طابور)"""
+        self._functions[self._key(labels)] = function
+
+    def remove_function(self, function: Callable[[], float], **labels: Any) -> None:
+        """إزالة دالة القراءة إن لم يستبدلها مكون أحدث بنفس التسميات"""
+        key = self._key(labels)
+        if self._functions.get(key) is function:
+            del self._functions[key]
+
+    def _collect(self) -> Dict[LabelValues, float]:
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = float(function())
+            except Exception as e:
+                logger.warning(f"فشل قراءة المقياس {self.name}: {str(e)}")
+        return values
+
+    def value(self, **labels: Any) -> float:
+        return self._collect().get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{self._labels_text(key)} {_format_value(value)}" for key, value in self._collect().items()
+        ]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {self._label_key(key): value for key, value in self._collect().items()}
+
+
+class Counter(_ValueMetric):
+    """عداد تراكمي لا يتناقص"""
+
+    TYPE = 'counter'
+
+
+class Gauge(_ValueMetric):
+    """قيمة لحظية"""
+
+    TYPE = 'gauge'
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_max(self, value: float, **labels: Any) -> None:
+        """ضبط القيمة إن كانت أكبر من الحالية (لتتبع الذروة)"""
+        key = self._key(labels)
+        self._values[key] = max(self._values.get(key, value), value)
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        """زيادة المؤشر طوال تنفيذ الكتلة"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """مدرج تكراري بحدود ثابتة (للأزمنة والسرعات)"""
+
+    TYPE = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        counts = self._counts.setdefault(key, [0] * len(self.buckets))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """قياس زمن تنفيذ الكتلة (يعمل مع الكتل التي تحتوي على await)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: Any) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def quantile(self, q: float, **labels: Any) -> Optional[float]:
+        """تقدير نسبة مئوية (0-1) بالاستيفاء داخل الحدود كما في histogram_quantile"""
+        return self._quantile(self._counts.get(self._key(labels)), q)
+
+    def _quantile(self, counts: Optional[List[int]], q: float) -> Optional[float]:
+        total = sum(counts or ())
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if cumulative + count >= rank and count:
+                if math.isinf(bound):
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound if not math.isinf(bound) else lower
+        return lower
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{self._labels_text(key, ('le', _format_value(bound)))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._labels_text(key)} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{self._labels_text(key)} {cumulative}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for key, counts in self._counts.items():
+            total = sum(counts)
+            result[self._label_key(key)] = {
+                'count': total,
+                'sum': self._sums[key],
+                'avg': self._sums[key] / total if total else 0.0,
+                'p50': self._quantile(counts, 0.50),
+                'p95': self._quantile(counts, 0.95),
+                'p99': self._quantile(counts, 0.99),
+            }
+        return result
+
+
+class MetricsRegistry:
+    """سجل المقاييس: إنشاء المقاييس مرة واحدة بالاسم وتصديرها"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs: Any):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"المقياس {name} مسجل مسبقاً بنوع أو تسميات مختلفة")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """تصدير كل المقاييس بصيغة Prometheus النصية"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        """لقطة داخلية لكل المقاييس (لوضع polling أو أوامر الإدارة)"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+class MetricBindings:
+    """
+    دوال قراءة المقاييس لمكون واحد عبر مرجع ضعيف: السجل المشترك لا يُبقي المكون حياً،
+    وتُزال الدوال عند إغلاقه حتى لا يُصدّر مكون مغلق قيمه
+    """
+
+    def __init__(self, owner: Any):
+        self._owner = weakref.ref(owner)
+        self._bound: List[Tuple[_ValueMetric, Callable[[], float], Dict[str, Any]]] = []
+
+    def bind(self, metric: _ValueMetric, read: Callable[[Any], float], **labels: Any) -> None:
+        """
+        Args:
+            metric: العداد أو المؤشر
+            read: دالة تستقبل المكون وتعيد القيمة
+            labels: تسميات القيمة
+        """
+        owner_ref = self._owner
+
+        def function() -> float:
+            owner = owner_ref()
+            return read(owner) if owner is not None else 0
+
+        metric.set_function(function, **labels)
+        self._bound.append((metric, function, labels))
+
+    def unbind(self) -> None:
+        for metric, function, labels in self._bound:
+            metric.remove_function(function, **labels)
+        self._bound.clear()
+
+
+# السجل المشترك بين المحمّل والبوت
+REGISTRY = MetricsRegistry()
+
+
+async def start_metrics_server(
+    registry: MetricsRegistry = REGISTRY,
+    host: str = '0.0.0.0',
+    port: int = 9090,
+    path: str = '/metrics'
+) -> 'web.AppRunner':
+    """
+    تشغيل خادم HTTP للمقاييس بصيغة Prometheus على حلقة الأحداث الحالية
+
+    Args:
+        registry: سجل المقاييس
+        host: عنوان الاستماع
+        port: المنفذ
+        path: مسار المقاييس
+
+    Returns:
+        مشغل الخادم (يُغلق عبر cleanup)
+    """
+    # يُستورد خادم aiohttp عند الحاجة فقط لتسريع بدء التشغيل
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    app = web.Application()
+    app.router.add_get(path, handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"خادم المقاييس يعمل على {host}:{port}{path}")
+    return runner
@@ -0,0 +1,249 @@
+"""
+خادم محلي يحاكي استجابات موارد Pinterest (JSON) من صفحات مسجلة، لاختبار التنقل
+في اللوحات والأقسام والملفات الشخصية دون الاتصال بـ Pinterest
+
+الاستخدام:
+    python pinterest_stub.py synthetic --pins 120 --output board.json  # صفحات تركيبية
+    python pinterest_stub.py serve --fixtures board.json --port 8090
+
+ثم:
+    AdvancedPinterestDownloader(api_base_url="http://127.0.0.1:8090")
+
+صيغة ملف التسجيلات: قائمة من
+    {"resource": "BoardFeedResource", "options": {...}, "response": {"resource_response": {...}}}
+يطابق التسجيل الطلب إذا تساوى اسم المورد وكل خيار مذكور في التسجيل، مع مطابقة
+bookmarks دائماً (غيابها يعني الصفحة الأولى)
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+def load_fixtures(paths: List[str]) -> List[Dict[str, Any]]:
+    """تحميل التسجيلات من ملف أو أكثر"""
+    records: List[Dict[str, Any]] = []
+    for path in paths:
+        records.extend(json.loads(Path(path).read_text(encoding="utf-8")))
+    return records
+
+
+def match_record(records: List[Dict[str, Any]], resource: str, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    البحث عن التسجيل المطابق للطلب
+
+    Args:
+        records: التسجيلات
+        resource: اسم المورد (مثل BoardFeedResource)
+        options: خيارات الطلب
+
+    Returns:
+        الاستجابة المسجلة أو None
+    """
+    for record in records:
+        if record["resource"] != resource:
+            continue
+        expected = record.get("options", {})
+        if expected.get("bookmarks") != options.get("bookmarks"):
+            continue
+        if all(str(options.get(key)) == str(value) for key, value in expected.items() if key != "bookmarks"):
+            return record["response"]
+    return None
+
+
+def build_synthetic_fixture(
+    base_url: str,
+    pins: int = 100,
+    page_size: int = 25,
+    username: str = "stubuser",
+    board: str = "videos",
+    section: str = "favorites",
+    video_every: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    بناء تسجيلات تركيبية للوحة وقسم منها والملف الشخصي لصاحبها، مع PinResource
+    لكل Pin لاختبار تحليل Pin المفرد عبر API
+
+    Args:
+        base_url: عنوان الخادم المحلي (لروابط الفيديو)
+        pins: عدد Pins في اللوحة
+        page_size: عدد Pins في كل صفحة
+        username: اسم المستخدم
+        board: اسم اللوحة
+        section: اسم القسم (يحتوي على أول ربع Pins)
+        video_every: Pin فيديو واحد كل N (البقية صور)
+
+    Returns:
+        قائمة التسجيلات
+    """
+    base_url = base_url.rstrip("/")
+
+    def pin(index: int) -> Dict[str, Any]:
+        pin_id = str(900_000_000 + index)
+        item: Dict[str, Any] = {
+            "type": "pin",
+            "id": pin_id,
+            "title": f"Stub pin {index}",
+            "description": "",
+            "images": {"orig": {"url": f"{base_url}/media/{pin_id}.jpg"}},
+        }
+        if index % video_every == 0:
+            item["videos"] = {"video_list": {"V_720P": {"url": f"{base_url}/media/{pin_id}.mp4", "width": 720}}}
+        return item
+
+    def feed(resource: str, options: Dict[str, Any], items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        records = []
+        pages = [items[start:start + page_size] for start in range(0, len(items), page_size)] or [[]]
+        for number, page in enumerate(pages):
+            page_options = dict(options)
+            if number:
+                page_options["bookmarks"] = [f"{resource}-page-{number}"]
+            bookmark = f"{resource}-page-{number + 1}" if number + 1 < len(pages) else "-end-"
+            records.append({
+                "resource": resource,
+                "options": page_options,
+                "response": {"resource_response": {"status": "success", "data": page, "bookmark": bookmark}},
+            })
+        return records
+
+    items = [pin(index) for index in range(pins)]
+    board_id, section_id = "5550001", "7770001"
+
+    records = [
+        {
+            "resource": "BoardResource",
+            "options": {"username": username, "slug": board},
+            "response": {"resource_response": {"status": "success", "data": {"id": board_id, "name": board}}},
+        },
+        {
+            "resource": "BoardSectionResource",
+            "options": {"username": username, "slug": board, "section_slug": section},
+            "response": {"resource_response": {"status": "success", "data": {"id": section_id, "slug": section}}},
+        },
+    ]
+    records += feed("BoardFeedResource", {"board_id": board_id}, items)
+    records += feed("BoardSectionPinsResource", {"section_id": section_id}, items[: max(1, pins // 4)])
+    records += feed("UserPinsResource", {"username": username}, items)
+    records += [
+        {
+            "resource": "PinResource",
+            "options": {"id": item["id"]},
+            "response": {"resource_response": {"status": "success", "data": item}},
+        }
+        for item in items
+    ]
+    return records
+
+
+def media_content(size: int) -> bytes:
+    """محتوى ملفات الوسائط التركيبية (نمط متغير حتى تظهر أخطاء ترتيب الأجزاء)"""
+    return bytes(index % 251 for index in range(size))
+
+
+def create_app(
+    records: List[Dict[str, Any]],
+    media_bytes: int = 64 * 1024,
+    hls_segments: int = 4,
+    ranges: bool = True
+) -> web.Application:
+    """
+    إنشاء تطبيق الخادم المحلي
+
+    Args:
+        records: التسجيلات
+        media_bytes: حجم ملفات الوسائط التركيبية تحت /media/ (يدعم طلبات Range)
+        hls_segments: عدد مقاطع قوائم HLS تحت /media/<name>.m3u8 (المحتوى نفسه مقسماً)
+        ranges: دعم طلبات Range (False لمحاكاة خادم يتجاهلها)
+
+    Returns:
+        تطبيق aiohttp (الطلبات المستلمة تُحفظ في app["requests"] وطلبات الوسائط في app["media_requests"])
+    """
+    app = web.Application()
+    app["records"] = records
+    app["requests"] = []
+    app["media_requests"] = []
+    content = media_content(media_bytes)
+    segment_size = -(-media_bytes // hls_segments)
+
+    async def resource(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        try:
+            options = json.loads(request.query.get("data", "{}")).get("options", {})
+        except ValueError:
+            return web.json_response({"resource_response": {"status": "failure"}}, status=400)
+
+        app["requests"].append({"resource": name, "options": options})
+        response = match_record(app["records"], name, options)
+        if response is None:
+            return web.json_response({"resource_response": {"status": "failure", "data": None}}, status=404)
+        return web.json_response(response)
+
+    async def media(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        app["media_requests"].append({
+            "name": name,
+            "method": request.method,
+            "range": request.headers.get("Range"),
+            "peer": request.transport.get_extra_info("peername") if request.transport else None,
+        })
+
+        if name.endswith(".m3u8"):
+            stem = name[:-len(".m3u8")]
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4"]
+            for index in range(hls_segments):
+                lines += ["#EXTINF:4.0,", f"{stem}-{index}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            return web.Response(text="\n".join(lines) + "\n", content_type="application/vnd.apple.mpegurl")
+
+        if name.endswith(".ts"):
+            index = int(name[:-len(".ts")].rsplit("-", 1)[1])
+            body = content[index * segment_size:(index + 1) * segment_size]
+            return web.Response(body=body, content_type="video/mp2t")
+
+        content_type = "image/jpeg" if name.endswith(".jpg") else "video/mp4"
+        headers = {"Accept-Ranges": "bytes" if ranges else "none"}
+        byte_range = request.http_range
+        if ranges and request.headers.get("Range") and byte_range.start is not None:
+            start, stop = byte_range.start, min(byte_range.stop or media_bytes, media_bytes)
+            headers["Content-Range"] = f"bytes {start}-{stop - 1}/{media_bytes}"
+            return web.Response(status=206, body=content[start:stop], content_type=content_type, headers=headers)
+        return web.Response(body=content, content_type=content_type, headers=headers)
+
+    app.router.add_get("/resource/{name}/get/", resource)
+    app.router.add_get("/_ngjs/resource/{name}/get/", resource)
+    app.router.add_get("/media/{name}", media)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="خادم محلي لاستجابات موارد Pinterest")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="تشغيل الخادم")
+    serve.add_argument("--fixtures", action="append", required=True, help="ملف تسجيلات JSON")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8090)
+    serve.add_argument("--media-bytes", type=int, default=64 * 1024)
+
+    synthetic = subparsers.add_parser("synthetic", help="إنشاء ملف تسجيلات تركيبي")
+    synthetic.add_argument("--output", required=True)
+    synthetic.add_argument("--base-url", default="http://127.0.0.1:8090")
+    synthetic.add_argument("--pins", type=int, default=100)
+    synthetic.add_argument("--page-size", type=int, default=25)
+    synthetic.add_argument("--video-every", type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.command == "synthetic":
+        records = build_synthetic_fixture(args.base_url, args.pins, args.page_size, video_every=args.video_every)
+        Path(args.output).write_text(json.dumps(records, indent=1), encoding="utf-8")
+        print(f"{len(records)} records -> {args.output}")
+        return
+
+    web.run_app(create_app(load_fixtures(args.fixtures), args.media_bytes), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
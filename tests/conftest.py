@@ -0,0 +1,104 @@
+"""
+أدوات مشتركة للاختبارات: بوت حقيقي ببدائل Bot API والمحمّل من loadtest.py
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+import pytest
+from aiohttp.test_utils import TestServer
+from telegram import Update
+
+from bot import PinterestBot
+from database import AsyncDatabase
+from downloader import AdvancedPinterestDownloader
+from loadtest import StubBotRequest, StubDownloader, build_update
+from pinterest_stub import create_app
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    """انتظار تحقق الشرط أو الفشل بعد المهلة"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.01)
+
+
+@asynccontextmanager
+async def stub_server(records: Iterable[Dict[str, Any]] = (), **options: Any) -> AsyncIterator[TestServer]:
+    """تشغيل خادم pinterest_stub على منفذ عشوائي (العنوان عبر server.make_url)"""
+    server = TestServer(create_app(list(records), **options))
+    await server.start_server()
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+class BotHarness:
+    """تشغيل PinterestBot على حلقة الاختبار مع استقبال التحديثات من الطابور"""
+
+    def __init__(self, directory: str, download_delay: float = 0.2, admin_id: Optional[int] = None):
+        self.request = StubBotRequest(latency=0)
+        self.downloader = StubDownloader(directory, resolve_delay=0, download_delay=download_delay, video_bytes=1024)
+        self.db = AsyncDatabase(f"{directory}/bot.db")
+        self.bot = PinterestBot(
+            "123456:TEST", admin_id=admin_id, db=self.db, downloader=self.downloader, request=self.request
+        )
+        self.app = self.bot.app
+        self.sent: List[Dict[str, Any]] = []
+        self._update_id = 0
+
+        do_request = self.request.do_request
+
+        async def recording(url: str, method: str, request_data: Any = None, *args: Any, **kwargs: Any):
+            self.sent.append({
+                "method": url.rsplit("/", 1)[-1],
+                "at": time.monotonic(),
+                "parameters": request_data.parameters if request_data else {},
+            })
+            return await do_request(url, method, request_data, *args, **kwargs)
+
+        self.request.do_request = recording
+
+    async def __aenter__(self) -> "BotHarness":
+        await self.app.initialize()
+        await self.app.post_init(self.app)
+        await self.app.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.app.stop()
+        await self.app.shutdown()
+        await self.app.post_shutdown(self.app)
+
+    async def send(self, user_id: int, kind: str = "link", pin_ids: Optional[List[str]] = None,
+                   text: Optional[str] = None) -> None:
+        """إضافة تحديث رسالة إلى طابور التحديثات"""
+        self._update_id += 1
+        data = build_update(self._update_id, user_id, kind, pin_ids or ["1"])
+        if text is not None:
+            data["message"]["text"] = text
+            entities = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+            data["message"]["entities"] = entities if text.startswith("/") else []
+        await self.app.update_queue.put(Update.de_json(data, self.app.bot))
+
+    def calls(self, method: str) -> List[Dict[str, Any]]:
+        return [call for call in self.sent if call["method"] == method]
+
+
+@pytest.fixture
+def make_downloader(tmp_path):
+    """إنشاء محمّل في مجلد الاختبار بتحليل داخل الحلقة، مع خيارات إضافية للمُنشئ"""
+    def make(**options: Any) -> AdvancedPinterestDownloader:
+        return AdvancedPinterestDownloader(str(tmp_path), parse_executor="inline", **options)
+
+    return make
+
+
+@pytest.fixture
+def run():
+    """تشغيل دالة غير متزامنة في حلقة أحداث جديدة"""
+    return lambda coroutine: asyncio.run(coroutine)
@@ -0,0 +1,60 @@
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from benchmark import build_fixture_page
+from downloader import AdvancedPinterestDownloader
+from pinterest_stub import build_synthetic_fixture, create_app
+
+VIDEO_PIN = "900000000"
+IMAGE_PIN = "900000001"
+
+
+async def _resolve(tmp_path, pin_ids, **options):
+    pages = []
+
+    async def pin_page(request):
+        pin_id = request.match_info["pin_id"]
+        pages.append(pin_id)
+        return web.Response(body=build_fixture_page(pin_id, related_pins=3), content_type="text/html")
+
+    app = create_app([])
+    app.router.add_get("/pin/{pin_id}/", pin_page)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        base_url = str(server.make_url("/"))
+        app["records"].extend(build_synthetic_fixture(base_url, pins=2, video_every=2))
+        async with AdvancedPinterestDownloader(
+            str(tmp_path), api_base_url=base_url, parse_executor="inline", **options
+        ) as downloader:
+            results = [
+                await downloader._resolve_pin_data(str(server.make_url(f"/pin/{pin_id}/")), pin_id)
+                for pin_id in pin_ids
+            ]
+            strategies = [(entry["strategy"], entry["success"]) for entry in downloader.resolution_log]
+        return results, strategies, pages, [request["resource"] for request in app["requests"]]
+    finally:
+        await server.close()
+
+
+def test_video_pin_resolves_from_pin_resource_without_the_page(tmp_path, run):
+    results, strategies, pages, resources = run(_resolve(tmp_path, [VIDEO_PIN]))
+    assert results[0]["video_url"].endswith(f"/media/{VIDEO_PIN}.mp4")
+    assert results[0]["title"] == "Stub pin 0"
+    assert strategies == [("api", True)]
+    assert pages == []
+    assert resources == ["PinResource"]
+
+
+def test_pin_without_api_video_falls_back_to_the_page(tmp_path, run):
+    results, strategies, pages, _ = run(_resolve(tmp_path, [IMAGE_PIN, "123"]))
+    assert all(f"/videos/{pin_id}/" in result["video_url"] for pin_id, result in zip([IMAGE_PIN, "123"], results))
+    assert strategies == [("api", False), ("html", True)] * 2
+    assert pages == [IMAGE_PIN, "123"]
+
+
+def test_fast_path_can_be_disabled(tmp_path, run):
+    _, strategies, pages, resources = run(_resolve(tmp_path, [VIDEO_PIN], api_fast_path=False))
+    assert strategies == [("html", True)]
+    assert pages == [VIDEO_PIN]
+    assert resources == []
@@ -0,0 +1,83 @@
+import asyncio
+
+
+def _recording(downloader, delays=None, media_hosts=None):
+    """استبدال التحليل والتحميل بتأخير ثابت مع تسجيل Pins المحملة وذروة التزامن"""
+    calls, active, peak = [], [0], [0]
+
+    async def resolve_video(url):
+        pin_id = await downloader.resolve_pin_id(url)
+        host = (media_hosts or {}).get(pin_id, "v1.pinimg.com")
+        return pin_id, {"video_url": f"https://{host}/videos/{pin_id}.mp4"}
+
+    async def download_video(url, max_bytes=None):
+        pin_id = await downloader.resolve_pin_id(url)
+        calls.append(pin_id)
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        try:
+            await asyncio.sleep((delays or {}).get(pin_id, 0.01))
+        finally:
+            active[0] -= 1
+        return {"pin_id": pin_id}
+
+    downloader._resolve_video = resolve_video
+    downloader.download_video = download_video
+    return downloader, calls, peak
+
+
+def test_download_many_dedupes_on_pin_id(make_downloader, run):
+    downloader, calls, _ = _recording(make_downloader())
+
+    async def scenario():
+        await downloader.short_link_cache.set("AbC12", "https://www.pinterest.com/pin/1/")
+        urls = [
+            "https://www.pinterest.com/pin/1/",
+            "https://pinterest.com/pin/1",
+            "https://pin.it/AbC12",
+            "https://www.pinterest.com/pin/2/",
+            "https://www.pinterest.com/pin/2/",
+        ]
+        return [item async for item in downloader.download_many(urls)]
+
+    items = run(scenario())
+    assert sorted(calls) == ["1", "2"]
+    # كل رابط مُدخل له نتيجة، والمكرر يشارك نتيجة الرابط الأول لنفس Pin
+    assert sorted(item["result"]["pin_id"] for item in items) == ["1", "1", "1", "2", "2"]
+    duplicates = {item["url"]: item["duplicate_of"] for item in items if item["duplicate_of"]}
+    assert duplicates == {
+        "https://pinterest.com/pin/1": "https://www.pinterest.com/pin/1/",
+        "https://pin.it/AbC12": "https://www.pinterest.com/pin/1/",
+        "https://www.pinterest.com/pin/2/": "https://www.pinterest.com/pin/2/",
+    }
+
+
+def test_download_many_bounds_concurrency_and_yields_as_completed(make_downloader, run):
+    delays = {str(pin): 0.2 if pin == 0 else 0.02 for pin in range(10)}
+    downloader, calls, peak = _recording(make_downloader(), delays)
+
+    async def source():
+        for pin in range(10):
+            yield f"https://www.pinterest.com/pin/{pin}/"
+
+    async def scenario():
+        return [item["result"]["pin_id"] async for item in downloader.download_many(source(), max_concurrency=3)]
+
+    order = run(scenario())
+    assert peak[0] == 3
+    assert sorted(order) == sorted(delays)
+    assert order[-1] == "0"
+
+
+def test_download_many_limits_each_media_host(make_downloader, run):
+    # روابط Pinterest من مضيف واحد ووسائطها موزعة على مضيفين
+    media_hosts = {str(pin): f"v{pin % 2 + 1}.pinimg.com" for pin in range(6)}
+    downloader, calls, peak = _recording(make_downloader(), {pin: 0.05 for pin in media_hosts}, media_hosts)
+
+    async def scenario():
+        urls = [f"https://www.pinterest.com/pin/{pin}/" for pin in media_hosts]
+        return [item async for item in downloader.download_many(urls, per_host_concurrency=1)]
+
+    items = run(scenario())
+    assert len(items) == 6
+    assert peak[0] == 2
@@ -0,0 +1,54 @@
+import shutil
+
+import pytest
+
+from benchmark import build_fixture_page, compare_reports, run_e2e_benchmark, run_locator_benchmark
+
+
+def test_locator_benchmark_reports_correctness():
+    fixtures = [
+        (layout, "123456", build_fixture_page("123456", related_pins=20, layout=layout))
+        for layout in ("redux", "nested")
+    ]
+    results = run_locator_benchmark(fixtures, repeat=1)
+
+    assert [row["fixture"] for row in results] == ["redux", "nested"]
+    assert all(row["locate_correct"] for row in results)
+    # البحث التعاودي القديم يعيد فيديو أول Pin مقترح
+    assert not any(row["legacy_correct"] for row in results)
+
+
+def test_compare_reports_matches_concurrency_levels():
+    def report(*rows):
+        return {"results": [
+            {
+                "concurrency": level,
+                "pins_per_second": rate,
+                "bytes_per_second": rate * 1000,
+                "latency_ms": {"p50": 100, "p95": p95, "p99": p95},
+                "peak_rss_mb": 50,
+            }
+            for level, rate, p95 in rows
+        ]}
+
+    rows = compare_reports(report((1, 10, 200), (8, 40, 400)), report((8, 50, 300), (64, 90, 900)))
+    assert rows == [{
+        "concurrency": 8,
+        "pins_per_second": 25.0,
+        "bytes_per_second": 25.0,
+        "p50": 0.0,
+        "p95": -25.0,
+        "p99": -25.0,
+        "peak_rss_mb": 0.0,
+    }]
+
+
+@pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl is needed for the stand-in TLS certificate")
+def test_e2e_benchmark_downloads_every_pin():
+    report = run_e2e_benchmark(
+        [2], pins=4, rounds=1, server_options={"media_bytes": 64 * 1024, "hls_segments": 4, "related_pins": 5}
+    )
+    (row,) = report["results"]
+    assert (row["concurrency"], row["pins"], row["failed"]) == (2, 4, 0)
+    assert row["bytes_per_second"] > 0
+    assert report["config"]["resolve"] == "html"
@@ -0,0 +1,195 @@
+import os
+import tempfile
+import time
+
+from conftest import BotHarness, wait_for
+
+
+def test_duplicate_links_share_one_download(tmp_path, run):
+    async def scenario():
+        async with BotHarness(str(tmp_path), download_delay=0.3) as harness:
+            for user_id in range(1, 6):
+                await harness.send(user_id, "link", ["42"])
+            await wait_for(lambda: len(harness.calls("sendVideo")) == 5)
+
+            assert harness.bot.inflight.stats == {"leaders": 1, "followers": 4}
+            assert harness.downloader.downloads == 1
+
+    run(scenario())
+
+
+def test_commands_are_not_blocked_by_downloads(tmp_path, run):
+    async def scenario():
+        async with BotHarness(str(tmp_path), download_delay=1.0) as harness:
+            await harness.send(1, "link", ["42"])
+            await wait_for(lambda: harness.bot.inflight.in_flight == 1)
+            sent_at = time.monotonic()
+            await harness.send(2, "start")
+            await wait_for(lambda: any("Welcome" in call["parameters"].get("text", "")
+                                       for call in harness.calls("sendMessage")))
+
+            welcome = next(call for call in harness.calls("sendMessage") if "Welcome" in call["parameters"]["text"])
+            assert welcome["at"] - sent_at < 0.5
+            assert harness.bot.inflight.in_flight == 1
+            await wait_for(lambda: len(harness.calls("sendVideo")) == 1)
+
+    run(scenario())
+
+
+def _stream_factory(size, known_size=True, estimated_size=None):
+    from downloader import VideoStream
+
+    async def source():
+        for _ in range(size // 1024):
+            yield bytes(1024)
+
+    async def stream_video(url, max_bytes=None, buffer_bytes=None):
+        stream_video.opened += 1
+        return VideoStream(source(), size if known_size else None, 64 * 1024,
+                           estimated_size=estimated_size, title="Streamed", pin_id="42", extension="mp4")
+
+    stream_video.opened = 0
+    return stream_video
+
+
+def test_stream_upload_holds_video_in_memory(tmp_path, run):
+    async def scenario():
+        async with BotHarness(str(tmp_path)) as harness:
+            harness.bot.stream_uploads = True
+            harness.bot.stream_memory_limit = 256 * 1024
+            for user_id, known_size in ((1, True), (2, False)):
+                harness.downloader.stream_video = _stream_factory(128 * 1024, known_size, 128 * 1024)
+                await harness.send(user_id, "link", [str(40 + user_id)])
+                await wait_for(lambda: len(harness.calls("sendVideo")) == user_id)
+
+            assert harness.downloader.downloads == 0
+            assert harness.bot._upload_buffer_peak.value() == 128 * 1024
+            assert harness.bot._upload_buffer.value() == 0
+
+    run(scenario())
+
+
+def test_stream_larger_than_memory_limit_continues_on_disk(tmp_path, run, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    async def scenario():
+        async with BotHarness(str(tmp_path), download_delay=0) as harness:
+            harness.bot.stream_uploads = True
+            harness.bot.stream_memory_limit = 64 * 1024
+            # حجم معروف، حجم مجهول، وتقدير أصغر من الحجم الفعلي يُكتشف أثناء البث
+            cases = ((True, None), (False, None), (False, 32 * 1024))
+            for user_id, (known_size, estimated_size) in enumerate(cases, 1):
+                stream_video = _stream_factory(128 * 1024, known_size, estimated_size)
+                harness.downloader.stream_video = stream_video
+                await harness.send(user_id, "link", [str(40 + user_id)])
+                await wait_for(lambda: len(harness.calls("sendVideo")) == user_id)
+
+                assert stream_video.opened == 1
+                assert harness.bot._upload_buffer_peak.value() == 128 * 1024
+
+            await wait_for(lambda: not list(tmp_path.glob("pinterest_42_*")))
+            assert harness.downloader.downloads == 0
+
+    run(scenario())
+
+
+def test_multi_link_message_shares_one_status_with_collections(tmp_path, run):
+    async def scenario():
+        async with BotHarness(str(tmp_path), download_delay=0) as harness:
+            collections = {
+                "https://www.pinterest.com/someone/recipes/": ["7", "8"],
+                "https://www.pinterest.com/someone/": ["9"],
+            }
+
+            async def resolve_collection(url):
+                return {"type": "board"} if url in collections else None
+
+            async def iter_collection_pins(url, max_pins=None, videos_only=True):
+                for pin_id in collections[url]:
+                    yield pin_id
+
+            harness.downloader.resolve_collection = resolve_collection
+            harness.downloader.iter_collection_pins = iter_collection_pins
+            added_users = []
+            add_user = harness.db.add_user
+
+            async def counting_add_user(*args, **kwargs):
+                added_users.append(args[0])
+                return await add_user(*args, **kwargs)
+
+            harness.db.add_user = counting_add_user
+            await harness.send(1, text="pinterest.com/pin/1 pinterest.com/pin/2 " + " ".join(collections))
+            await wait_for(lambda: harness.calls("deleteMessage"))
+
+            assert added_users == [1]
+            assert len(harness.calls("sendMessage")) == 1
+            assert len(harness.calls("sendMediaGroup")) == 1
+            assert len(harness.calls("sendVideo")) == 3
+
+    run(scenario())
+
+
+def test_media_group_skips_videos_whose_file_cannot_be_read(tmp_path, run):
+    async def scenario():
+        async with BotHarness(str(tmp_path), download_delay=0) as harness:
+            download_video = harness.downloader.download_video
+
+            async def losing_file(url, max_bytes=None):
+                result = await download_video(url, max_bytes)
+                if result["pin_id"] in ("2", "4"):
+                    os.remove(result["filepath"])
+                return result
+
+            harness.downloader.download_video = losing_file
+            await harness.send(1, text="pinterest.com/pin/1 pinterest.com/pin/2 pinterest.com/pin/3")
+            await harness.send(2, text="pinterest.com/pin/4 pinterest.com/pin/5")
+            await wait_for(lambda: len(harness.calls("editMessageText")) == 2)
+
+            assert len(harness.calls("sendMediaGroup")) == 1
+            assert len(harness.calls("sendVideo")) == 1
+            edits = [call["parameters"]["text"] for call in harness.calls("editMessageText")]
+            assert sorted(edits) == ["⚠️ Sent 1 videos, 1 of 2 links failed.", "⚠️ Sent 2 videos, 1 of 3 links failed."]
+            assert not list(tmp_path.glob("pinterest_*.mp4"))
+
+    run(scenario())
+
+
+def test_mpeg_ts_downloads_are_sent_as_documents(tmp_path, run):
+    async def scenario():
+        async with BotHarness(str(tmp_path), download_delay=0) as harness:
+            download_video = harness.downloader.download_video
+
+            async def hls_without_init(url, max_bytes=None):
+                result = await download_video(url, max_bytes)
+                if result["pin_id"] in ("1", "3"):
+                    filepath = result["filepath"][:-len(".mp4")] + ".ts"
+                    os.rename(result["filepath"], filepath)
+                    result["filepath"] = filepath
+                return result
+
+            harness.downloader.download_video = hls_without_init
+            await harness.send(1, "link", ["1"])
+            await wait_for(lambda: len(harness.calls("sendDocument")) == 1)
+            await harness.send(2, text="pinterest.com/pin/2 pinterest.com/pin/3 pinterest.com/pin/4")
+            await wait_for(lambda: len(harness.calls("deleteMessage")) == 2)
+
+            assert len(harness.calls("sendDocument")) == 2
+            assert len(harness.calls("sendMediaGroup")) == 1
+            assert not harness.calls("sendVideo")
+
+    run(scenario())
+
+
+def test_transfer_settings_are_read_from_the_environment(tmp_path, monkeypatch):
+    from bot import PinterestBot
+    from database import AsyncDatabase
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HLS_CONCURRENCY", "3")
+    monkeypatch.setenv("RANGE_CONNECTIONS", "1")
+    monkeypatch.setenv("RANGE_PART_MB", "8")
+    downloader = PinterestBot._create_downloader(AsyncDatabase(f"{tmp_path}/bot.db")).advanced_downloader
+
+    assert downloader.hls_concurrency == 3
+    assert downloader.range_connections == 1
+    assert downloader.range_part_size == 8 * 1024 * 1024
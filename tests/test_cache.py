@@ -0,0 +1,124 @@
+import sqlite3
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from benchmark import StandInResolver
+from database import AsyncDatabase, Database
+from downloader import AdvancedPinterestDownloader, HTTPSessionManager, PinResolutionCache, ShortLinkCache
+
+VARIANTS = [
+    {"quality": "V_720P", "url": "https://v1.pinimg.com/videos/42/720p.mp4"},
+    {"quality": "V_480P", "url": "https://v1.pinimg.com/videos/42/480p.mp4"},
+]
+PIN_DATA = {"video_url": VARIANTS[0]["url"], "quality": "V_720P", "title": "t", "variants": VARIANTS}
+
+
+def test_memory_tier_ttl_and_lru(run):
+    async def scenario():
+        cache = PinResolutionCache(ttl_seconds=60, max_entries=2)
+        for pin_id in ("1", "2"):
+            await cache.set(pin_id, PIN_DATA)
+        assert await cache.get("1")
+        await cache.set("3", PIN_DATA)
+        # "2" هو الأقدم استخداماً بعد قراءة "1"
+        assert await cache.get("2") is None
+        assert await cache.get("1") and await cache.get("3")
+
+        cache._entries["1"] = (time.monotonic() - 1, cache._entries["1"][1])
+        assert await cache.get("1") is None
+        return cache.stats
+
+    assert run(scenario()) == {"hits": 3, "store_hits": 0, "misses": 2}
+
+
+def test_store_tier_hit_keeps_variants(tmp_path, run):
+    db = AsyncDatabase(str(tmp_path / "bot.db"))
+
+    async def scenario():
+        await PinResolutionCache(store=db).set("42", PIN_DATA)
+        # ذاكرة جديدة (بعد إعادة التشغيل) تقرأ من SQLite فقط
+        cache = PinResolutionCache(store=db)
+        data = await cache.get("42")
+        assert cache.stats["store_hits"] == 1
+        return data
+
+    data = run(scenario())
+    db.close()
+    assert data["variants"] == VARIANTS
+    assert data["video_url"] == VARIANTS[0]["url"]
+
+
+def test_rows_without_variants_are_misses(tmp_path, run):
+    db = Database(str(tmp_path / "bot.db"))
+    db.save_resolved_pin("42", VARIANTS[0]["url"], quality="V_720P")
+
+    async def scenario():
+        cache = PinResolutionCache(store=db)
+        return await cache.get("42"), cache.stats
+
+    data, stats = run(scenario())
+    assert data is None
+    assert stats["misses"] == 1
+
+
+def test_variants_column_added_to_existing_database(tmp_path):
+    path = tmp_path / "bot.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE resolved_pins (id INTEGER PRIMARY KEY, pin_id VARCHAR UNIQUE, video_url VARCHAR, "
+        "quality VARCHAR, title VARCHAR, description VARCHAR, thumbnail VARCHAR, resolved_at DATETIME)"
+    )
+    connection.execute("INSERT INTO resolved_pins (pin_id, video_url, resolved_at) VALUES ('7', 'u', '2026-01-01')")
+    connection.commit()
+    connection.close()
+
+    db = Database(str(path))
+    assert db.get_resolved_pin("7").variants is None
+    db.save_resolved_pin("7", "u", variants="[]")
+    assert db.get_resolved_pin("7").variants == "[]"
+
+
+def test_short_link_expansion_persists_across_restarts(tmp_path, run):
+    requests = []
+
+    async def short_link(request):
+        requests.append(request.path)
+        raise web.HTTPFound("http://www.pinterest.com/pin/42/?utm_source=share")
+
+    async def pin_page(request):
+        requests.append(request.path)
+        return web.Response(text="pin")
+
+    async def expand(server, db):
+        session_manager = HTTPSessionManager(resolver=StandInResolver({80: server.port}))
+        downloader = AdvancedPinterestDownloader(
+            str(tmp_path), session_manager=session_manager, short_link_cache=ShortLinkCache(store=db)
+        )
+        async with downloader:
+            return await downloader._expand_short_url("http://pin.it/abc123"), downloader.short_link_cache.stats
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/pin/{pin_id}/", pin_page)
+        app.router.add_get("/{code}", short_link)
+        server = TestServer(app)
+        await server.start_server()
+        db = AsyncDatabase(str(tmp_path / "bot.db"))
+        try:
+            first = await expand(server, db)
+            network_requests = list(requests)
+            # محمل جديد (بعد إعادة التشغيل) يقرأ التوسيع من قاعدة البيانات
+            second = await expand(server, db)
+        finally:
+            await server.close()
+            db.close()
+        return first, second, network_requests
+
+    (first_url, first_stats), (second_url, second_stats), network_requests = run(scenario())
+    assert first_url == second_url == AdvancedPinterestDownloader.canonical_pin_url("42")
+    assert network_requests == ["/abc123", "/pin/42/"]
+    assert first_stats["misses"] == 1
+    assert second_stats["store_hits"] == 1
+    assert len(requests) == 2
@@ -0,0 +1,69 @@
+import asyncio
+
+from conftest import stub_server
+from downloader import AdvancedPinterestDownloader, SingleFlight
+from pinterest_stub import build_synthetic_fixture
+
+
+def test_concurrent_callers_share_one_call(run):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"video_url": "u"}
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("pin:1", fetch) for _ in range(5)))
+        return results, flight
+
+    results, flight = run(scenario())
+    assert len(calls) == 1
+    assert all(result == {"video_url": "u"} for result in results)
+    assert flight.stats == {"leaders": 1, "followers": 4}
+    assert flight.in_flight == 0
+
+
+def test_leader_cancellation_and_errors(run):
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ConnectionResetError("reset")
+
+    async def scenario():
+        flight = SingleFlight()
+        leader = asyncio.ensure_future(flight.do("a", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("a", slow))
+        await asyncio.sleep(0)
+        # إلغاء الطلب الأول لا يلغي العملية المشتركة
+        leader.cancel()
+        assert await follower == "done"
+
+        results = await asyncio.gather(*(flight.do("b", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ConnectionResetError) for result in results)
+        # الفشل لا يبقى في الذاكرة: المحاولة التالية تبدأ عملية جديدة
+        assert await flight.do("b", slow) == "done"
+        return flight.stats
+
+    assert run(scenario()) == {"leaders": 3, "followers": 3}
+
+
+def test_simultaneous_resolutions_hit_the_network_once(tmp_path, run):
+    async def scenario():
+        async with stub_server() as server:
+            base_url = str(server.make_url("/"))
+            server.app["records"].extend(build_synthetic_fixture(base_url, pins=1))
+            pin_id = "900000000"
+            url = AdvancedPinterestDownloader.canonical_pin_url(pin_id)
+            async with AdvancedPinterestDownloader(str(tmp_path), api_base_url=base_url) as downloader:
+                results = await asyncio.gather(*(downloader._resolve_pin_data(url, pin_id) for _ in range(10)))
+            return results, server.app["requests"]
+
+    results, requests = run(scenario())
+    assert all(result and result["video_url"].endswith("/media/900000000.mp4") for result in results)
+    assert [request["resource"] for request in requests] == ["PinResource"]
@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import stub_server
+from downloader import AdvancedPinterestDownloader
+from pinterest_stub import build_synthetic_fixture, media_content
+
+PINS = 60
+
+
+async def _collect(tmp_path, url, **options):
+    async with stub_server(media_bytes=4096) as server:
+        base_url = str(server.make_url("/"))
+        server.app["records"].extend(build_synthetic_fixture(base_url, pins=PINS, video_every=2))
+        async with AdvancedPinterestDownloader(str(tmp_path), api_base_url=base_url) as downloader:
+            pins = [pin_id async for pin_id in downloader.iter_collection_pins(url, **options)]
+            cached = [await downloader.resolution_cache.get(pin_id) for pin_id in pins]
+        return pins, cached, server.app["requests"]
+
+
+@pytest.mark.parametrize("url, resources, expected", [
+    ("https://www.pinterest.com/stubuser/videos/", ["BoardResource"] + ["BoardFeedResource"] * 3, PINS // 2),
+    ("https://pinterest.com/stubuser/videos/favorites/", ["BoardSectionResource", "BoardSectionPinsResource"], 8),
+    ("https://www.pinterest.com/stubuser/", ["UserPinsResource"] * 3, PINS // 2),
+], ids=["board", "section", "profile"])
+def test_collection_pages_are_followed_by_bookmark(tmp_path, run, url, resources, expected):
+    pins, cached, requests = run(_collect(tmp_path, url))
+
+    assert len(pins) == len(set(pins)) == expected
+    assert [request["resource"] for request in requests] == resources
+    # بيانات الفيديو من صفحة المجموعة تُحفظ فلا حاجة لطلب PinResource لكل Pin
+    assert all(data and data["video_url"].endswith(f"/media/{pin_id}.mp4") for pin_id, data in zip(pins, cached))
+
+
+def test_max_pins_stops_paging(tmp_path, run):
+    pins, _, requests = run(_collect(tmp_path, "https://www.pinterest.com/stubuser/videos/", max_pins=5))
+    assert len(pins) == 5
+    assert [request["resource"] for request in requests] == ["BoardResource", "BoardFeedResource"]
+
+
+def test_unknown_board_yields_nothing(tmp_path, run):
+    pins, _, requests = run(_collect(tmp_path, "https://www.pinterest.com/stubuser/missing/"))
+    assert pins == []
+    assert [request["resource"] for request in requests] == ["BoardResource"]
+
+
+def test_download_collection_downloads_every_video(tmp_path, run):
+    async def scenario():
+        async with stub_server(media_bytes=4096) as server:
+            base_url = str(server.make_url("/"))
+            server.app["records"].extend(build_synthetic_fixture(base_url, pins=10, video_every=2))
+            async with AdvancedPinterestDownloader(
+                str(tmp_path), api_base_url=base_url, range_connections=1
+            ) as downloader:
+                items = [item async for item in downloader.download_collection(
+                    "https://www.pinterest.com/stubuser/videos/", max_concurrency=3
+                )]
+            return items, server.app["requests"]
+
+    items, requests = run(scenario())
+    assert len(items) == 5
+    assert all(open(item["result"]["filepath"], "rb").read() == media_content(4096) for item in items)
+    assert "PinResource" not in {request["resource"] for request in requests}
@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from database import AsyncDatabase, DailyStats, Database, StatCounter, User
+from downloader import PinResolutionCache, ShortLinkCache
+
+
+def test_wal_and_pragmas_on_pooled_connections(tmp_path):
+    db = Database(str(tmp_path / "bot.db"))
+    with db.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+
+def test_async_database_runs_every_query_on_one_thread(tmp_path, run):
+    db = AsyncDatabase(str(tmp_path / "bot.db"))
+    threads = set()
+    for name in ("add_user", "get_resolved_pin", "save_resolved_pin", "get_short_link", "save_short_link"):
+        method = getattr(db.sync, name)
+
+        def recording(*args, method=method, **kwargs):
+            threads.add(threading.current_thread().name)
+            return method(*args, **kwargs)
+
+        setattr(db.sync, name, recording)
+
+    async def scenario():
+        await db.add_user(1, "user", "User")
+        # ذاكرتا التحليل والروابط المختصرة تمران عبر خيط قاعدة البيانات أيضاً
+        pins = PinResolutionCache(store=db)
+        await pins.set("42", {"video_url": "https://v.pinimg.com/42.mp4", "title": "t"})
+        await PinResolutionCache(store=db).get("42")
+        links = ShortLinkCache(store=db)
+        await links.set("abc", "https://www.pinterest.com/pin/42/")
+        assert await ShortLinkCache(store=db).get("abc") == "https://www.pinterest.com/pin/42/"
+
+    run(scenario())
+    db.close()
+    assert len(threads) == 1
+    assert threads.pop().startswith("database")
+
+
+def test_counters_and_daily_rollups(tmp_path):
+    db = Database(str(tmp_path / "bot.db"))
+    for user_id in (1, 2, 1):
+        db.add_user(user_id, f"user{user_id}", "User")
+    for pin_id in (1, 2, 1):
+        db.add_downloaded_video(f"https://www.pinterest.com/pin/{pin_id}/", "file")
+
+    stats = db.get_stats(days=7, top=1)
+    assert (stats["total_users"], stats["total_videos"]) == (2, 2)
+    today = stats["today"]
+    assert (today.active_users, today.new_users, today.downloads) == (2, 2, 3)
+    assert [(video.url, video.download_count) for video in stats["top_videos"]] == [
+        ("https://www.pinterest.com/pin/1/", 2)
+    ]
+
+
+def test_returning_user_is_active_once_per_day(tmp_path):
+    db = Database(str(tmp_path / "bot.db"))
+    db.add_user(1, "user1", "User")
+    with Session(db.engine) as session:
+        user = session.exec(select(User).where(User.user_id == 1)).one()
+        user.last_activity = datetime.utcnow() - timedelta(days=1)
+        session.add(user)
+        daily = session.get(DailyStats, datetime.utcnow().date().isoformat())
+        session.delete(daily)
+        session.commit()
+
+    db.add_user(1, "user1", "User")
+    db.add_user(1, "user1", "User")
+    today = db.get_stats(days=1)["today"]
+    assert (today.active_users, today.new_users) == (1, 0)
+    assert db.get_total_users() == 1
+
+
+def test_counters_are_seeded_from_existing_rows(tmp_path):
+    path = str(tmp_path / "bot.db")
+    db = Database(path)
+    for user_id in range(3):
+        db.add_user(user_id, None, None)
+    db.add_downloaded_video("https://www.pinterest.com/pin/1/", "file")
+    # قاعدة بيانات سابقة لجدول العدادات
+    with Session(db.engine) as session:
+        for counter in session.exec(select(StatCounter)).all():
+            session.delete(counter)
+        session.commit()
+    db.engine.dispose()
+
+    reopened = Database(path)
+    assert (reopened.get_total_users(), reopened.get_total_videos()) == (3, 1)
+
+
+def test_concurrent_writers_keep_counters_exact(tmp_path):
+    path = str(tmp_path / "bot.db")
+    Database(path)
+
+    def write(worker):
+        db = Database(path)
+        for index in range(25):
+            db.add_user(worker * 1000 + index, None, None)
+            db.add_downloaded_video(f"https://www.pinterest.com/pin/{worker}{index}/", "file")
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db = Database(path)
+    assert (db.get_total_users(), db.get_total_videos()) == (100, 100)
+    assert db.get_stats(days=1)["today"].downloads == 100
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from conftest import stub_server
+from downloader import DownloadJournal
+from pinterest_stub import media_content
+
+MEDIA_BYTES = 300 * 1024
+
+
+def test_ranged_download_reassembles_parts_in_order(make_downloader, run):
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES) as server:
+            async with make_downloader(range_connections=4, range_part_size=64 * 1024) as downloader:
+                path = await downloader._download_progressive(str(server.make_url("/media/1.mp4")), "1", {})
+            ranges = [item["range"] for item in server.app["media_requests"] if item["range"]]
+            return path, ranges
+
+    path, ranges = run(scenario())
+    assert path.read_bytes() == media_content(MEDIA_BYTES)
+    assert len(ranges) == 5
+
+
+def test_interrupted_download_resumes_from_journal(make_downloader, run):
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES) as server:
+            url = str(server.make_url("/media/1.mp4"))
+            async with make_downloader(range_connections=1) as downloader:
+                # ملف جزئي من محاولة سابقة توقفت عند 100KB
+                part_path = downloader._partial_path("1", url, "mp4")
+                part_path.write_bytes(media_content(MEDIA_BYTES)[:100 * 1024])
+                DownloadJournal(part_path, "stream", url).save(offset=100 * 1024)
+
+                path = await downloader._download_progressive(url, "1", {})
+            return path, part_path, server.app["media_requests"]
+
+    path, part_path, requests = run(scenario())
+    assert path.read_bytes() == media_content(MEDIA_BYTES)
+    assert requests[-1]["range"] == f"bytes={100 * 1024}-"
+    assert not part_path.exists()
+    assert not DownloadJournal(part_path, "stream", "").path.exists()
+
+
+def test_same_source_downloads_never_share_a_partial_file(make_downloader, run):
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES) as server:
+            url = str(server.make_url("/media/1.mp4"))
+            async with make_downloader(range_connections=1) as downloader:
+                single_stream = downloader._download_single_stream
+                active, overlaps = [], []
+
+                async def tracked(*args, **kwargs):
+                    overlaps.append(len(active))
+                    active.append(1)
+                    try:
+                        await asyncio.sleep(0.05)
+                        return await single_stream(*args, **kwargs)
+                    finally:
+                        active.pop()
+
+                downloader._download_single_stream = tracked
+                paths = await asyncio.gather(
+                    downloader._download_progressive(url, "1", {}, max_bytes=MEDIA_BYTES),
+                    downloader._download_progressive(url, "1", {}, max_bytes=2 * MEDIA_BYTES),
+                )
+                return paths, overlaps, downloader._partial_locks._locks
+
+    paths, overlaps, locks = run(scenario())
+    assert overlaps == [0, 0]
+    assert all(path.read_bytes() == media_content(MEDIA_BYTES) for path in paths)
+    assert locks == {}
+
+
+def test_ranged_download_resumes_only_missing_parts(make_downloader, run):
+    part_size = 64 * 1024
+
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES) as server:
+            url = str(server.make_url("/media/1.mp4"))
+            async with make_downloader(range_connections=4, range_part_size=part_size) as downloader:
+                # الجزآن 0 و 2 اكتملا في محاولة سابقة
+                part_path = downloader._partial_path("1", url, "mp4")
+                content = bytearray(MEDIA_BYTES)
+                for index in (0, 2):
+                    start = index * part_size
+                    content[start:start + part_size] = media_content(MEDIA_BYTES)[start:start + part_size]
+                part_path.write_bytes(bytes(content))
+                DownloadJournal(part_path, "ranged", url, MEDIA_BYTES, part_size=part_size).save(done=[0, 2])
+
+                path = await downloader._download_progressive(url, "1", {})
+            return path, [item["range"] for item in server.app["media_requests"] if item["range"]]
+
+    path, ranges = run(scenario())
+    assert path.read_bytes() == media_content(MEDIA_BYTES)
+    assert sorted(ranges) == sorted(
+        f"bytes={index * part_size}-{min((index + 1) * part_size, MEDIA_BYTES) - 1}" for index in (1, 3, 4)
+    )
+
+
+def test_server_without_range_support_uses_one_connection(make_downloader, run):
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES, ranges=False) as server:
+            async with make_downloader(range_connections=4, range_part_size=64 * 1024) as downloader:
+                path = await downloader._download_progressive(str(server.make_url("/media/1.mp4")), "1", {})
+            return path, [item for item in server.app["media_requests"] if item["method"] == "GET"]
+
+    path, requests = run(scenario())
+    assert path.read_bytes() == media_content(MEDIA_BYTES)
+    assert len(requests) == 1 and requests[0]["range"] is None
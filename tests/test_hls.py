@@ -0,0 +1,136 @@
+from conftest import stub_server
+from downloader import DownloadJournal
+from pinterest_stub import media_content
+
+MEDIA_BYTES = 400 * 1024
+SEGMENTS = 40
+
+
+def test_m3u8_parser_reads_variants_byteranges_and_keys(make_downloader):
+    parse = make_downloader()._parse_m3u8
+    master = parse(
+        "#EXTM3U\n"
+        '#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,AUDIO="a"\n'
+        "360p.m3u8\n"
+        "#EXT-X-STREAM-INF:BANDWIDTH=2400000,RESOLUTION=1280x720\n"
+        "https://cdn.example/720p.m3u8\n",
+        "https://v1.pinimg.com/videos/hls/master.m3u8",
+    )
+    assert [variant["url"] for variant in master["variants"]] == [
+        "https://v1.pinimg.com/videos/hls/360p.m3u8",
+        "https://cdn.example/720p.m3u8",
+    ]
+    assert master["variants"][0]["resolution"] == (640, 360)
+    assert master["variants"][1]["bandwidth"] == 2400000
+
+    media = parse(
+        "#EXTM3U\n"
+        '#EXT-X-MAP:URI="init.mp4",BYTERANGE="720@0"\n'
+        "#EXTINF:4.0,\n#EXT-X-BYTERANGE:1000@720\nvideo.mp4\n"
+        "#EXTINF:2.5,\n#EXT-X-BYTERANGE:500\nvideo.mp4\n"
+        "#EXT-X-ENDLIST\n",
+        "https://v1.pinimg.com/videos/hls/720p.m3u8",
+    )
+    assert media["init"] == {"url": "https://v1.pinimg.com/videos/hls/init.mp4", "duration": 0.0, "byterange": (720, 0)}
+    assert [(segment["duration"], segment["byterange"]) for segment in media["segments"]] == [
+        (4.0, (1000, 720)),
+        (2.5, (500, 1720)),
+    ]
+    assert not media["encrypted"]
+    assert parse('#EXT-X-KEY:METHOD=AES-128,URI="k"\n#EXTINF:4,\na.ts\n', "https://x/")["encrypted"]
+
+
+def test_hls_download_saves_journal_periodically(make_downloader, run, monkeypatch):
+    saves = []
+    save = DownloadJournal.save
+
+    def counting(self, **changes):
+        saves.append(dict(self.state, **changes)["next_index"])
+        save(self, **changes)
+
+    monkeypatch.setattr(DownloadJournal, "save", counting)
+    monkeypatch.setattr(DownloadJournal, "SAVE_INTERVAL", 3600)
+
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES, hls_segments=SEGMENTS) as server:
+            async with make_downloader() as downloader:
+                return await downloader._download_hls(str(server.make_url("/media/1.m3u8")), "1", {})
+
+    path = run(scenario())
+    assert path.read_bytes() == media_content(MEDIA_BYTES)
+    # حفظ أولي ثم حفظ كل SAVE_EVERY مقطع بدل حفظ بعد كل مقطع
+    assert saves == [0, 16, 32]
+
+
+def test_failed_hls_download_saves_progress_and_resumes(make_downloader, run, monkeypatch):
+    monkeypatch.setattr(DownloadJournal, "SAVE_INTERVAL", 3600)
+
+    async def scenario():
+        async with stub_server(media_bytes=MEDIA_BYTES, hls_segments=SEGMENTS) as server:
+            url = str(server.make_url("/media/1.m3u8"))
+            async with make_downloader(hls_concurrency=1) as downloader:
+                fetch = downloader._fetch_hls_segment
+
+                async def failing(segment, headers):
+                    if segment["url"].endswith("-20.ts"):
+                        raise ConnectionResetError("connection reset")
+                    return await fetch(segment, headers)
+
+                downloader._fetch_hls_segment = failing
+                try:
+                    await downloader._download_hls(url, "1", {})
+                except ConnectionResetError:
+                    pass
+                part_path = downloader._partial_path("1", url, "ts")
+                saved = DownloadJournal.read(part_path)
+
+                downloader._fetch_hls_segment = fetch
+                server.app["media_requests"].clear()
+                path = await downloader._download_hls(url, "1", {})
+            return saved, path, [item["name"] for item in server.app["media_requests"]]
+
+    saved, path, requested = run(scenario())
+    # التقدم غير المحفوظ دورياً (المقاطع 16-19) يُحفظ عند الفشل
+    assert saved["next_index"] == 20
+    assert saved["offset"] == 20 * (MEDIA_BYTES // SEGMENTS)
+    assert path.read_bytes() == media_content(MEDIA_BYTES)
+    assert requested[1:] == [f"1-{index}.ts" for index in range(20, SEGMENTS)]
+
+
+def _serve_playlists(downloader, playlists):
+    async def fetch(url, headers):
+        return playlists.get(url)
+
+    downloader._fetch_hls_playlist = fetch
+
+
+def _media_playlist(name):
+    return f"#EXTM3U\n#EXTINF:4.0,\n{name}.ts\n#EXT-X-ENDLIST\n"
+
+
+def test_hls_variants_with_separate_audio_are_not_selected(make_downloader, run):
+    async def scenario():
+        downloader = make_downloader()
+        _serve_playlists(downloader, {
+            "https://v1.pinimg.com/hls/master.m3u8": (
+                "#EXTM3U\n"
+                '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="a",URI="audio.m3u8"\n'
+                '#EXT-X-STREAM-INF:BANDWIDTH=4000000,RESOLUTION=1920x1080,AUDIO="a"\n1080p.m3u8\n'
+                "#EXT-X-STREAM-INF:BANDWIDTH=2400000,RESOLUTION=1280x720\n720p.m3u8\n"
+            ),
+            "https://v1.pinimg.com/hls/split.m3u8": (
+                "#EXTM3U\n"
+                '#EXT-X-STREAM-INF:BANDWIDTH=4000000,RESOLUTION=1920x1080,AUDIO="a"\n1080p.m3u8\n'
+            ),
+            "https://v1.pinimg.com/hls/1080p.m3u8": _media_playlist("1080p"),
+            "https://v1.pinimg.com/hls/720p.m3u8": _media_playlist("720p"),
+        })
+        muxed = await downloader._resolve_hls_media_playlist("https://v1.pinimg.com/hls/master.m3u8", {})
+        split = await downloader._resolve_hls_media_playlist("https://v1.pinimg.com/hls/split.m3u8", {})
+        return muxed, split
+
+    muxed, split = run(scenario())
+    assert muxed["segments"][0]["url"] == "https://v1.pinimg.com/hls/720p.ts"
+    assert muxed["estimated_size"] == 2400000 * 4 // 8
+    # لا توجد جودة بصوت مدمج: تفشل هذه الجودة لينتقل التحميل إلى البديل التالي
+    assert split is None
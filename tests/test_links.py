@@ -0,0 +1,29 @@
+import pytest
+
+from downloader import AdvancedPinterestDownloader, PinterestDownloader
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("https://www.pinterest.com/pin/42/", ["https://www.pinterest.com/pin/42/"]),
+    ("HTTPS://WWW.PINTEREST.COM/PIN/42/", ["https://www.pinterest.com/pin/42/"]),
+    ("see pinterest.com/pin/42?utm=x, and fr.pinterest.fr/pin/42/.", ["https://www.pinterest.com/pin/42/"]),
+    ("(pin.it/AbC12)", ["https://pin.it/AbC12"]),
+    ("pinterest.com/someone/recipes/", ["https://pinterest.com/someone/recipes/"]),
+    ("https://www.pinterest.com/someone/", ["https://www.pinterest.com/someone/"]),
+    ("https://www.pinterest.com/search/pins/?q=cats", []),
+    ("https://www.pinterest.com/ideas/cats/938271/", []),
+    ("https://www.pinterest.com/", []),
+    ("notpinterest.com/pin/42 mypinterest.com/pin/1", []),
+])
+def test_extract_pinterest_urls(text, expected):
+    assert PinterestDownloader.extract_pinterest_urls(text) == expected
+
+
+def test_extracted_links_resolve_to_pins_or_collections(tmp_path):
+    text = "HTTPS://WWW.PINTEREST.COM/PIN/42/ https://www.pinterest.com/someone/recipes/"
+    pin_url, board_url = PinterestDownloader.extract_pinterest_urls(text)
+    downloader = AdvancedPinterestDownloader(str(tmp_path))
+    assert downloader._extract_pin_id(pin_url) == "42"
+    assert AdvancedPinterestDownloader.parse_collection_url(board_url) == {
+        "type": "board", "username": "someone", "board": "recipes", "section": ""
+    }
@@ -0,0 +1,34 @@
+import argparse
+
+import pytest
+
+from loadtest import LoadTest, build_update, parse_mix
+
+
+def test_mix_and_update_builder():
+    assert parse_mix("link:60,stats") == {"link": 60.0, "stats": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("link:60,upload:5")
+
+    update = build_update(7, 42, "multi", ["1", "2"])
+    assert update["message"]["text"] == "look at these: pinterest.com/pin/1 pinterest.com/pin/2"
+    assert update["message"]["chat"] == {"id": 42, "type": "private"}
+    command = build_update(8, 42, "stats", ["1"])["message"]
+    assert command["entities"] == [{"type": "bot_command", "offset": 0, "length": len("/stats")}]
+
+
+def test_short_load_stage_keeps_up(tmp_path, run):
+    args = argparse.Namespace(
+        rates=[20], duration=1.0, drain_timeout=10.0, users=50, pins=30, mix="link:60,multi:10,start:10,stats:20",
+        api_ms=5.0, resolve_ms=10.0, download_ms=200.0, video_kb=16, db_writers=1, db_writer_rate=20.0,
+        slo_ms=2000.0, seed=1, output=None, json=False, verbose=False,
+    )
+    report = run(LoadTest(args, str(tmp_path)).run())
+
+    (stage,) = report["stages"]
+    assert stage["sent"] == stage["processed"] == 20
+    assert stage["errors"] == 0
+    assert stage["keeping_up"]
+    assert stage["database"]["locked_errors"] == 0
+    assert stage["bot_api_calls"]["sendMessage"] > 0
+    assert report["background_writers"]["locked"] == 0
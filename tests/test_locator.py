@@ -0,0 +1,40 @@
+import pytest
+
+from benchmark import fixture_pin
+from downloader import AdvancedPinterestDownloader
+
+locate = AdvancedPinterestDownloader._locate_video
+PIN_ID = "123456"
+
+
+def related_feed(count):
+    return [{"type": "pin", "pin": fixture_pin(str(90_000 + i))} for i in range(count)]
+
+
+@pytest.mark.parametrize("state", [
+    {"props": {"initialReduxState": {"pins": {PIN_ID: fixture_pin(PIN_ID)}, "feeds": related_feed(3)}}},
+    {"resourceResponses": [{"response": {"data": fixture_pin(PIN_ID)}}], "feeds": related_feed(3)},
+    {"props": {"feeds": related_feed(3), "page": {"a": {"b": {"closeup": fixture_pin(PIN_ID)}}}}},
+], ids=["redux", "resource", "nested"])
+def test_requested_pin_wins_over_related_pins(state):
+    info = locate(state, PIN_ID)
+    assert info is not None
+    assert f"/videos/{PIN_ID}/" in info["video_url"]
+
+
+@pytest.mark.parametrize("state", [
+    {"props": {"initialReduxState": {
+        "pins": {PIN_ID: fixture_pin(PIN_ID, formats=()), "90000": fixture_pin("90000")},
+        "feeds": related_feed(3),
+    }}},
+    {"props": {"feeds": related_feed(3), "page": {"closeup": fixture_pin(PIN_ID, formats=())}}},
+    {"pin": fixture_pin("90000")},
+], ids=["redux", "nested", "other-pin-at-hot-path"])
+def test_only_related_pins_have_video(state):
+    assert locate(state, PIN_ID) is None
+
+
+def test_without_pin_id_first_video_is_returned():
+    info = locate({"feeds": related_feed(2)})
+    assert info is not None
+    assert "/videos/90000/" in info["video_url"]
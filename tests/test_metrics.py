@@ -0,0 +1,94 @@
+import gc
+import weakref
+
+import aiohttp
+import pytest
+
+from downloader import AdvancedPinterestDownloader
+from metrics import MetricsRegistry, start_metrics_server
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = MetricsRegistry().histogram("stage_seconds", "Stage duration", ["stage"], buckets=(0.1, 0.2, 0.4))
+    for value in (0.05, 0.15, 0.15, 0.3):
+        histogram.observe(value, stage="parse")
+
+    assert histogram.count(stage="parse") == 4
+    assert histogram.quantile(0.5, stage="parse") == pytest.approx(0.15)
+    assert histogram.quantile(1.0, stage="parse") == pytest.approx(0.4)
+    assert histogram.quantile(0.5, stage="transfer") is None
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("events_total", "Events", ["event"]).inc(2, event='say "hi"')
+    registry.gauge("queue_depth", "Queue depth").set_function(lambda: 7)
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.5, 1.0))
+    histogram.observe(0.2)
+    histogram.observe(3)
+
+    lines = registry.render().splitlines()
+    assert 'events_total{event="say \\"hi\\""} 2' in lines
+    assert "# TYPE queue_depth gauge" in lines and "queue_depth 7" in lines
+    assert lines[-5:] == [
+        'latency_seconds_bucket{le="0.5"} 1',
+        'latency_seconds_bucket{le="1"} 1',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 3.2",
+        "latency_seconds_count 2",
+    ]
+    assert registry.snapshot()["latency_seconds"][""]["count"] == 2
+
+
+def test_registry_returns_the_same_metric_and_rejects_conflicts():
+    registry = MetricsRegistry()
+    assert registry.counter("downloads_total", "Downloads", ["mode"]) is registry.counter(
+        "downloads_total", "Downloads", ["mode"]
+    )
+    with pytest.raises(ValueError):
+        registry.gauge("downloads_total", "Downloads", ["mode"])
+    with pytest.raises(ValueError):
+        registry.counter("downloads_total", "Downloads").inc(mode="file", extra="x")
+
+
+def test_metrics_endpoint_serves_the_registry(run):
+    registry = MetricsRegistry()
+    registry.counter("updates_total", "Updates").inc(3)
+
+    async def scenario():
+        runner = await start_metrics_server(registry, host="127.0.0.1", port=0)
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    return response.headers["Content-Type"], await response.text()
+        finally:
+            await runner.cleanup()
+
+    content_type, body = run(scenario())
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "updates_total 3" in body.splitlines()
+
+
+def _write(path, content):
+    path.write_bytes(content)
+    return path
+
+
+def test_metric_bindings_do_not_keep_closed_downloaders_alive(tmp_path, run):
+    registry = MetricsRegistry()
+    first = AdvancedPinterestDownloader(str(tmp_path / "first"), parse_executor="inline", metrics=registry)
+    second = AdvancedPinterestDownloader(str(tmp_path / "second"), parse_executor="inline", metrics=registry)
+    store_bytes = registry.gauge("pinterest_store_bytes", "Bytes held in the content store")
+    run(second.content_store.put("1", _write(tmp_path / "a.mp4", bytes(10))))
+
+    # إغلاق المحمّل الأقدم لا يزيل قراءات المحمّل الذي استبدلها
+    run(first.close())
+    assert store_bytes.value() == 10
+
+    closed = weakref.ref(second)
+    run(second.close())
+    del first, second
+    gc.collect()
+    assert closed() is None
+    assert store_bytes.value() == 0
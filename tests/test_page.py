@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from benchmark import build_fixture_page, fixture_pin
+import downloader as downloader_module
+from downloader import AdvancedPinterestDownloader, PinPageExtractor, parse_pin_block
+
+PIN_ID = "123456"
+
+
+def _feed_in_chunks(extractor, page, size):
+    for offset in range(0, len(page), size):
+        if extractor.feed(page[offset:offset + size]):
+            return offset + size
+    return None
+
+
+def test_extractor_finds_block_split_across_chunks():
+    page = build_fixture_page(PIN_ID, related_pins=5)
+    extractor = PinPageExtractor()
+    consumed = _feed_in_chunks(extractor, page, 7)
+
+    assert consumed is not None
+    assert json.loads(extractor.block)["props"]["initialReduxState"]["pins"][PIN_ID]["id"] == PIN_ID
+    assert extractor.page_metadata()["title"] == "Pin"
+
+
+def test_extractor_skips_to_next_block():
+    first = b'<script id="__PWS_INITIAL_PROPS__" type="application/json">{"config": {}}</script>'
+    second = b'<script id="__PWS_DATA__" type="application/json">{"pin": 1};</script>'
+    extractor = PinPageExtractor()
+
+    assert extractor.feed(b"<html><body>" + first + second)
+    assert extractor.block == b'{"config": {}}'
+    assert extractor.skip_block()
+    assert extractor.block == b'{"pin": 1}'
+    assert not extractor.skip_block()
+
+
+def test_page_fetch_stops_once_the_video_block_arrives(tmp_path, run):
+    page = build_fixture_page(PIN_ID, related_pins=5)
+
+    async def pin_page(request):
+        response = web.StreamResponse()
+        response.content_type = "text/html"
+        await response.prepare(request)
+        await response.write(page)
+        # بقية الصفحة لا تصل أبداً: المحلل يجب ألا ينتظرها
+        await asyncio.sleep(30)
+        return response
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/pin/{pin_id}/", pin_page)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with AdvancedPinterestDownloader(str(tmp_path), parse_executor="inline") as downloader:
+                return await asyncio.wait_for(
+                    downloader._fetch_pin_page(str(server.make_url(f"/pin/{PIN_ID}/")), PIN_ID, asyncio.Event()),
+                    timeout=5,
+                )
+        finally:
+            await server.close()
+
+    video_data = run(scenario())
+    assert video_data["video_url"] == fixture_pin(PIN_ID)["videos"]["video_list"]["V_HLSV4"]["url"]
+
+
+def test_parse_runs_off_the_event_loop_with_the_same_result(tmp_path, run, monkeypatch):
+    page = build_fixture_page(PIN_ID, related_pins=20, layout="nested")
+    extractor = PinPageExtractor()
+    extractor.feed(page)
+    threads = []
+
+    def recording(raw, pin_id=None):
+        threads.append(threading.current_thread().name)
+        return parse_pin_block(raw, pin_id)
+
+    async def parse(kind):
+        async with AdvancedPinterestDownloader(str(tmp_path), parse_executor=kind, parse_workers=1) as downloader:
+            return await downloader._parse_block(extractor.block, PIN_ID)
+
+    expected = parse_pin_block(extractor.block, PIN_ID)
+    assert f"/videos/{PIN_ID}/" in expected["video_url"]
+    assert run(parse("process")) == expected
+
+    monkeypatch.setattr(downloader_module, "parse_pin_block", recording)
+    assert run(parse("thread")) == expected
+    assert run(parse("inline")) == expected
+    assert threads[0].startswith("pin-parse")
+    assert threads[1] == "MainThread"
+
+
+def _related_only_page(pin_id):
+    # الـ Pin المطلوب بلا فيديو، و Pin مقترح بفيديو في نفس كتلة الحالة
+    state = {"props": {"initialReduxState": {"pins": {
+        pin_id: {"id": pin_id, "title": "Image pin", "images": {"orig": {"url": "https://i.pinimg.com/o/123.jpg"}}},
+        "999": {"id": "999", "videos": {"video_list": {"V_HLSV4": {"url": "https://v.pinimg.com/related/999.m3u8"}}}},
+    }}}}
+    return (
+        b'<html><head><title>Pin | Pinterest</title></head><body>'
+        b'<script id="__PWS_DATA__" type="application/json">' + json.dumps(state).encode() + b'</script>'
+    )
+
+
+async def _serve_page(body, hang=False):
+    async def pin_page(request):
+        response = web.StreamResponse()
+        response.content_type = "text/html"
+        await response.prepare(request)
+        await response.write(body)
+        if hang:
+            await asyncio.sleep(30)
+        await response.write(b"</body></html>")
+        return response
+
+    app = web.Application()
+    app.router.add_get("/pin/{pin_id}/", pin_page)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_related_pin_video_is_not_used_for_a_pin_without_video(tmp_path, run):
+    async def scenario():
+        server = await _serve_page(_related_only_page("123"))
+        try:
+            async with AdvancedPinterestDownloader(
+                str(tmp_path), parse_executor="inline", api_fast_path=False
+            ) as downloader:
+                url = str(server.make_url("/pin/123/"))
+                return await downloader._resolve_pin_data(url, "123"), await downloader.resolution_cache.get("123")
+        finally:
+            await server.close()
+
+    assert run(scenario()) == (None, None)
+
+
+def test_page_fetch_stops_once_the_pin_block_has_no_video(tmp_path, run):
+    async def scenario():
+        # بقية الصفحة لا تصل أبداً: كتلة الـ Pin المطلوب تكفي للحكم
+        server = await _serve_page(_related_only_page("123"), hang=True)
+        try:
+            async with AdvancedPinterestDownloader(str(tmp_path), parse_executor="inline") as downloader:
+                url = str(server.make_url("/pin/123/"))
+                return await asyncio.wait_for(downloader._fetch_pin_page(url, "123", asyncio.Event()), timeout=5)
+        finally:
+            await server.close()
+
+    assert run(scenario()) is None
+
+
+def test_extractor_knows_which_pins_a_block_mentions():
+    extractor = PinPageExtractor()
+    extractor.feed(_related_only_page("123") + b"</body></html>")
+    assert extractor.mentions_pin("123") and extractor.mentions_pin("999")
+    assert not extractor.mentions_pin("12")
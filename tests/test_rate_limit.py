@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from downloader import AdaptiveRateLimiter, AdvancedPinterestDownloader, TransientDownloadError
+
+
+def test_burst_is_immediate_then_paced(run):
+    async def scenario():
+        limiter = AdaptiveRateLimiter(rate=20, burst=3)
+        waits = [await limiter.acquire("www.pinterest.com") for _ in range(5)]
+        return waits
+
+    waits = run(scenario())
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert all(0.03 <= wait < 0.5 for wait in waits[3:])
+
+
+def test_throttle_backs_off_and_recovers_per_host():
+    limiter = AdaptiveRateLimiter(rate=2.0, min_rate=0.3, backoff_factor=0.5, recovery_factor=2.0)
+    host, other = "www.pinterest.com", "i.pinimg.com"
+
+    limiter.record(host, 429)
+    assert limiter.current_rate(host) == 1.0
+    limiter.record(host, empty=True)
+    limiter.record(host, 403)
+    # لا ينخفض المعدل تحت الحد الأدنى
+    limiter.record(host, 429)
+    assert limiter.current_rate(host) == 0.3
+    assert limiter.current_rate(other) == 2.0
+
+    limiter.record(host, 404)
+    assert limiter.current_rate(host) == 0.3
+    for _ in range(5):
+        limiter.record(host, 200)
+    # الاسترخاء لا يتجاوز المعدل الطبيعي
+    assert limiter.current_rate(host) == 2.0
+
+
+def test_retry_after_pauses_the_host(run):
+    async def scenario():
+        limiter = AdaptiveRateLimiter(rate=100, burst=5)
+        limiter.record("www.pinterest.com", 429, retry_after=0.2)
+        started = time.monotonic()
+        await limiter.acquire("www.pinterest.com")
+        paused = time.monotonic() - started
+        other = await limiter.acquire("i.pinimg.com")
+        return paused, other
+
+    paused, other = run(scenario())
+    assert paused >= 0.2
+    assert other == 0.0
+
+
+def test_page_429_throttles_the_limiter(tmp_path, run):
+    async def pin_page(request):
+        return web.Response(status=429, headers={"Retry-After": "1"})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/pin/{pin_id}/", pin_page)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with AdvancedPinterestDownloader(str(tmp_path), parse_executor="inline") as downloader:
+                url = str(server.make_url("/pin/1/"))
+                with pytest.raises(TransientDownloadError):
+                    await downloader._fetch_pin_page(url, "1", asyncio.Event())
+                bucket = downloader.rate_limiter._bucket(f"{server.host}:{server.port}")
+                return bucket, downloader.rate_limiter.rate
+        finally:
+            await server.close()
+
+    bucket, rate = run(scenario())
+    assert bucket["rate"] == rate * 0.5
+    assert bucket["paused_until"] > time.monotonic()
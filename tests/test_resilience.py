@@ -0,0 +1,75 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from conftest import stub_server
+from downloader import TransientDownloadError
+from pinterest_stub import media_content
+
+
+def _events(downloader, event):
+    return downloader._resilience_events.value(event=event)
+
+
+def test_transient_errors_are_retried_and_permanent_ones_are_not(make_downloader, run):
+    downloader = make_downloader(retry_base_delay=0.01, max_retries=3)
+    attempts = []
+
+    async def flaky():
+        attempts.append("flaky")
+        if len(attempts) < 3:
+            raise TransientDownloadError("HTTP 503")
+        return "ok"
+
+    async def missing():
+        attempts.append("missing")
+        raise aiohttp.ClientResponseError(None, (), status=404)
+
+    async def scenario():
+        retries = _events(downloader, "retry")
+        assert await downloader._with_retries(flaky, "test") == "ok"
+        with pytest.raises(aiohttp.ClientResponseError):
+            await downloader._with_retries(missing, "test")
+        return _events(downloader, "retry") - retries
+
+    assert run(scenario()) == 2
+    assert attempts == ["flaky"] * 3 + ["missing"]
+
+
+def test_slow_first_byte_sends_a_hedge(make_downloader, run):
+    downloader = make_downloader(retry_base_delay=0.01, hedge_percentile=95.0)
+    for _ in range(20):
+        downloader.page_latency.record(0.01)
+    attempts = []
+
+    async def attempt(first_byte):
+        attempts.append(first_byte)
+        if len(attempts) == 1:
+            # الطلب الأول عالق قبل أول بايت
+            await asyncio.sleep(10)
+        first_byte.set()
+        return "hedge"
+
+    async def scenario():
+        wins = _events(downloader, "hedge_win")
+        result = await asyncio.wait_for(downloader._hedged(attempt), timeout=2)
+        return result, _events(downloader, "hedge_win") - wins
+
+    assert run(scenario()) == ("hedge", 1)
+    assert len(attempts) == 2
+
+
+def test_failed_quality_falls_back_to_the_next_variant(make_downloader, run):
+    async def scenario():
+        async with stub_server(media_bytes=64 * 1024) as server:
+            async with make_downloader(retry_base_delay=0.01, range_connections=1) as downloader:
+                fallbacks = _events(downloader, "quality_fallback")
+                path = await downloader._download_video_file(
+                    str(server.make_url("/gone/1.mp4")), "1", [str(server.make_url("/media/1.mp4"))]
+                )
+                return path, _events(downloader, "quality_fallback") - fallbacks
+
+    path, fallbacks = run(scenario())
+    assert open(path, "rb").read() == media_content(64 * 1024)
+    assert fallbacks == 1
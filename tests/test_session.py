@@ -0,0 +1,36 @@
+import asyncio
+
+from conftest import stub_server
+from downloader import AdvancedPinterestDownloader, HTTPSessionManager
+
+
+def test_concurrent_callers_share_one_session(run):
+    async def scenario():
+        manager = HTTPSessionManager()
+        sessions = await asyncio.gather(*(manager.get_session() for _ in range(10)))
+        await manager.close()
+        assert manager.closed
+        reopened = await manager.get_session()
+        await manager.close()
+        return sessions, reopened
+
+    sessions, reopened = run(scenario())
+    assert len({id(session) for session in sessions}) == 1
+    assert reopened is not sessions[0]
+
+
+def test_sequential_downloads_reuse_one_connection(tmp_path, run):
+    async def scenario():
+        async with stub_server() as server:
+            manager = HTTPSessionManager()
+            for index in range(5):
+                # كل تحميل بمحمل مستقل يشارك نفس الجلسة
+                downloader = AdvancedPinterestDownloader(str(tmp_path), range_connections=1, session_manager=manager)
+                await downloader.start()
+                await downloader._download_progressive(str(server.make_url(f"/media/{index}.mp4")), str(index), {})
+            await manager.close()
+            return [item["peer"] for item in server.app["media_requests"]]
+
+    peers = run(scenario())
+    assert len(peers) == 5
+    assert len(set(peers)) == 1
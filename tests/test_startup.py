@@ -0,0 +1,33 @@
+import random
+import subprocess
+import sys
+from collections import Counter
+
+import useragents
+from downloader import AdvancedPinterestDownloader
+from useragents import USER_AGENTS, random_user_agent
+
+
+def test_user_agents_follow_the_weights(monkeypatch):
+    monkeypatch.setattr(useragents, "random", random.Random(7))
+    picks = Counter(random_user_agent() for _ in range(20000))
+    total_weight = sum(weight for weight, _ in USER_AGENTS)
+
+    assert set(picks) == {agent for _, agent in USER_AGENTS}
+    for weight, agent in USER_AGENTS:
+        assert abs(picks[agent] / 20000 - weight / total_weight) < 0.01
+
+
+def test_request_headers_use_the_pool(tmp_path):
+    downloader = AdvancedPinterestDownloader(str(tmp_path))
+    agents = {agent for _, agent in USER_AGENTS}
+    assert all(downloader._get_fresh_headers()["User-Agent"] in agents for _ in range(20))
+
+
+def test_importing_the_bot_defers_heavy_modules():
+    code = (
+        "import sys, bot; "
+        "print(sorted(m for m in ('downloader', 'database', 'sqlmodel', 'fake_useragent') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
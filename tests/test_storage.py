@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+from downloader import AdvancedPinterestDownloader, ContentStore, DownloadJournal
+
+
+def _age(path, hours):
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
+
+
+def _partial(directory, name, updated_hours_ago, size=10):
+    path = directory / name
+    path.write_bytes(bytes(size))
+    journal = DownloadJournal(path, "stream", "https://v.pinimg.com/x.mp4")
+    journal.save(offset=size)
+    state = dict(journal.state, updated_at=time.time() - updated_hours_ago * 3600)
+    journal.path.write_text(json.dumps(state), encoding="utf-8")
+    _age(path, updated_hours_ago)
+    _age(journal.path, updated_hours_ago)
+    return path, journal.path
+
+
+def test_cleanup_keeps_resumable_partials_within_retention(tmp_path):
+    downloader = AdvancedPinterestDownloader(str(tmp_path), partial_retention_hours=6)
+    finished = tmp_path / "pinterest_1_done.mp4"
+    finished.write_bytes(b"x")
+    _age(finished, 3)
+    fresh_part, fresh_journal = _partial(tmp_path, "pinterest_2_a.mp4.part", updated_hours_ago=3)
+    stale_part, stale_journal = _partial(tmp_path, "pinterest_3_b.mp4.part", updated_hours_ago=7)
+
+    downloader.cleanup_old_files(max_age_hours=2)
+
+    assert not finished.exists()
+    assert fresh_part.exists() and fresh_journal.exists()
+    assert not stale_part.exists() and not stale_journal.exists()
+
+
+def _store_file(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+def test_content_store_dedup_and_lru_eviction(tmp_path, run):
+    store = ContentStore(tmp_path / "store", quota_bytes=250)
+
+    async def scenario():
+        first = await store.put("1", _store_file(tmp_path, "a.mp4", bytes(100)))
+        duplicate = await store.put("1", _store_file(tmp_path, "b.mp4", bytes(100)))
+        assert duplicate == first and store.stats["dedup"] == 1
+
+        await store.put("2", _store_file(tmp_path, "c.mp4", b"\1" * 100))
+        # الوصول إلى Pin 1 يجعل Pin 2 الأقل استخداماً
+        assert store.lookup("1") == first
+        await store.put("3", _store_file(tmp_path, "d.mp4", b"\2" * 100))
+
+    run(scenario())
+    assert store.lookup("2") is None
+    assert store.lookup("1") is not None and store.lookup("3") is not None
+    assert store.stats["evicted"] == 1
+    assert store.total_bytes <= 250
+
+
+def test_content_store_batches_index_writes_on_hits(tmp_path, run):
+    store = ContentStore(tmp_path / "store")
+    run(store.put("1", _store_file(tmp_path, "a.mp4", bytes(10))))
+    index = tmp_path / "store" / ContentStore.INDEX_NAME
+    saved = index.read_text(encoding="utf-8")
+
+    for _ in range(5):
+        assert store.lookup("1") is not None
+    assert index.read_text(encoding="utf-8") == saved
+
+    assert store.flush() is True
+    assert store.flush() is False
+    (entry,) = json.loads(index.read_text(encoding="utf-8")).values()
+    (before,) = json.loads(saved).values()
+    assert entry["last_access"] > before["last_access"]
+
+
+def test_content_store_index_is_not_updated_while_another_thread_writes_it(tmp_path, run, monkeypatch):
+    store = ContentStore(tmp_path / "store")
+    run(store.put("1", _store_file(tmp_path, "a.mp4", bytes(10))))
+    store.lookup("1")
+    lookups = []
+    reader = threading.Thread(target=lambda: lookups.append(store.lookup("1")))
+    dump = json.dump
+
+    def slow_dump(entries, file):
+        # الحلقة تصل إلى Pin أثناء كتابة الفهرس من خيط الصيانة
+        reader.start()
+        reader.join(0.1)
+        lookups.append("written")
+        dump(entries, file)
+
+    monkeypatch.setattr(json, "dump", slow_dump)
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    flusher.join()
+    monkeypatch.setattr(json, "dump", dump)
+    reader.join()
+
+    assert lookups[0] == "written"
+    assert store.flush() is True
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import stub_server
+from downloader import AdvancedPinterestDownloader, VariantTooLargeError
+
+VARIANTS = [
+    {"url": "360p.m3u8", "bandwidth": 800_000, "average_bandwidth": 0, "resolution": (640, 360)},
+    {"url": "1080p.m3u8", "bandwidth": 6_000_000, "average_bandwidth": 5_000_000, "resolution": (1920, 1080)},
+    {"url": "720p.m3u8", "bandwidth": 2_400_000, "average_bandwidth": 0, "resolution": (1280, 720)},
+]
+select = AdvancedPinterestDownloader._select_hls_variant
+
+
+@pytest.mark.parametrize("duration, max_bytes, expected", [
+    (60, None, "1080p.m3u8"),
+    (0, 1, "1080p.m3u8"),
+    # 1080p بمتوسط 5Mbps لدقيقة = 37.5MB
+    (60, 40 * 1024 * 1024, "1080p.m3u8"),
+    (60, 20 * 1024 * 1024, "720p.m3u8"),
+    (60, 7 * 1024 * 1024, "360p.m3u8"),
+    (60, 1024 * 1024, None),
+])
+def test_highest_variant_that_fits(duration, max_bytes, expected):
+    variant = select(VARIANTS, duration, max_bytes)
+    assert (variant and variant["url"]) == expected
+
+
+def test_oversized_file_is_rejected_before_the_transfer(tmp_path, run):
+    async def scenario():
+        async with stub_server(media_bytes=256 * 1024) as server:
+            url = str(server.make_url("/media/1.mp4"))
+            async with AdvancedPinterestDownloader(str(tmp_path), range_connections=1) as downloader:
+                with pytest.raises(VariantTooLargeError) as error:
+                    await downloader._download_progressive(url, "1", {}, max_bytes=100 * 1024)
+                path = await downloader._download_video_file(url, "1", [url], max_bytes=100 * 1024)
+            return error.value, path, server.app["media_requests"]
+
+    error, path, requests = run(scenario())
+    assert (error.size, error.max_bytes) == (256 * 1024, 100 * 1024)
+    assert path is None
+    assert {request["method"] for request in requests} == {"HEAD"}